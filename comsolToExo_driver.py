@@ -6,7 +6,6 @@ Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
 
 BSD 3-Clause License
 '''
-from exodus3 import *
 import numpy as np
 import re
 
@@ -6,7 +6,6 @@ Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
 
 BSD 3-Clause License
 '''
-from exodus3 import *
 import numpy as np
 import re
 
@@ -42,5 +41,10 @@ bounds = [[x_coord_lower_bound, x_coord_upper_bound],
           [y_coord_lower_bound, y_coord_upper_bound],
           [z_coord_lower_bound, z_coord_upper_bound]]
 
+# instead of bounds any region of src/roi.py can be given, e.g. roi.Sphere([0, 0, 0], 0.5) & roi.Half_Space([0, 0, 0], [0, 0, 1])
+
+# elements kept in the ROI: 'all' nodes inside, 'any' node inside, 'centroid' inside or 'clip' to cut the elements at the ROI planes
+elem_inclusion = 'all'
+
 #Get exodus file from comsol data
-util.comsolToExo_with_ROI(inputFolderPath, input_comsol_file_name, outputFolderPath, outputExodusFilename, bounds) 
\ No newline at end of file
+util.comsolToExo_with_ROI(inputFolderPath, input_comsol_file_name, outputFolderPath, outputExodusFilename, bounds, elem_inclusion = elem_inclusion) 
\ No newline at end of file
@@ -6,7 +6,6 @@ Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
 
 BSD 3-Clause License
 '''
-from exodus3 import *
 import numpy as np
 
 from src import Node
@@ -23,5 +22,10 @@ output_comsol_file_name = "forComsolInput_from_exo_to_comsol_example.txt"
 
 elem_type = "tetrahedra"
 
+# Exodus element variables to convert, e.g. ['heat_flux'], projected to the nodes ('nodal') or written at the element centroids ('centroid')
+elem_variable_names = None
+elem_data_output = 'nodal'
+
 #Run exoToComsol() to generate COMSOL file from exodus file
-util.exoToComsol(inputFolderPath, inputExodusFilename, outputFolderPath, output_comsol_file_name, elem_type)
+util.exoToComsol(inputFolderPath, inputExodusFilename, outputFolderPath, output_comsol_file_name, elem_type, 
+                 elem_variable_names = elem_variable_names, elem_data_output = elem_data_output)
@@ -0,0 +1,31 @@
+'''
+ExoToComsol
+
+Copyright 2024 National Technology & Engineering Solutions of Sandia, LLC (NTESS). 
+Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains certain rights in this software.
+
+BSD 3-Clause License
+'''
+from src import server
+
+#user inputs:
+# listen only on localhost, clients can read and write any file under root_dir
+host = '127.0.0.1'
+port = 8765
+
+# set to a file path to listen on a Unix socket instead of host and port
+unix_socket_path = None
+
+# memory for cached meshes and nodal fields
+max_cache_megabytes = 2048
+
+num_workers = 4
+
+# directory the file paths of the requests are relative to, paths outside it are refused
+root_dir = './'
+
+#Run run_server() to serve conversion requests, e.g. from a client: 
+#server.send_request({'op': 'exo_to_comsol', 'input_file': './input_folder/result_heat_conduction_Aria.e', 
+#                     'bounds': [[-0.5, 0.5], [-0.5, 0.5], [-0.5, 0.0]]}, host, port)
+server.run_server(host = host, port = port, unix_socket_path = unix_socket_path, 
+                  max_cache_bytes = max_cache_megabytes * 1024**2, num_workers = num_workers, root_dir = root_dir)
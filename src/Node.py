@@ -9,196 +9,180 @@ BSD 3-Clause License
 import numpy as np
 import re
 
-def get_nodal_coords(lines_with_nodal_coords):
-    """
-    Gets nodal coordinates from text
-
-    Returns lists for x, y and z coordinates
-    """ 
-    
-    x_coords = []
-    y_coords = []
-    z_coords = []
-    
-    for line in lines_with_nodal_coords: 
-                 
-        numbers_in_line = re.split(r"\s+",line)
-        
-        x_coords.append(float(numbers_in_line[0]))
-        y_coords.append(float(numbers_in_line[1]))        
-        z_coords.append(float(numbers_in_line[2]))
-                
-    return x_coords, y_coords, z_coords
-
-
-def get_coords_aft_roi_cropping(nodes_list_roi_cropped): 
+def get_nodal_sim_data_columns(lines_with_nodal_sim_data):
 
     """
-    Gets coordinates of nodes inside user-defined region-of-interest
+    Gets nodal simulation data of all data columns in a single pass over the text
 
-    Returs arrays of x, y and z coordinates
-    
+    Returns numpy array of shape (num_nodes, num_data_columns)
     """
-    
-    x_coords_roi_cropped = []
-    y_coords_roi_cropped = [] 
-    z_coords_roi_cropped = []
-    
-    for node in nodes_list_roi_cropped: 
-        x_coords_roi_cropped.append(node.x_coord)
-        y_coords_roi_cropped.append(node.y_coord)
-        z_coords_roi_cropped.append(node.z_coord)
-    
-    return x_coords_roi_cropped, y_coords_roi_cropped, z_coords_roi_cropped
 
+    return np.array(''.join(lines_with_nodal_sim_data).split(), dtype=np.float64).reshape(len(lines_with_nodal_sim_data), -1)
 
-def get_nodal_sim_data(lines_with_nodal_sim_data): 
+def get_nodal_sim_data_headers(data_section_header_line, num_data_columns):
 
     """
-    Gets nodal simulation data
+    Gets the header of each data column from the header line of a data section,
+    e.g. '% Data (T (K) @ t=0, T (K) @ t=1)' or '% Data (T (K) @ t=0) (T (K) @ t=1)'
 
-    Returns list of nodal simulation data
-    """
-    
-    nodal_sim_data = []
-
-    
-    for line in lines_with_nodal_sim_data: 
-        
-        nodal_temp = float(line)
-        
-        if nodal_temp == 0.0:
-            print("Error")
-        
-        nodal_sim_data.append(nodal_temp)
-         
-        # numbers_in_line = re.findall('-?\d+\.\d+', line)
-        
-        # if(float(numbers_in_line[0]) == 0): 
-        #     print("error")
-        # else:
-        #     nodal_sim_data.append(float(numbers_in_line[0]))
-
-        
-    return nodal_sim_data 
-
-def get_nodal_sim_data_roi_cropped(nodes_list_roi_cropped): 
+    Note: if the header line does not name every column an empty header is returned for each column
 
+    Returns list of column headers
     """
-    Gets nodal simulation data over the user-defined region-of-interest
 
-    Returns list of nodal simulation data
-    """
-    nodal_sim_data_roi_cropped = []
-    
-    for node in nodes_list_roi_cropped: 
-        nodal_sim_data_roi_cropped.append(node.temp)
-        
-    return nodal_sim_data_roi_cropped 
+    header_text = data_section_header_line.split("Data", 1)[-1]
 
-def get_node_id_array(numNodes): 
+    # top-level parenthesized groups, the unit inside a header has its own parentheses
+    groups = []
+    depth = 0
+    for i, char in enumerate(header_text):
+        if char == '(':
+            if depth == 0:
+                group_start = i + 1
+            depth += 1
+        elif char == ')' and depth > 0:
+            depth -= 1
+            if depth == 0:
+                groups.append(header_text[group_start:i].strip())
 
-    """
-    Gets array of node ids from number of nodes and without using node object
+    if len(groups) == 1 and num_data_columns > 1:
+        groups = _split_at_top_level_commas(groups[0])
 
-    Returns list of node ids
-    """
-    
-    node_id_array = np.arange(1, numNodes+1)
-    
-    return list(node_id_array)
+    if len(groups) != num_data_columns:
+        return [''] * num_data_columns
+
+    return groups
+
+def _split_at_top_level_commas(text):
 
-def create_nodes_list_from_coords(nodal_coords_tuple, nodal_temps_list): 
-    
     """
-    Creates list of node objects from nodal coordinates and nodal simulation data
+    Splits text at the commas which are not inside parentheses
 
-    Returns list of node objects
+    Returns list of stripped strings
     """
-    nodes_list = []
-    
-    num_nodes = len(nodal_coords_tuple[0])
-    
-    for i in range(0, num_nodes):
-        node = Node(node_id = i+1, #1-based node ids
-                    x_coord = nodal_coords_tuple[0][i], 
-                    y_coord = nodal_coords_tuple[1][i], 
-                    z_coord = nodal_coords_tuple[2][i], \
-                    temp = nodal_temps_list[i])
-        nodes_list.append(node)
-    
-    return nodes_list
-
-def get_nodes_list_roi_cropped(x_coord_lower_bound, x_coord_upper_bound , y_coord_lower_bound, y_coord_upper_bound, z_coord_lower_bound , z_coord_upper_bound, nodes_list): 
-    
+
+    parts = []
+    depth = 0
+    part_start = 0
+    for i, char in enumerate(text):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            parts.append(text[part_start:i].strip())
+            part_start = i + 1
+    parts.append(text[part_start:].strip())
+
+    return parts
+
+def get_nodal_variable_name_and_time(data_header, column_index):
+
     """
-    Gets list of nodes in the user-defined region-of-interest (ROI)
+    Gets the variable name and time value of one data column from its header, e.g. 'T (K) @ t=0.5' is variable 'T' at time 0.5
+
+    Note: a column without a name is named 'temp', 'temp_2', ... after its 0-based column_index
 
-    Returns list of nodes in the ROI
+    Returns variable name and time value, None if the header has no time
     """
-    nodes_list_roi_cropped = []
-    node_ids_roi_cropped = []
-    
-    for node in nodes_list: 
-        
-        if (node.x_coord >= x_coord_lower_bound and node.x_coord <= x_coord_upper_bound): 
-            if (node.y_coord >= y_coord_lower_bound and node.y_coord <= y_coord_upper_bound): 
-                if (node.z_coord >= z_coord_lower_bound and node.z_coord <= z_coord_upper_bound): 
-            
-                    nodes_list_roi_cropped.append(node)
-                    
-                    node_ids_roi_cropped.append(node.node_id)
-                    
-                else: 
-                    print (f"user specified region of interest (roi) does not contain node with id {node.node_id}")
-            
-    
-    return nodes_list_roi_cropped, node_ids_roi_cropped
-
-def get_new_node_id_after_roi_cropped(nodes_list_roi_cropped):
-    
+
+    name = re.split(r"\s*[\(@]", data_header, maxsplit=1)[0].strip()
+    if not name:
+        name = 'temp' if column_index == 0 else f'temp_{column_index+1}'
+
+    time_match = re.search(r"@\s*t\s*=\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)", data_header)
+
+    return name, float(time_match.group(1)) if time_match else None
+
+def get_nodal_variables_and_times(data_headers):
+
     """
-    Gets new node ids after nodes are identifed inside ROI
+    Gets Exodus nodal variable names and time values from the headers of the data columns, e.g. 'T (K) @ t=0.5' is variable 'T' at time 0.5
 
-    Note: new node ids are needed since for COMSOL sectwise format to work node ids must start from 1 and end at the number of nodes
+    Note: if no header has a time value the data is put at the second of the times 0 and 1 as done previously for the single 'temp' variable.
+    Otherwise columns without a time value are at time 0, and every variable needs a column at each time value, raises ValueError if not.
+    Columns without a name are named 'temp', 'temp_2', ...
 
-    Returns: none
+    Returns list of variable names, list of time values and list of (1-based variable index, 1-based time step) for each data column
     """
-    #update the node_id_roi_cropped property values for the nodes in nodes_list_roi_cropped    
-    #make a list of node_ids of nodes in roi, then order this list (let's call this 'ids_of_nodes_in_roi_ordered')
-    #node.node_id_roi_cropped will be equal to the index of the node_id in the array 'ids_of_nodes_in_roi_ordered'
-    
-    ids_of_nodes_in_roi = []
-    
-    for node in nodes_list_roi_cropped: 
-        ids_of_nodes_in_roi.append(node.node_id)
-            
-    ids_of_nodes_in_roi.sort()    
-    ids_of_nodes_in_roi_ordered = ids_of_nodes_in_roi
-    
-    for node in nodes_list_roi_cropped: 
-        node.node_id_roi_cropped = ids_of_nodes_in_roi_ordered.index(node.node_id) + 1
-    
-class Node: 
+
+    column_names = []
+    column_times = []
+
+    for i, header in enumerate(data_headers):
+
+        name, time = get_nodal_variable_name_and_time(header, i)
+
+        column_names.append(name)
+        column_times.append(time)
+
+    no_times = all(time is None for time in column_times)
+
+    if no_times:
+        time_values = [0.0, 1.0]
+        column_times = [1.0] * len(column_times)
+    else:
+        column_times = [0.0 if time is None else time for time in column_times]
+        time_values = sorted(set(column_times))
+
+    # the same variable at the same time twice gets its own variable
+    variable_names = []
+    columns_var_steps = []
+    seen_name_times = set()
+
+    for name, time in zip(column_names, column_times):
+
+        unique_name = name
+        copy_num = 1
+        while (unique_name, time) in seen_name_times:
+            copy_num += 1
+            unique_name = f'{name}_{copy_num}'
+        seen_name_times.add((unique_name, time))
+
+        if unique_name not in variable_names:
+            variable_names.append(unique_name)
+
+        columns_var_steps.append((variable_names.index(unique_name) + 1, time_values.index(time) + 1))
+
+    # Exodus files hold each variable at each time step, a step without a column would keep the netCDF fill value
+    if not no_times:
+        for var_index, name in enumerate(variable_names, start=1):
+            steps_of_variable = sorted(step for column_var_index, step in columns_var_steps if column_var_index == var_index)
+            if steps_of_variable != list(range(1, len(time_values) + 1)):
+                raise ValueError(f"nodal variable '{name}' has data at times {[time_values[step - 1] for step in steps_of_variable]} but the data columns "
+                                 f"have times {time_values}, every variable needs one column at each time")
+
+    return variable_names, time_values, columns_var_steps
+
+def get_roi_mask_from_coords(nodal_coords_array, bounds):
 
     """
-    Definition for Node object
+    Gets a boolean mask of the nodes inside the user-defined region-of-interest (ROI) from an array of nodal coordinates
+
+    Note: the bounds are inclusive, [[xmin, xmax], [ymin, ymax], [zmin, zmax]] for a (num_nodes, 3) array
+
+    Returns numpy array of booleans, True for nodes inside the ROI
     """
 
-    def __init__(self, node_id = 0, x_coord = 0, y_coord = 0, z_coord = 0, temp = 0):
-        
-        self.node_id = node_id
-        self.x_coord = x_coord
-        self.y_coord = y_coord
-        self.z_coord = z_coord
-        
-        self.temp = temp
-        
-        self.node_id_roi_cropped = node_id
+    roi_mask = np.ones(len(nodal_coords_array), dtype=bool)
+
+    for axis in range(0, nodal_coords_array.shape[1]):
+        roi_mask &= nodal_coords_array[:, axis] >= bounds[axis][0]
+        roi_mask &= nodal_coords_array[:, axis] <= bounds[axis][1]
+
+    return roi_mask
 
-        
+def get_new_node_id_map_from_roi_mask(roi_mask):
 
+    """
+    Gets new node ids after ROI cropping from a boolean ROI mask
+
+    Note: nodes inside the ROI are renumbered from 1 in ascending order of original node ids
+
+    Returns numpy array indexed by (original node id - 1) holding the new node id, or 0 for nodes outside the ROI
+    """
 
-    
+    new_node_id_map = np.cumsum(roi_mask, dtype=np.int64)
+    new_node_id_map[~roi_mask] = 0
 
-                       
+    return new_node_id_map
@@ -0,0 +1,521 @@
+'''
+ExoToComsol
+
+Copyright 2024 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains certain rights in this software.
+
+BSD 3-Clause License
+'''
+"""
+Exodus file backends
+
+Both backends give the same interface to util:
+
+reading: num_dimensions(), num_nodes(), get_coords(), get_elem_blk_ids(), get_elem_blk_info(), get_elem_connectivity(), get_times(),
+         get_node_variable_names(), get_node_variable_values(), get_elem_variable_names(), get_elem_variable_values(), close()
+writing: put_elem_blk_info(), put_coords(), put_elem_connectivity(), put_node_id_map(), put_elem_id_map(), put_times(),
+         put_node_variable_names(), put_node_variable_values(), close()
+
+Arrays are numpy arrays: coordinates are (num_nodes, dimension), connectivity is (num_elems, nodes per element) with 1-based node ids.
+The get_* and put_* functions of bulk data take an optional 0-based start (and count for reading) to access a contiguous range.
+
+'exodus3' uses the SEACAS exodus3 python module and the Exodus C library.
+'netcdf' reads and writes the Exodus II netCDF variables (coordx, connect1, vals_nod_var1, time_whole, ...) directly with netCDF4,
+so it needs neither the Exodus C library nor copies through ctypes, and reads only the requested range of each variable.
+"""
+import ctypes
+import importlib
+import importlib.util
+import numpy as np
+
+# the backend modules are imported on first use, so that importing util does not load the Exodus C library
+exodus3 = None
+netCDF4 = None
+
+EXODUS_BACKENDS = ('exodus3', 'netcdf')
+
+# backend used when none is given, exodus3 if it is installed
+_default_exodus_backend = 'exodus3' if importlib.util.find_spec('exodus3') is not None or importlib.util.find_spec('netCDF4') is None else 'netcdf'
+
+# netCDF format of files written by the netcdf backend, as written by the Exodus library by default
+NETCDF_FORMAT = 'NETCDF3_64BIT_OFFSET'
+
+# Exodus C API constants used for the partial (chunked) writes of the exodus3 backend
+_EX_ELEM_BLOCK = 1
+_EX_ELEM_MAP = 4
+_EX_NODE_MAP = 5
+_EX_NODAL = 14
+_EX_MAPS_INT64_API = 0x2000
+_EX_BULK_INT64_API = 0x8000
+
+def set_default_exodus_backend(backend):
+
+    """
+    Sets the backend used by open_exodus_file() and create_exodus_file() when no backend is given
+
+    Returns none
+    """
+
+    global _default_exodus_backend
+
+    if backend not in EXODUS_BACKENDS:
+        raise ValueError(f"unknown Exodus backend '{backend}', expected one of {EXODUS_BACKENDS}")
+
+    _default_exodus_backend = backend
+
+def get_default_exodus_backend():
+
+    """
+    Gets the backend used when none is given
+
+    Returns backend name
+    """
+
+    return _default_exodus_backend
+
+def open_exodus_file(file_path, backend = None):
+
+    """
+    Opens an Exodus file for reading
+
+    Returns Exodus file object of the backend
+    """
+
+    backend = _default_exodus_backend if backend is None else backend
+
+    if backend == 'exodus3':
+        return Exodus3_File(file_path)
+    elif backend == 'netcdf':
+        return NetCDF_Exodus_File(file_path)
+
+    raise ValueError(f"unknown Exodus backend '{backend}', expected one of {EXODUS_BACKENDS}")
+
+def create_exodus_file(file_path, num_dim, num_nodes, num_elem, num_elem_blk, num_assembly = 0, float_word_size = 8, backend = None):
+
+    """
+    Creates an Exodus file for writing
+
+    Note: float_word_size is the number of bytes of the floating point values stored in the file, 8 (double) or 4 (float). 
+    Values are passed to the put_* functions in any floating point type.
+
+    Returns Exodus file object of the backend
+    """
+
+    backend = _default_exodus_backend if backend is None else backend
+
+    if float_word_size not in (4, 8):
+        raise ValueError(f"float_word_size must be 4 or 8, got {float_word_size}")
+
+    init_params = {'num_dim': num_dim, 'num_nodes': num_nodes, 'num_elem': num_elem, 'num_elem_blk': num_elem_blk, 'num_assembly': num_assembly}
+
+    if backend == 'exodus3':
+        return Exodus3_File(file_path, init_params, float_word_size)
+    elif backend == 'netcdf':
+        return NetCDF_Exodus_File(file_path, init_params, float_word_size)
+
+    raise ValueError(f"unknown Exodus backend '{backend}', expected one of {EXODUS_BACKENDS}")
+
+def _import_backend_module(module_name, install_hint):
+
+    """
+    Imports the module of a backend on first use
+
+    Returns the module
+    """
+
+    try:
+        module = importlib.import_module(module_name)
+    except ImportError as error:
+        raise ImportError(f"the {module_name} module is needed for this Exodus backend, {install_hint}") from error
+
+    globals()[module_name] = module
+
+    return module
+
+def _get_range(start, count, length):
+
+    """
+    Gets the end of a range of entities, count None meaning up to the last one
+
+    Returns end index (exclusive)
+    """
+
+    return length if count is None else min(start + count, length)
+
+class Exodus3_File:
+
+    """
+    Exodus file read or written through the exodus3 module
+
+    Note: reads of a range read the whole array then slice it, partial writes call the ex_put_partial_* functions of the Exodus C library
+    """
+
+    def __init__(self, file_path, init_params = None, float_word_size = 8):
+
+        if exodus3 is None:
+            _import_backend_module('exodus3', "build it with SEACAS or use the netcdf backend instead")
+
+        if init_params is None:
+            self.exo = exodus3.exodus(file_path, mode='r', array_type='numpy')
+        else:
+            ex_pars = exodus3.ex_init_params(**init_params)
+            # the python module always computes in double, io_size sets the word size stored in the file
+            self.exo = exodus3.exodus(file=file_path, mode='w', array_type='numpy', init_params=ex_pars, io_size=float_word_size)
+            self._num_nodes = init_params['num_nodes']
+            self._num_elem = init_params['num_elem']
+            self._num_blk_elems = {}
+            self._node_variable_names = []
+
+    def close(self):
+        #import to close exo file otherwise data corruption can occur and difficult to debug
+        self.exo.close()
+
+    def num_dimensions(self):
+        return len(self.exo.get_coord_names())
+
+    def num_nodes(self):
+        return self.exo.num_nodes()
+
+    def get_coords(self, start = 0, count = None):
+        nodal_coords_array = np.column_stack(self.exo.get_coords())[:, :self.num_dimensions()]
+        return nodal_coords_array[start:_get_range(start, count, len(nodal_coords_array))]
+
+    def get_elem_blk_ids(self):
+        return list(self.exo.get_elem_blk_ids())
+
+    def get_elem_blk_info(self, elem_blk_id):
+        _, num_blk_elems, num_elem_nodes, _ = self.exo.elem_blk_info(elem_blk_id)
+        return int(num_blk_elems), int(num_elem_nodes)
+
+    def get_elem_connectivity(self, elem_blk_id, start = 0, count = None):
+        elem_conn, num_blk_elems, num_elem_nodes = self.exo.get_elem_connectivity(elem_blk_id)
+        return np.asarray(elem_conn).reshape(num_blk_elems, num_elem_nodes)[start:_get_range(start, count, num_blk_elems)]
+
+    def get_times(self):
+        return np.asarray(self.exo.get_times())
+
+    def get_node_variable_names(self):
+        return list(self.exo.get_node_variable_names())
+
+    def get_node_variable_values(self, name, step, start = 0, count = None):
+        values = np.asarray(self.exo.get_node_variable_values(name, step))
+        return values[start:_get_range(start, count, len(values))]
+
+    def get_elem_variable_names(self):
+        return list(self.exo.get_element_variable_names())
+
+    def get_elem_variable_values(self, elem_blk_id, name, step, start = 0, count = None):
+
+        var_index = self.get_elem_variable_names().index(name)
+        if not self.exo.get_element_variable_truth_table(elem_blk_id)[var_index]:
+            raise ValueError(f"element variable '{name}' is not defined on element block {elem_blk_id}")
+
+        values = np.asarray(self.exo.get_element_variable_values(elem_blk_id, name, step))
+        return values[start:_get_range(start, count, len(values))]
+
+    def put_elem_blk_info(self, elem_blk_id, elem_type, num_blk_elems, num_elem_nodes):
+        self._num_blk_elems[elem_blk_id] = num_blk_elems
+        self.exo.put_elem_blk_info(elem_blk_id=elem_blk_id, elem_type = elem_type, num_blk_elems = num_blk_elems, num_elem_nodes = num_elem_nodes, num_elem_attrs = 0)
+
+    def put_coords(self, nodal_coords_array, start = 0):
+
+        if len(nodal_coords_array) == 0:
+            return
+
+        if start == 0 and len(nodal_coords_array) == self._num_nodes:
+            # the exodus3 module is called with double arrays, compact float arrays are converted
+            coord_columns = [np.ascontiguousarray(nodal_coords_array[:, axis], dtype=np.float64) for axis in range(0, nodal_coords_array.shape[1])]
+            coord_columns += [np.zeros(len(nodal_coords_array))] * (3 - len(coord_columns))
+            self.exo.put_coords(*coord_columns)
+            return
+
+        coord_columns = [np.ascontiguousarray(nodal_coords_array[:, axis], dtype=np.float64) for axis in range(0, nodal_coords_array.shape[1])]
+        coord_pointers = [column.ctypes.data_as(ctypes.c_void_p) for column in coord_columns] + [None] * (3 - len(coord_columns))
+
+        error_code = exodus3.EXODUS_LIB.ex_put_partial_coord(self.exo.fileId, ctypes.c_int64(start + 1), ctypes.c_int64(len(nodal_coords_array)), *coord_pointers)
+
+        if error_code < 0:
+            raise Exception(f"ERROR: failed to write coordinates of nodes {start + 1} to {start + len(nodal_coords_array)}")
+
+    def put_elem_connectivity(self, elem_blk_id, elem_conn_array, start = 0):
+
+        if len(elem_conn_array) == 0:
+            return
+
+        if start == 0 and len(elem_conn_array) == self._num_blk_elems[elem_blk_id]:
+            self.exo.put_elem_connectivity(elem_blk_id, np.asarray(elem_conn_array).ravel())
+            return
+
+        elem_conn = self._int_array(elem_conn_array, _EX_BULK_INT64_API)
+
+        error_code = exodus3.EXODUS_LIB.ex_put_partial_conn(self.exo.fileId, _EX_ELEM_BLOCK, ctypes.c_int64(elem_blk_id), ctypes.c_int64(start + 1), ctypes.c_int64(len(elem_conn)),
+                                                            elem_conn.ctypes.data_as(ctypes.c_void_p), None, None)
+
+        if error_code < 0:
+            raise Exception(f"ERROR: failed to write connectivity of elements {start + 1} to {start + len(elem_conn)}")
+
+    def put_node_id_map(self, node_id_map, start = 0):
+        if start == 0 and len(node_id_map) == self._num_nodes:
+            self.exo.put_node_id_map(node_id_map)
+        else:
+            self._put_id_map(_EX_NODE_MAP, node_id_map, start)
+
+    def put_elem_id_map(self, elem_id_map, start = 0):
+        if start == 0 and len(elem_id_map) == self._num_elem:
+            self.exo.put_elem_id_map(elem_id_map)
+        else:
+            self._put_id_map(_EX_ELEM_MAP, elem_id_map, start)
+
+    def put_times(self, time_values):
+        for step, time_value in enumerate(time_values, 1):
+            self.exo.put_time(step = step, value = time_value)
+
+    def put_node_variable_names(self, variable_names):
+
+        self._node_variable_names = list(variable_names)
+
+        self.exo.set_node_variable_number(number = len(variable_names))
+
+        for index, name in enumerate(variable_names, 1):
+            self.exo.put_node_variable_name(name = name, index = index)
+
+    def put_node_variable_values(self, var_index, step, values, start = 0):
+
+        if len(values) == 0:
+            return
+
+        if start == 0 and len(values) == self._num_nodes:
+            self.exo.put_node_variable_values(name = self._node_variable_names[var_index - 1], step = step, values = np.ascontiguousarray(values, dtype=np.float64))
+            return
+
+        values = np.ascontiguousarray(values, dtype=np.float64)
+
+        error_code = exodus3.EXODUS_LIB.ex_put_partial_var(self.exo.fileId, step, _EX_NODAL, var_index, ctypes.c_int64(1), ctypes.c_int64(start + 1), ctypes.c_int64(len(values)),
+                                                           values.ctypes.data_as(ctypes.c_void_p))
+
+        if error_code < 0:
+            raise Exception(f"ERROR: failed to write nodal variable {var_index} at step {step} for nodes {start + 1} to {start + len(values)}")
+
+    def _put_id_map(self, map_type, id_map, start):
+
+        if len(id_map) == 0:
+            return
+
+        id_map = self._int_array(id_map, _EX_MAPS_INT64_API)
+
+        error_code = exodus3.EXODUS_LIB.ex_put_partial_id_map(self.exo.fileId, map_type, ctypes.c_int64(start + 1), ctypes.c_int64(len(id_map)), id_map.ctypes.data_as(ctypes.c_void_p))
+
+        if error_code < 0:
+            raise Exception(f"ERROR: failed to write id map entries {start + 1} to {start + len(id_map)}")
+
+    def _int_array(self, values, int64_api_flag):
+
+        """
+        Converts integer values to a contiguous array of the integer size the Exodus file was opened with
+
+        Returns numpy array of int32 or int64
+        """
+
+        if exodus3.EXODUS_LIB.ex_int64_status(self.exo.fileId) & int64_api_flag:
+            return np.ascontiguousarray(values, dtype=np.int64)
+
+        return np.ascontiguousarray(values, dtype=np.int32)
+
+class NetCDF_Exodus_File:
+
+    """
+    Exodus file read or written directly as a netCDF dataset
+
+    Note: files written have the layout written by the Exodus library (file_size 1, one coordinate and one nodal variable array each)
+    """
+
+    def __init__(self, file_path, init_params = None, float_word_size = 8):
+
+        if netCDF4 is None:
+            _import_backend_module('netCDF4', "install it with 'pip install netCDF4'")
+
+        if init_params is None:
+            self.dataset = netCDF4.Dataset(file_path, 'r')
+        else:
+            self.dataset = netCDF4.Dataset(file_path, 'w', format=NETCDF_FORMAT)
+            self._float_type = 'f4' if float_word_size == 4 else 'f8'
+            self._define_file(init_params)
+
+        self.dataset.set_auto_maskandscale(False)
+
+    def _define_file(self, init_params):
+
+        dataset = self.dataset
+
+        dataset.api_version = np.float32(8.19)
+        dataset.version = np.float32(8.19)
+        dataset.floating_point_word_size = np.int32(4 if self._float_type == 'f4' else 8)
+        dataset.file_size = np.int32(1)
+        dataset.maximum_name_length = np.int32(32)
+        dataset.int64_status = np.int32(0)
+        dataset.title = ''
+
+        dataset.createDimension('len_name', 256)
+        dataset.createDimension('time_step', None)
+        dataset.createDimension('num_dim', init_params['num_dim'])
+        dataset.createDimension('num_nodes', init_params['num_nodes'])
+        dataset.createDimension('num_elem', init_params['num_elem'])
+        dataset.createDimension('num_el_blk', init_params['num_elem_blk'])
+
+        dataset.createVariable('time_whole', self._float_type, ('time_step',))
+        dataset.createVariable('eb_status', 'i4', ('num_el_blk',))[:] = 0
+        eb_prop1 = dataset.createVariable('eb_prop1', 'i4', ('num_el_blk',))
+        eb_prop1.setncattr('name', 'ID')
+        eb_prop1[:] = 0
+
+        for axis_name in 'xyz'[:init_params['num_dim']]:
+            dataset.createVariable('coord' + axis_name, self._float_type, ('num_nodes',))
+
+        dataset.createVariable('eb_names', 'S1', ('num_el_blk', 'len_name'))
+        coor_names = dataset.createVariable('coor_names', 'S1', ('num_dim', 'len_name'))
+        coor_names[:] = netCDF4.stringtochar(np.array([axis_name for axis_name in 'xyz'[:init_params['num_dim']]], dtype='S256'))
+
+        dataset.createVariable('node_num_map', 'i4', ('num_nodes',))
+        dataset.createVariable('elem_num_map', 'i4', ('num_elem',))
+
+    def close(self):
+        self.dataset.close()
+
+    def num_dimensions(self):
+        return len(self.dataset.dimensions['num_dim'])
+
+    def num_nodes(self):
+        return len(self.dataset.dimensions['num_nodes']) if 'num_nodes' in self.dataset.dimensions else 0
+
+    def get_coords(self, start = 0, count = None):
+
+        end = _get_range(start, count, self.num_nodes())
+
+        if 'coord' in self.dataset.variables:
+            return np.asarray(self.dataset.variables['coord'][:, start:end]).T
+
+        return np.column_stack([self.dataset.variables['coord' + axis_name][start:end] for axis_name in 'xyz'[:self.num_dimensions()]])
+
+    def get_elem_blk_ids(self):
+        return [int(elem_blk_id) for elem_blk_id in self.dataset.variables['eb_prop1'][:]]
+
+    def get_elem_blk_info(self, elem_blk_id):
+        num_blk_elems, num_elem_nodes = self.dataset.variables[f'connect{self._get_elem_blk_index(elem_blk_id)}'].shape
+        return num_blk_elems, num_elem_nodes
+
+    def get_elem_connectivity(self, elem_blk_id, start = 0, count = None):
+
+        elem_conn = self.dataset.variables[f'connect{self._get_elem_blk_index(elem_blk_id)}']
+
+        return np.asarray(elem_conn[start:_get_range(start, count, elem_conn.shape[0])])
+
+    def get_times(self):
+        return np.asarray(self.dataset.variables['time_whole'][:]) if 'time_whole' in self.dataset.variables else np.zeros(0)
+
+    def get_node_variable_names(self):
+
+        if 'name_nod_var' not in self.dataset.variables:
+            return []
+
+        return [str(name) for name in netCDF4.chartostring(self.dataset.variables['name_nod_var'][:])]
+
+    def get_node_variable_values(self, name, step, start = 0, count = None):
+
+        var_index = self.get_node_variable_names().index(name) + 1
+        end = _get_range(start, count, self.num_nodes())
+
+        if 'vals_nod_var' in self.dataset.variables:
+            return np.asarray(self.dataset.variables['vals_nod_var'][step - 1, var_index - 1, start:end])
+
+        return np.asarray(self.dataset.variables[f'vals_nod_var{var_index}'][step - 1, start:end])
+
+    def get_elem_variable_names(self):
+
+        if 'name_elem_var' not in self.dataset.variables:
+            return []
+
+        return [str(name) for name in netCDF4.chartostring(self.dataset.variables['name_elem_var'][:])]
+
+    def get_elem_variable_values(self, elem_blk_id, name, step, start = 0, count = None):
+
+        var_index = self.get_elem_variable_names().index(name) + 1
+        elem_blk_index = self._get_elem_blk_index(elem_blk_id)
+
+        # variables left out by the truth table have no array in the file
+        values = self.dataset.variables.get(f'vals_elem_var{var_index}eb{elem_blk_index}')
+        if values is None:
+            raise ValueError(f"element variable '{name}' is not defined on element block {elem_blk_id}")
+
+        return np.asarray(values[step - 1, start:_get_range(start, count, values.shape[1])])
+
+    def put_elem_blk_info(self, elem_blk_id, elem_type, num_blk_elems, num_elem_nodes):
+
+        dataset = self.dataset
+
+        # first block without an id
+        elem_blk_index = int(np.flatnonzero(dataset.variables['eb_prop1'][:] == 0)[0]) + 1
+
+        dataset.variables['eb_prop1'][elem_blk_index - 1] = elem_blk_id
+        dataset.variables['eb_status'][elem_blk_index - 1] = 1 if num_blk_elems > 0 else 0
+
+        dataset.createDimension(f'num_el_in_blk{elem_blk_index}', num_blk_elems)
+        dataset.createDimension(f'num_nod_per_el{elem_blk_index}', num_elem_nodes)
+
+        elem_conn = dataset.createVariable(f'connect{elem_blk_index}', 'i4', (f'num_el_in_blk{elem_blk_index}', f'num_nod_per_el{elem_blk_index}'))
+        elem_conn.setncattr('elem_type', elem_type.upper())
+
+    def put_coords(self, nodal_coords_array, start = 0):
+
+        if len(nodal_coords_array) == 0:
+            return
+
+        end = start + len(nodal_coords_array)
+
+        for axis, axis_name in enumerate('xyz'[:self.num_dimensions()]):
+            self.dataset.variables['coord' + axis_name][start:end] = nodal_coords_array[:, axis]
+
+    def put_elem_connectivity(self, elem_blk_id, elem_conn_array, start = 0):
+
+        if len(elem_conn_array) == 0:
+            return
+
+        elem_conn = self.dataset.variables[f'connect{self._get_elem_blk_index(elem_blk_id)}']
+
+        elem_conn[start:start + len(elem_conn_array)] = np.asarray(elem_conn_array).reshape(len(elem_conn_array), -1)
+
+    def put_node_id_map(self, node_id_map, start = 0):
+        if len(node_id_map) > 0:
+            self.dataset.variables['node_num_map'][start:start + len(node_id_map)] = node_id_map
+
+    def put_elem_id_map(self, elem_id_map, start = 0):
+        if len(elem_id_map) > 0:
+            self.dataset.variables['elem_num_map'][start:start + len(elem_id_map)] = elem_id_map
+
+    def put_times(self, time_values):
+        self.dataset.variables['time_whole'][0:len(time_values)] = np.asarray(time_values)
+
+    def put_node_variable_names(self, variable_names):
+
+        dataset = self.dataset
+
+        dataset.createDimension('num_nod_var', len(variable_names))
+
+        name_nod_var = dataset.createVariable('name_nod_var', 'S1', ('num_nod_var', 'len_name'))
+        name_nod_var[:] = netCDF4.stringtochar(np.array(variable_names, dtype='S256'))
+
+        for var_index in range(1, len(variable_names) + 1):
+            dataset.createVariable(f'vals_nod_var{var_index}', self._float_type, ('time_step', 'num_nodes'))
+
+    def put_node_variable_values(self, var_index, step, values, start = 0):
+        if len(values) > 0:
+            self.dataset.variables[f'vals_nod_var{var_index}'][step - 1, start:start + len(values)] = values
+
+    def _get_elem_blk_index(self, elem_blk_id):
+
+        """
+        Gets the 1-based position of an element block in the file, used in the names of its netCDF variables
+
+        Returns element block index
+        """
+
+        return self.get_elem_blk_ids().index(elem_blk_id) + 1
@@ -0,0 +1,216 @@
+'''
+ExoToComsol
+
+Copyright 2024 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains certain rights in this software.
+
+BSD 3-Clause License
+'''
+import queue
+import threading
+import time
+
+# number of items each queue between two stages holds before the stage filling it waits
+DEFAULT_QUEUE_DEPTH = 2
+
+# item passed down the queues after the last item of the source
+_END_OF_ITEMS = object()
+
+# seconds between checks of the stop event while waiting on a queue
+_POLL_SECONDS = 0.1
+
+class Pipeline_Stage:
+
+    """
+    Definition for a stage of a pipeline and its counters
+
+    Note: busy time is spent in the stage's own work, waiting for input time is spent on an empty input queue
+    and waiting for output time on a full output queue
+    """
+
+    def __init__(self, name, function = None):
+
+        self.name = name
+        self.function = function
+
+        self.num_items = 0
+        self.busy_seconds = 0.0
+        self.wait_input_seconds = 0.0
+        self.wait_output_seconds = 0.0
+        self.max_input_queue_size = 0
+
+    def get_counters(self):
+
+        return {'name': self.name, 'num_items': self.num_items, 'busy_seconds': self.busy_seconds,
+                'wait_input_seconds': self.wait_input_seconds, 'wait_output_seconds': self.wait_output_seconds,
+                'max_input_queue_size': self.max_input_queue_size}
+
+def run_pipeline(source, stages, sink, queue_depth = DEFAULT_QUEUE_DEPTH, print_counters = True):
+
+    """
+    Runs a pipeline of stages connected by bounded queues, each stage in its own thread, so that reading, computing and writing overlap
+
+    Note: source is (name, iterable) and is iterated in a background thread, stages is a list of (name, function) each called on
+    the items of the previous stage in a background thread, sink is (name, function) called on the items of the last stage in the
+    calling thread. Items keep their order. queue_depth is one depth for all queues or a list with the depth of each of the
+    len(stages) + 1 queues. The first error of any stage stops all stages and is raised again.
+    The stages are threads of one process: file reads and writes, and numpy work on whole arrays, release the global interpreter lock
+    and overlap with the other stages, while pure Python work such as str.split(), float() parsing and str.format() holds it, 
+    so stages doing mostly that take turns rather than run in parallel.
+
+    Returns list of the counters of each stage
+    """
+
+    pipeline_stages = [Pipeline_Stage(source[0])] + [Pipeline_Stage(name, function) for name, function in stages] + [Pipeline_Stage(sink[0], sink[1])]
+
+    queue_depths = [queue_depth] * (len(stages) + 1) if isinstance(queue_depth, int) else list(queue_depth)
+    if len(queue_depths) != len(stages) + 1:
+        raise ValueError(f"queue_depth must be an int or a list of {len(stages) + 1} depths")
+
+    queues = [queue.Queue(maxsize = depth) for depth in queue_depths]
+
+    stop_event = threading.Event()
+    errors = []
+
+    threads = [threading.Thread(target = _run_source, args = (pipeline_stages[0], iter(source[1]), queues[0], stop_event, errors), daemon = True)]
+    threads += [threading.Thread(target = _run_stage, args = (pipeline_stages[i], queues[i-1], queues[i], stop_event, errors), daemon = True)
+                for i in range(1, len(stages) + 1)]
+
+    for thread in threads:
+        thread.start()
+
+    try:
+        _run_stage(pipeline_stages[-1], queues[-1], None, stop_event, errors)
+    finally:
+        stop_event.set()
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+
+    counters = [stage.get_counters() for stage in pipeline_stages]
+
+    if print_counters:
+        print_pipeline_counters(counters)
+
+    return counters
+
+def _run_source(stage, items, output_queue, stop_event, errors):
+
+    """
+    Puts the items of the source of a pipeline into its output queue
+
+    Returns none
+    """
+
+    try:
+        while not stop_event.is_set():
+            start_time = time.perf_counter()
+            item = next(items, _END_OF_ITEMS)
+            stage.busy_seconds += time.perf_counter() - start_time
+
+            if not _put(stage, output_queue, item, stop_event) or item is _END_OF_ITEMS:
+                return
+
+            stage.num_items += 1
+
+    except Exception as error:
+        _stop_with_error(error, stop_event, errors)
+
+    finally:
+        # a generator stopped early closes its files
+        if hasattr(items, 'close'):
+            items.close()
+
+def _run_stage(stage, input_queue, output_queue, stop_event, errors):
+
+    """
+    Calls the function of a stage on each item of its input queue and puts the results into its output queue, if it has one
+
+    Returns none
+    """
+
+    try:
+        while not stop_event.is_set():
+            item = _get(stage, input_queue, stop_event)
+            if item is _END_OF_ITEMS:
+                if output_queue is not None:
+                    _put(stage, output_queue, item, stop_event)
+                return
+
+            start_time = time.perf_counter()
+            result = stage.function(item)
+            stage.busy_seconds += time.perf_counter() - start_time
+            stage.num_items += 1
+
+            if output_queue is not None and not _put(stage, output_queue, result, stop_event):
+                return
+
+    except Exception as error:
+        _stop_with_error(error, stop_event, errors)
+
+def _get(stage, input_queue, stop_event):
+
+    """
+    Gets the next item of a queue, waiting until there is one or the pipeline is stopped
+
+    Returns item, the end of items marker if the pipeline is stopped
+    """
+
+    stage.max_input_queue_size = max(stage.max_input_queue_size, input_queue.qsize())
+
+    start_time = time.perf_counter()
+    try:
+        while True:
+            try:
+                return input_queue.get(timeout = _POLL_SECONDS)
+            except queue.Empty:
+                if stop_event.is_set():
+                    return _END_OF_ITEMS
+    finally:
+        stage.wait_input_seconds += time.perf_counter() - start_time
+
+def _put(stage, output_queue, item, stop_event):
+
+    """
+    Puts an item into a queue, waiting until there is space or the pipeline is stopped
+
+    Returns True if the item was put
+    """
+
+    start_time = time.perf_counter()
+    try:
+        while True:
+            try:
+                output_queue.put(item, timeout = _POLL_SECONDS)
+                return True
+            except queue.Full:
+                if stop_event.is_set():
+                    return False
+    finally:
+        stage.wait_output_seconds += time.perf_counter() - start_time
+
+def _stop_with_error(error, stop_event, errors):
+
+    """
+    Records the error of a stage and stops all stages
+
+    Returns none
+    """
+
+    errors.append(error)
+    stop_event.set()
+
+def print_pipeline_counters(counters):
+
+    """
+    Prints the counters of the stages of a pipeline
+
+    Returns none
+    """
+
+    for stage_counters in counters:
+        print(f"Pipeline stage {stage_counters['name']}: {stage_counters['num_items']} items, busy {stage_counters['busy_seconds']:.2f} s, "
+              f"waiting for input {stage_counters['wait_input_seconds']:.2f} s, waiting for output {stage_counters['wait_output_seconds']:.2f} s, "
+              f"max input queue size {stage_counters['max_input_queue_size']}")
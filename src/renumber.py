@@ -0,0 +1,288 @@
+'''
+ExoToComsol
+
+Copyright 2024 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains certain rights in this software.
+
+BSD 3-Clause License
+'''
+import numpy as np
+
+RENUMBERING_METHODS = ('rcm', 'hilbert', 'morton')
+
+def renumber_nodes(nodal_coords_array, elem_conn_array, nodal_sim_data, method):
+
+    """
+    Renumbers the nodes of a mesh for cache locality and applies the new numbering to coordinates, connectivity and nodal data
+
+    Note: method is 'rcm' (reverse Cuthill-McKee on the node graph), 'hilbert' or 'morton' (ordering of the coordinates along a space-filling curve).
+    nodal_coords_array is (num_nodes, dimension), elem_conn_array is (num_elems, nodes per element) with 1-based node ids,
+    nodal_sim_data has one row per node. The bandwidth of the connectivity before and after renumbering is printed.
+
+    Returns renumbered coordinates, connectivity and nodal data arrays, and the permutation (0-based old node index of each new node)
+    """
+
+    num_nodes = len(nodal_coords_array)
+
+    if method == 'rcm':
+        permutation = get_rcm_permutation(elem_conn_array, num_nodes)
+    elif method in ('hilbert', 'morton'):
+        permutation = get_space_filling_curve_permutation(nodal_coords_array, method)
+    else:
+        raise ValueError(f"unknown node renumbering method '{method}', expected one of {RENUMBERING_METHODS}")
+
+    old_to_new_node_ids = get_old_to_new_node_ids(permutation)
+
+    elem_conn_renumbered = old_to_new_node_ids[elem_conn_array - 1]
+
+    print(f"Node renumbering ({method}): bandwidth {get_bandwidth(elem_conn_array)} before, {get_bandwidth(elem_conn_renumbered)} after")
+
+    return nodal_coords_array[permutation], elem_conn_renumbered, nodal_sim_data[permutation], permutation
+
+def get_memory_estimate(num_nodes, num_elems, num_nodes_per_elem, dimension, method):
+
+    """
+    Estimates the memory of the temporary arrays of a renumbering, before the renumbered copies of the mesh arrays are made
+
+    Note: 'rcm' builds the node graph from about five int64 arrays of one entry per pair of nodes of each element,
+    the space-filling curves hold a few uint64 arrays per axis of one entry per node
+
+    Returns number of bytes
+    """
+
+    if method == 'rcm':
+        return 5 * num_elems * num_nodes_per_elem * (num_nodes_per_elem - 1) * np.dtype(np.int64).itemsize
+
+    return (2 * dimension + 6) * num_nodes * np.dtype(np.uint64).itemsize
+
+def get_old_to_new_node_ids(permutation):
+
+    """
+    Inverts a node permutation
+
+    Returns numpy array indexed by (old node id - 1) holding the 1-based new node id
+    """
+
+    old_to_new_node_ids = np.empty(len(permutation), dtype=np.int64)
+    old_to_new_node_ids[permutation] = np.arange(1, len(permutation) + 1)
+
+    return old_to_new_node_ids
+
+def get_bandwidth(elem_conn_array):
+
+    """
+    Gets the bandwidth of the node adjacency matrix of a mesh, i.e. the largest difference of node ids within one element
+
+    Returns bandwidth
+    """
+
+    if len(elem_conn_array) == 0:
+        return 0
+
+    return int((elem_conn_array.max(axis=1) - elem_conn_array.min(axis=1)).max())
+
+def get_node_adjacency(elem_conn_array, num_nodes):
+
+    """
+    Gets the node graph of a mesh, two nodes being adjacent if they share an element, in compressed sparse row form
+
+    Returns offsets array of length num_nodes + 1 and array of 0-based neighbour indices
+    """
+
+    num_nodes_per_elem = elem_conn_array.shape[1]
+    local_pairs = np.array([(i, j) for i in range(num_nodes_per_elem) for j in range(num_nodes_per_elem) if i != j])
+
+    sources = (elem_conn_array[:, local_pairs[:, 0]] - 1).ravel()
+    targets = (elem_conn_array[:, local_pairs[:, 1]] - 1).ravel()
+
+    # one entry per distinct edge, sorted by source node
+    edge_keys = np.sort(sources.astype(np.int64) * num_nodes + targets)
+    edge_keys = edge_keys[np.concatenate(([True], edge_keys[1:] != edge_keys[:-1]))]
+    sources = edge_keys // num_nodes
+    neighbours = edge_keys % num_nodes
+
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(sources, minlength=num_nodes))
+
+    return offsets, neighbours
+
+def _get_neighbours_of(nodes, offsets, neighbours):
+
+    """
+    Gets the neighbours of a set of nodes from the compressed sparse row node graph
+
+    Returns array of neighbours and array of the position in nodes of the node each neighbour belongs to
+    """
+
+    counts = offsets[nodes + 1] - offsets[nodes]
+    owner_positions = np.repeat(np.arange(len(nodes)), counts)
+    # position of each gathered entry inside the neighbour list of its node
+    within_owner = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    return neighbours[offsets[nodes][owner_positions] + within_owner], owner_positions
+
+def _get_bfs_levels(start_node, offsets, neighbours, degrees, visited):
+
+    """
+    Breadth-first search of the node graph, one vectorized step per level, visiting the neighbours of each level
+    in the order of their first visited neighbour and then by increasing degree (Cuthill-McKee order)
+
+    Note: visited is updated in place
+
+    Returns list of arrays of the nodes of each level in visiting order
+    """
+
+    levels = [np.array([start_node], dtype=np.int64)]
+    visited[start_node] = True
+
+    while True:
+        candidates, owner_positions = _get_neighbours_of(levels[-1], offsets, neighbours)
+        unvisited = ~visited[candidates]
+        candidates, owner_positions = candidates[unvisited], owner_positions[unvisited]
+
+        if len(candidates) == 0:
+            return levels
+
+        order = np.lexsort((candidates, degrees[candidates], owner_positions))
+        candidates = candidates[order]
+
+        # keep the first occurrence of each node
+        _, first_occurrence = np.unique(candidates, return_index=True)
+        next_level = candidates[np.sort(first_occurrence)]
+
+        visited[next_level] = True
+        levels.append(next_level)
+
+def get_rcm_permutation(elem_conn_array, num_nodes):
+
+    """
+    Gets the reverse Cuthill-McKee ordering of the nodes of a mesh
+
+    Note: each connected component starts from a pseudo-peripheral node found by repeated breadth-first searches from a node of minimum degree
+
+    Returns permutation array (0-based old node index of each new node)
+    """
+
+    offsets, neighbours = get_node_adjacency(elem_conn_array, num_nodes)
+    degrees = np.diff(offsets)
+
+    visited = np.zeros(num_nodes, dtype=bool)
+    ordering = []
+
+    # nodes not used by any element, numbered last once the ordering is reversed
+    isolated_nodes = np.flatnonzero(degrees == 0)
+    visited[isolated_nodes] = True
+    ordering.append(isolated_nodes)
+
+    nodes_by_degree = np.argsort(degrees, kind='stable')
+    next_start = 0
+
+    while True:
+        while next_start < num_nodes and visited[nodes_by_degree[next_start]]:
+            next_start += 1
+        if next_start == num_nodes:
+            break
+
+        start_node = nodes_by_degree[next_start]
+        levels = _get_bfs_levels(start_node, offsets, neighbours, degrees, visited)
+
+        # move the start node to the far end of the component until the number of levels stops growing
+        for _ in range(0, 5):
+            last_level = levels[-1]
+            candidate_start = last_level[np.argmin(degrees[last_level])]
+
+            # both searches visit the same connected component
+            visited[np.concatenate(levels)] = False
+            candidate_levels = _get_bfs_levels(candidate_start, offsets, neighbours, degrees, visited)
+
+            if len(candidate_levels) <= len(levels):
+                break
+
+            start_node, levels = candidate_start, candidate_levels
+
+        ordering.append(np.concatenate(levels))
+
+    cuthill_mckee_ordering = np.concatenate(ordering)
+
+    return cuthill_mckee_ordering[::-1]
+
+def get_space_filling_curve_permutation(nodal_coords_array, curve = 'hilbert', bits = 21):
+
+    """
+    Gets the ordering of the nodes along a Hilbert or Morton (Z-order) space-filling curve through their coordinates
+
+    Note: coordinates are quantized to 'bits' bits per axis over the bounding box of the mesh, bits * dimension must not exceed 63
+
+    Returns permutation array (0-based old node index of each new node)
+    """
+
+    dimension = nodal_coords_array.shape[1]
+
+    lower = nodal_coords_array.min(axis=0)
+    extent = nodal_coords_array.max(axis=0) - lower
+    extent[extent == 0] = 1.0
+
+    max_quantized = (1 << bits) - 1
+    quantized = ((nodal_coords_array - lower) / extent * max_quantized).astype(np.uint64)
+    axes = [quantized[:, axis].copy() for axis in range(0, dimension)]
+
+    if curve == 'hilbert':
+        axes = _get_hilbert_transpose(axes, bits)
+    elif curve != 'morton':
+        raise ValueError(f"unknown space-filling curve '{curve}', expected 'hilbert' or 'morton'")
+
+    curve_index = _interleave_bits(axes, bits)
+
+    return np.argsort(curve_index, kind='stable')
+
+def _get_hilbert_transpose(axes, bits):
+
+    """
+    Converts quantized coordinates to the transposed Hilbert index (J. Skilling, Programming the Hilbert curve, 2004), vectorized over all nodes
+
+    Returns list of one uint64 array per axis
+    """
+
+    dimension = len(axes)
+    one = np.uint64(1)
+
+    # inverse undo
+    q = one << np.uint64(bits - 1)
+    while q > one:
+        p = q - one
+        for i in range(0, dimension):
+            has_bit = (axes[i] & q) != 0
+            t = (axes[0] ^ axes[i]) & p
+            axes[0] = np.where(has_bit, axes[0] ^ p, axes[0] ^ t)
+            axes[i] = np.where(has_bit, axes[i], axes[i] ^ t)
+        q >>= one
+
+    # Gray encode
+    for i in range(1, dimension):
+        axes[i] = axes[i] ^ axes[i-1]
+
+    t = np.zeros_like(axes[0])
+    q = one << np.uint64(bits - 1)
+    while q > one:
+        t = np.where((axes[dimension-1] & q) != 0, t ^ (q - one), t)
+        q >>= one
+
+    return [axis ^ t for axis in axes]
+
+def _interleave_bits(axes, bits):
+
+    """
+    Interleaves the bits of one integer per axis into a single key, most significant bits first with the first axis leading
+
+    Returns uint64 array of keys
+    """
+
+    dimension = len(axes)
+    one = np.uint64(1)
+    keys = np.zeros_like(axes[0])
+
+    for bit in range(bits - 1, -1, -1):
+        for i in range(0, dimension):
+            keys = (keys << one) | ((axes[i] >> np.uint64(bit)) & one)
+
+    return keys
@@ -0,0 +1,653 @@
+'''
+ExoToComsol
+
+Copyright 2024 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains certain rights in this software.
+
+BSD 3-Clause License
+'''
+import abc
+
+import numpy as np
+
+from src import Node
+
+# Regions of interest (ROI) evaluated as numpy expressions over arrays of coordinates.
+#
+# Regions are combined with & (intersection), | (union) and ~ (complement), e.g.
+#   roi.Sphere([0, 0, 0], 0.5) & roi.Half_Space([0, 0, 0], [0, 0, 1])
+# Wherever the conversions take bounds they also take a region, or its dictionary form (see get_region_from_dict()).
+
+ELEM_INCLUSION_POLICIES = ('all', 'any', 'centroid', 'clip')
+
+# number of points a region is evaluated on at a time, so that the temporary arrays of composed regions stay small
+ROI_CHUNK_SIZE = 65536
+
+# relative tolerance of clipping: a node closer to a plane than CLIP_TOLERANCE times the longest edge of its elements is on the plane, 
+# and a piece of a cut element whose volume is below CLIP_VOLUME_TOLERANCE times the cube of its longest edge is a sliver and dropped
+CLIP_TOLERANCE = 1e-8
+CLIP_VOLUME_TOLERANCE = 1e-12
+
+class Region(abc.ABC):
+
+    """
+    Definition for a region of interest, the base of all shapes and their combinations
+
+    Note: subclasses implement _get_chunk_mask() for a (num_points, dimension) array of at most ROI_CHUNK_SIZE points.
+    Points on the boundary of a shape are inside.
+    """
+
+    def get_mask(self, coords):
+
+        """
+        Gets a boolean mask of the points inside the region
+
+        Returns numpy array of booleans, True for points inside the region
+        """
+
+        coords = np.asarray(coords)
+        mask = np.empty(len(coords), dtype=bool)
+
+        for start in range(0, len(coords), ROI_CHUNK_SIZE):
+            mask[start:start + ROI_CHUNK_SIZE] = self._get_chunk_mask(coords[start:start + ROI_CHUNK_SIZE])
+
+        return mask
+
+    @abc.abstractmethod
+    def _get_chunk_mask(self, coords):
+
+        """
+        Gets a boolean mask of the points of a chunk of at most ROI_CHUNK_SIZE points inside the region
+
+        Returns numpy array of booleans
+        """
+
+    def get_half_spaces(self):
+
+        """
+        Gets the planes bounding the region, needed to clip elements at its boundary
+
+        Returns Half_Spaces region equal to this region
+        """
+
+        raise ValueError(f"{type(self).__name__} is not bounded by planes, clipping needs a box, an oriented box, half-spaces or their intersection")
+
+    def __and__(self, other):
+
+        return Intersection(self, other)
+
+    def __or__(self, other):
+
+        return Union(self, other)
+
+    def __invert__(self):
+
+        return Complement(self)
+
+class Box(Region):
+
+    """
+    Definition for an axis-aligned box given by bounds [[xmin, xmax], [ymin, ymax], [zmin, zmax]], the ROI of the original conversions
+    """
+
+    def __init__(self, bounds):
+
+        self.bounds = np.asarray(bounds, dtype=np.float64)
+
+    def _get_chunk_mask(self, coords):
+
+        return Node.get_roi_mask_from_coords(coords, self.bounds)
+
+    def get_half_spaces(self):
+
+        axes = np.eye(len(self.bounds))
+
+        return Half_Spaces(np.concatenate((axes * self.bounds[:, 1:], axes * self.bounds[:, :1])), np.concatenate((axes, -axes)))
+
+class Sphere(Region):
+
+    """
+    Definition for a sphere given by its center and radius
+    """
+
+    def __init__(self, center, radius):
+
+        self.center = np.asarray(center, dtype=np.float64)
+        self.radius = float(radius)
+
+    def _get_chunk_mask(self, coords):
+
+        offsets = coords - self.center[:coords.shape[1]]
+
+        return np.einsum('ij,ij->i', offsets, offsets) <= self.radius**2
+
+class Cylinder(Region):
+
+    """
+    Definition for a finite cylinder given by the two end points of its axis and its radius, e.g. around a busbar
+    """
+
+    def __init__(self, axis_start, axis_end, radius):
+
+        self.axis_start = np.asarray(axis_start, dtype=np.float64)
+        self.axis = np.asarray(axis_end, dtype=np.float64) - self.axis_start
+        self.radius = float(radius)
+
+        self.axis_length_squared = float(self.axis @ self.axis)
+        if self.axis_length_squared == 0.0:
+            raise ValueError("the end points of the cylinder axis are the same point")
+
+    def _get_chunk_mask(self, coords):
+
+        dimension = coords.shape[1]
+        offsets = coords - self.axis_start[:dimension]
+
+        # projection on the axis, scaled by the axis length
+        axial = offsets @ self.axis[:dimension]
+        radial_squared = np.einsum('ij,ij->i', offsets, offsets) - axial**2 / self.axis_length_squared
+
+        return (axial >= 0.0) & (axial <= self.axis_length_squared) & (radial_squared <= self.radius**2)
+
+class Oriented_Box(Region):
+
+    """
+    Definition for a box of any orientation given by its center, its orthonormal axes (one per row) and its half lengths along each axis
+    """
+
+    def __init__(self, center, axes, half_lengths):
+
+        self.center = np.asarray(center, dtype=np.float64)
+        self.axes = np.asarray(axes, dtype=np.float64)
+        self.half_lengths = np.asarray(half_lengths, dtype=np.float64)
+
+        if not np.allclose(self.axes @ self.axes.T, np.eye(len(self.axes))):
+            raise ValueError("the axes of an oriented box must be orthonormal")
+
+    def _get_chunk_mask(self, coords):
+
+        dimension = coords.shape[1]
+        local_coords = (coords - self.center[:dimension]) @ self.axes[:, :dimension].T
+
+        return (np.abs(local_coords) <= self.half_lengths).all(axis=1)
+
+    def get_half_spaces(self):
+
+        face_offsets = self.axes * self.half_lengths[:, np.newaxis]
+
+        return Half_Spaces(np.concatenate((self.center + face_offsets, self.center - face_offsets)), np.concatenate((self.axes, -self.axes)))
+
+class Half_Spaces(Region):
+
+    """
+    Definition for the intersection of half-spaces, each given by a point on its plane and its outward normal, e.g. a convex polyhedron
+
+    Note: the points inside are the points x with dot(x - point, normal) <= 0 for every plane, evaluated as one matrix product
+    """
+
+    def __init__(self, points, normals):
+
+        self.points = np.atleast_2d(np.asarray(points, dtype=np.float64))
+        self.normals = np.atleast_2d(np.asarray(normals, dtype=np.float64))
+        self.offsets = np.einsum('ij,ij->i', self.points, self.normals)
+
+    def _get_chunk_mask(self, coords):
+
+        return (coords @ self.normals[:, :coords.shape[1]].T <= self.offsets).all(axis=1)
+
+    def get_half_spaces(self):
+
+        return self
+
+class Half_Space(Half_Spaces):
+
+    """
+    Definition for the half-space behind a plane given by a point on the plane and its outward normal
+    """
+
+    def __init__(self, point, normal):
+
+        super().__init__([point], [normal])
+
+class Intersection(Region):
+
+    """
+    Definition for the intersection of regions
+
+    Note: nested intersections are flattened and their half-spaces merged into one Half_Spaces region,
+    so the cost per point depends on the shapes and not on how they are grouped
+    """
+
+    def __init__(self, *regions):
+
+        self.regions = []
+        half_spaces = []
+
+        for region in _flatten_regions(regions, Intersection):
+            if isinstance(region, Half_Spaces):
+                half_spaces.append(region)
+            else:
+                self.regions.append(region)
+
+        if half_spaces:
+            self.regions.insert(0, Half_Spaces(np.concatenate([region.points for region in half_spaces]), 
+                                               np.concatenate([region.normals for region in half_spaces])))
+
+    def _get_chunk_mask(self, coords):
+
+        mask = self.regions[0]._get_chunk_mask(coords)
+        for region in self.regions[1:]:
+            mask &= region._get_chunk_mask(coords)
+
+        return mask
+
+    def get_half_spaces(self):
+
+        half_spaces = [region.get_half_spaces() for region in self.regions]
+
+        return Half_Spaces(np.concatenate([region.points for region in half_spaces]), np.concatenate([region.normals for region in half_spaces]))
+
+class Union(Region):
+
+    """
+    Definition for the union of regions
+
+    Note: nested unions are flattened
+    """
+
+    def __init__(self, *regions):
+
+        self.regions = _flatten_regions(regions, Union)
+
+    def _get_chunk_mask(self, coords):
+
+        mask = self.regions[0]._get_chunk_mask(coords)
+        for region in self.regions[1:]:
+            mask |= region._get_chunk_mask(coords)
+
+        return mask
+
+class Complement(Region):
+
+    """
+    Definition for the points outside of a region
+    """
+
+    def __init__(self, region):
+
+        self.region = get_region(region)
+
+    def _get_chunk_mask(self, coords):
+
+        return ~self.region._get_chunk_mask(coords)
+
+def _flatten_regions(regions, combination_class):
+
+    """
+    Flattens nested combinations of the same kind, e.g. the regions of (a & b) & c are a, b and c
+
+    Returns list of regions
+    """
+
+    flat_regions = []
+
+    for region in regions:
+        region = get_region(region)
+        if isinstance(region, combination_class):
+            flat_regions += region.regions
+        else:
+            flat_regions.append(region)
+
+    if not flat_regions:
+        raise ValueError(f"{combination_class.__name__} needs at least one region")
+
+    return flat_regions
+
+def get_region(roi):
+
+    """
+    Gets a region from a Region, its dictionary form or bounds [[xmin, xmax], [ymin, ymax], [zmin, zmax]]
+
+    Returns Region
+    """
+
+    if isinstance(roi, Region):
+        return roi
+
+    if isinstance(roi, dict):
+        return get_region_from_dict(roi)
+
+    return Box(roi)
+
+def get_region_from_dict(description):
+
+    """
+    Gets a region from its dictionary form, e.g. as given in a JSON request of the conversion server
+
+    Note: the dictionary has a single key naming the shape:
+    {"box": bounds}, {"sphere": {"center": ..., "radius": ...}}, {"cylinder": {"axis_start": ..., "axis_end": ..., "radius": ...}},
+    {"oriented_box": {"center": ..., "axes": ..., "half_lengths": ...}}, {"half_space": {"point": ..., "normal": ...}},
+    {"half_spaces": {"points": ..., "normals": ...}}, {"intersection": [...]}, {"union": [...]} or {"complement": {...}}
+
+    Returns Region
+    """
+
+    if len(description) != 1:
+        raise ValueError(f"a region dictionary has a single key naming the shape, got {list(description)}")
+
+    (shape, parameters), = description.items()
+
+    if shape == 'box':
+        return Box(parameters)
+    elif shape == 'sphere':
+        return Sphere(**parameters)
+    elif shape == 'cylinder':
+        return Cylinder(**parameters)
+    elif shape == 'oriented_box':
+        return Oriented_Box(**parameters)
+    elif shape == 'half_space':
+        return Half_Space(**parameters)
+    elif shape == 'half_spaces':
+        return Half_Spaces(**parameters)
+    elif shape == 'intersection':
+        return Intersection(*parameters)
+    elif shape == 'union':
+        return Union(*parameters)
+    elif shape == 'complement':
+        return Complement(parameters)
+
+    raise ValueError(f"unknown region shape '{shape}'")
+
+def get_elem_roi_mask(elem_conn_array, node_roi_mask, region = None, nodal_coords_array = None, elem_inclusion = 'all'):
+
+    """
+    Gets a boolean mask of the elements kept in the ROI
+
+    Note: elem_inclusion is 'all' to keep the elements with all nodes inside the ROI,
+    'any' to keep the elements with at least one node inside, or 'centroid' to keep the elements whose centroid is inside the region,
+    which needs the region and the coordinates of all nodes. elem_conn_array has 1-based node ids.
+
+    Returns numpy array of booleans, True for elements kept
+    """
+
+    if elem_inclusion == 'all':
+        return node_roi_mask[elem_conn_array - 1].all(axis=1)
+
+    elif elem_inclusion == 'any':
+        return node_roi_mask[elem_conn_array - 1].any(axis=1)
+
+    elif elem_inclusion == 'centroid':
+        if region is None or nodal_coords_array is None:
+            raise ValueError("the 'centroid' element inclusion needs the region and the nodal coordinates")
+
+        elem_roi_mask = np.empty(len(elem_conn_array), dtype=bool)
+        for start in range(0, len(elem_conn_array), ROI_CHUNK_SIZE):
+            centroids = nodal_coords_array[elem_conn_array[start:start + ROI_CHUNK_SIZE] - 1].mean(axis=1)
+            elem_roi_mask[start:start + ROI_CHUNK_SIZE] = region.get_mask(centroids)
+
+        return elem_roi_mask
+
+    elif elem_inclusion == 'clip':
+        raise ValueError("the 'clip' element inclusion creates elements and nodes, use clip_mesh_to_region() instead of an element mask")
+
+    raise ValueError(f"unknown element inclusion '{elem_inclusion}', expected one of {ELEM_INCLUSION_POLICIES}")
+
+def add_nodes_of_kept_elems(node_roi_mask, elem_conn_array, elem_roi_mask):
+
+    """
+    Marks the nodes of kept elements as kept, needed for the 'any' and 'centroid' element inclusions which keep elements with nodes outside the ROI
+
+    Returns none, node_roi_mask is updated in place
+    """
+
+    node_roi_mask[elem_conn_array[elem_roi_mask] - 1] = True
+
+# local vertex pairs (inside, outside) of the edges cut in a tetrahedron with 1, 2 or 3 vertices inside a plane,
+# after its vertices are sorted inside first
+_CUT_EDGES = {1: ((0, 1), (0, 2), (0, 3)),
+              2: ((0, 2), (0, 3), (1, 2), (1, 3)),
+              3: ((0, 3), (1, 3), (2, 3))}
+
+# prisms left by a cut with 2 or 3 vertices inside, columns are the inside vertices followed by the cut edge points,
+# the first three prism vertices form a triangle and the last three the opposite triangle in the same order
+_CUT_PRISMS = {2: (0, 2, 3, 1, 4, 5),
+               3: (0, 1, 2, 3, 4, 5)}
+
+# prism vertex orders putting each of the six vertices first, keeping the two triangles and their connecting edges
+_PRISM_ROTATIONS = np.array([(0, 1, 2, 3, 4, 5), (1, 2, 0, 4, 5, 3), (2, 0, 1, 5, 3, 4),
+                             (3, 5, 4, 0, 2, 1), (4, 3, 5, 1, 0, 2), (5, 4, 3, 2, 1, 0)])
+
+# the two splits of a rotated prism into three tetrahedra, the first when the diagonal of the face (1, 2, 5, 4) goes through vertex 1 or 5
+_PRISM_SPLITS = np.array([((0, 1, 2, 5), (0, 1, 5, 4), (0, 4, 5, 3)),
+                          ((0, 1, 2, 4), (0, 4, 2, 5), (0, 4, 5, 3))])
+
+def clip_mesh_to_region(nodal_coords_array, elem_conn_array, nodal_sim_data, region):
+
+    """
+    Clips a tetrahedral mesh to a region bounded by planes, cutting the elements crossing its boundary into tetrahedra inside the region
+
+    Note: the elements are clipped at one plane after the other. The tetrahedra crossing a plane are cut with the case tables _CUT_EDGES and _CUT_PRISMS,
+    the nodes on cut edges are created once per edge, keyed by the node ids of the edge, and get coordinates and nodal data linearly interpolated
+    along the edge. Prisms are split into tetrahedra with the diagonal of each quadrilateral face through its lowest node id, so that the elements
+    sharing a face split it the same way and the clipped mesh stays conforming. The nodes inside the region keep their relative order and are followed
+    by the new nodes. Elements keep the orientation of the element they were cut from. Nodes within CLIP_TOLERANCE of a plane, relative to the edges 
+    of their elements, are taken as on the plane and the slivers left by cuts are dropped (see _clip_tets_at_plane()), so all clipped elements have volume.
+
+    Returns clipped coordinates, connectivity (1-based node ids) and nodal simulation data arrays, of the dtypes of the input arrays
+    """
+
+    if elem_conn_array.shape[1] != 4 or nodal_coords_array.shape[1] != 3:
+        raise ValueError(f"clipping needs 4 node tetrahedra in 3D, got {elem_conn_array.shape[1]} nodes per element in {nodal_coords_array.shape[1]}D")
+
+    region = get_region(region)
+    half_spaces = region.get_half_spaces()
+
+    nodal_sim_data = np.asarray(nodal_sim_data)
+
+    coords = np.asarray(nodal_coords_array, dtype=np.float64)
+    data = nodal_sim_data.astype(np.float64).reshape(len(coords), -1)
+    elem_conn = np.asarray(elem_conn_array, dtype=np.int64) - 1
+    elem_orientations = _get_tet_orientations(coords, elem_conn)
+
+    num_cut_elems = 0
+
+    for normal, offset in zip(half_spaces.normals, half_spaces.offsets):
+        elem_conn, elem_orientations, coords, data, num_cut_at_plane = _clip_tets_at_plane(elem_conn, elem_orientations, coords, data, normal, offset)
+        num_cut_elems += num_cut_at_plane
+
+    # nodes of the clipped elements and the nodes inside the region, nodes created at one plane and cut away at another are dropped
+    kept_node_mask = np.zeros(len(coords), dtype=bool)
+    kept_node_mask[elem_conn.ravel()] = True
+    kept_node_mask[:len(nodal_coords_array)] |= region.get_mask(nodal_coords_array)
+
+    new_node_id_map = Node.get_new_node_id_map_from_roi_mask(kept_node_mask)
+
+    print(f"ROI clipping: {num_cut_elems} element cuts at {len(half_spaces.normals)} planes, {len(elem_conn)} elements and {np.count_nonzero(kept_node_mask[len(nodal_coords_array):])} new nodes after clipping")
+
+    return (coords[kept_node_mask].astype(np.asarray(nodal_coords_array).dtype),
+            new_node_id_map[elem_conn].astype(elem_conn_array.dtype),
+            data[kept_node_mask].reshape((-1,) + nodal_sim_data.shape[1:]).astype(nodal_sim_data.dtype))
+
+def _clip_tets_at_plane(elem_conn, elem_orientations, coords, data, normal, offset):
+
+    """
+    Clips tetrahedra at one plane, keeping the part behind it, see clip_mesh_to_region()
+
+    Note: elem_conn holds 0-based node indices, nodes on the plane are inside, within the tolerance of _get_distances_to_plane(). 
+    A cut edge whose inside node is on the plane gives back that node, the tetrahedra left with repeated nodes have no volume and are dropped, 
+    as are the pieces with a volume below CLIP_VOLUME_TOLERANCE times the cube of their longest edge.
+
+    Returns connectivity, orientations, coordinates and nodal data with the new nodes appended, and the number of elements cut
+    """
+
+    distances = _get_distances_to_plane(coords, elem_conn, normal, offset)
+
+    outside = distances[elem_conn] > 0.0
+    num_inside = 4 - np.count_nonzero(outside, axis=1)
+
+    kept = num_inside == 4
+    cut = (num_inside > 0) & ~kept
+
+    if not cut.any():
+        return elem_conn[kept], elem_orientations[kept], coords, data, 0
+
+    # vertices of the cut elements, inside first
+    cut_conn = np.take_along_axis(elem_conn[cut], np.argsort(outside[cut], axis=1, kind='stable'), axis=1)
+    cut_orientations = elem_orientations[cut]
+    cut_num_inside = num_inside[cut]
+
+    cases = [(case_num_inside, np.flatnonzero(cut_num_inside == case_num_inside)) for case_num_inside in _CUT_EDGES]
+
+    # edges of all cases, keyed by their inside and outside node so that an edge shared by several elements gets one node
+    edge_keys = []
+    for case_num_inside, case_elems in cases:
+        local_edges = np.array(_CUT_EDGES[case_num_inside])
+        edge_keys.append((cut_conn[case_elems][:, local_edges[:, 0]] * len(coords) + cut_conn[case_elems][:, local_edges[:, 1]]).ravel())
+
+    unique_edge_keys, edge_indices = np.unique(np.concatenate(edge_keys), return_inverse=True)
+    edge_inside_nodes, edge_outside_nodes = np.divmod(unique_edge_keys, len(coords))
+
+    inside_distances = distances[edge_inside_nodes]
+    edge_fractions = inside_distances / (inside_distances - distances[edge_outside_nodes])
+
+    new_edges = inside_distances < 0.0
+    edge_nodes = edge_inside_nodes.copy()
+    edge_nodes[new_edges] = len(coords) + np.arange(np.count_nonzero(new_edges))
+
+    fractions = edge_fractions[new_edges, np.newaxis]
+    inside_nodes = edge_inside_nodes[new_edges]
+    outside_nodes = edge_outside_nodes[new_edges]
+
+    coords = np.concatenate((coords, coords[inside_nodes] + fractions * (coords[outside_nodes] - coords[inside_nodes])))
+    data = np.concatenate((data, data[inside_nodes] + fractions * (data[outside_nodes] - data[inside_nodes])))
+
+    # tetrahedra of each case from the inside vertices and the cut edge nodes
+    new_elem_conn = [elem_conn[kept]]
+    new_elem_orientations = [elem_orientations[kept]]
+
+    first_edge = 0
+    for case_num_inside, case_elems in cases:
+        num_case_edges = len(case_elems) * len(_CUT_EDGES[case_num_inside])
+        case_edge_nodes = edge_nodes[edge_indices[first_edge:first_edge + num_case_edges]].reshape(len(case_elems), len(_CUT_EDGES[case_num_inside]))
+        first_edge += num_case_edges
+
+        case_vertices = np.concatenate((cut_conn[case_elems][:, :case_num_inside], case_edge_nodes), axis=1)
+
+        if case_num_inside == 1:
+            case_tets = case_vertices
+            case_orientations = cut_orientations[case_elems]
+        else:
+            case_tets = _split_prisms(case_vertices[:, _CUT_PRISMS[case_num_inside]])
+            case_orientations = np.repeat(cut_orientations[case_elems], 3)
+
+        new_elem_conn.append(case_tets)
+        new_elem_orientations.append(case_orientations)
+
+    elem_conn = np.concatenate(new_elem_conn)
+    elem_orientations = np.concatenate(new_elem_orientations)
+
+    # the kept elements come first and are unchanged. Pieces with repeated nodes, from edges cut at their inside node, have no volume 
+    # and are dropped with the slivers left by cuts close to a node
+    num_kept = np.count_nonzero(kept)
+    piece_volumes = _get_tet_signed_volumes(coords, elem_conn[num_kept:])
+    valid = np.ones(len(elem_conn), dtype=bool)
+    valid[num_kept:] = np.abs(piece_volumes) > CLIP_VOLUME_TOLERANCE * _get_longest_edge_lengths(coords, elem_conn[num_kept:])**3
+    elem_conn = elem_conn[valid]
+    elem_orientations = elem_orientations[valid]
+
+    # the prism splits do not keep the orientation, swapping two nodes turns an element around
+    flipped = np.zeros(len(elem_conn), dtype=bool)
+    flipped[num_kept:] = np.where(piece_volumes[valid[num_kept:]] < 0.0, -1, 1) != elem_orientations[num_kept:]
+    elem_conn[flipped, 2:4] = elem_conn[flipped, 3:1:-1]
+
+    return elem_conn, elem_orientations, coords, data, int(np.count_nonzero(cut))
+
+def _split_prisms(prisms):
+
+    """
+    Splits prisms into three tetrahedra each, choosing the diagonal of each quadrilateral face through its lowest node id
+
+    Note: the prism is rotated so that its lowest node id comes first, the two faces through it are then split through it 
+    and the opposite face through the lower of its two diagonals
+
+    Returns (3 * num_prisms, 4) connectivity
+    """
+
+    prisms = np.take_along_axis(prisms, _PRISM_ROTATIONS[np.argmin(prisms, axis=1)], axis=1)
+
+    split_choice = (np.minimum(prisms[:, 1], prisms[:, 5]) >= np.minimum(prisms[:, 2], prisms[:, 4])).astype(np.int64)
+
+    return np.take_along_axis(prisms[:, np.newaxis, :], _PRISM_SPLITS[split_choice].reshape(len(prisms), 1, 12), axis=2).reshape(-1, 4)
+
+def _get_distances_to_plane(coords, elem_conn, normal, offset):
+
+    """
+    Gets the signed distances of the nodes to a plane, scaled by the length of its normal, positive outside
+
+    Note: the distances of the nodes closer to the plane than CLIP_TOLERANCE times the longest edge of their elements are set to 0, 
+    so that nodes rounded off the plane are on it and the cuts next to a node give back the node instead of a sliver. 
+    Such nodes outside the plane are kept, at most that tolerance away from it
+
+    Returns numpy array of distances
+    """
+
+    distances = coords @ normal - offset
+
+    elem_lengths = _get_longest_edge_lengths(coords, elem_conn) * np.linalg.norm(normal)
+    if len(elem_lengths) == 0:
+        return distances
+
+    # only the nodes within the tolerance of the longest edge of all elements can be within the tolerance of their own elements
+    near_plane = np.abs(distances) <= CLIP_TOLERANCE * elem_lengths.max()
+    near_plane_elems = near_plane[elem_conn].any(axis=1)
+
+    node_lengths = np.zeros(len(coords))
+    for corner in range(0, elem_conn.shape[1]):
+        np.maximum.at(node_lengths, elem_conn[near_plane_elems, corner], elem_lengths[near_plane_elems])
+
+    distances[near_plane & (np.abs(distances) <= CLIP_TOLERANCE * node_lengths)] = 0.0
+
+    return distances
+
+def _get_longest_edge_lengths(coords, elem_conn):
+
+    """
+    Gets the length of the longest edge of tetrahedra
+
+    Returns numpy array of lengths
+    """
+
+    lengths = np.empty(len(elem_conn))
+
+    for start in range(0, len(elem_conn), ROI_CHUNK_SIZE):
+        corners = coords[elem_conn[start:start + ROI_CHUNK_SIZE]]
+        edges = np.concatenate((corners[:, 1:] - corners[:, :1], corners[:, 2:] - corners[:, 1:2], corners[:, 3:] - corners[:, 2:3]), axis=1)
+        lengths[start:start + ROI_CHUNK_SIZE] = np.sqrt(np.einsum('ijk,ijk->ij', edges, edges).max(axis=1))
+
+    return lengths
+
+def _get_tet_signed_volumes(coords, elem_conn):
+
+    """
+    Gets six times the signed volume of tetrahedra
+
+    Returns numpy array of volumes
+    """
+
+    signed_volumes = np.empty(len(elem_conn))
+
+    for start in range(0, len(elem_conn), ROI_CHUNK_SIZE):
+        corners = coords[elem_conn[start:start + ROI_CHUNK_SIZE]]
+        edges = corners[:, 1:] - corners[:, :1]
+        signed_volumes[start:start + ROI_CHUNK_SIZE] = np.einsum('ij,ij->i', edges[:, 0], np.cross(edges[:, 1], edges[:, 2]))
+
+    return signed_volumes
+
+def _get_tet_orientations(coords, elem_conn):
+
+    """
+    Gets the orientation of tetrahedra, the sign of their volume with zero volumes counted as positive
+
+    Returns numpy array of int8, 1 and -1
+    """
+
+    return np.where(_get_tet_signed_volumes(coords, elem_conn) < 0.0, -1, 1).astype(np.int8)
@@ -0,0 +1,492 @@
+'''
+ExoToComsol
+
+Copyright 2024 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains certain rights in this software.
+
+BSD 3-Clause License
+'''
+import asyncio
+import collections
+import concurrent.futures
+import json
+import os
+import socket
+import threading
+import time
+
+import numpy as np
+
+from src import util
+from src import exodus_backend
+from src import roi
+
+# Conversion service keeping recently used Exodus meshes and nodal fields in memory.
+#
+# Requests and responses are single lines of JSON. A response with "chunked": true is followed by the section-wise text
+# when the request did not give an output file, sent as chunks of a line with the number of bytes of the chunk and then its bytes,
+# ending with a chunk of 0 bytes. File paths are relative to the root directory of the server and may not leave it. Request operations:
+#   {"op": "exo_to_comsol", "input_file": ..., "output_file": optional, "bounds": optional [[xmin, xmax], [ymin, ymax], [zmin, zmax]],
+#    "variable": optional nodal variable name (first variable by default), "step": optional 1-based time step (last step by default),
+#    "elem_type": optional COMSOL element type ("tetrahedra" by default)}
+#   {"op": "comsol_to_exo", "input_file": ..., "output_file": ..., "bounds": optional, "chunk_size": optional}
+# Instead of "bounds" the ROI of both conversions can be given as "region" in the dictionary form of roi.get_region_from_dict(),
+# and "elem_inclusion" is one of roi.ELEM_INCLUSION_POLICIES ("all" by default).
+#   {"op": "stats"}, {"op": "clear_cache"}, {"op": "shutdown"}
+
+DEFAULT_PORT = 8765
+DEFAULT_MAX_CACHE_BYTES = 2 * 1024**3
+DEFAULT_NUM_WORKERS = 4
+
+# rows of each array formatted per streamed chunk of text
+DEFAULT_STREAM_CHUNK_SIZE = 100000
+
+class Mesh_Cache:
+
+    """
+    Least recently used cache of arrays read from Exodus files, bounded by the total number of bytes of the cached arrays
+
+    Note: entries are keyed by file path, modification time and size, so a rewritten file is read again.
+    Concurrent requests for the same missing entry read the file once, the others wait for the result.
+    """
+
+    def __init__(self, max_cache_bytes = DEFAULT_MAX_CACHE_BYTES):
+
+        self.max_cache_bytes = max_cache_bytes
+        self.num_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries = collections.OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key, load):
+
+        """
+        Gets a cached value, calling load() to get (value, number of bytes) if it is not cached
+
+        Returns cached value
+        """
+
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key][0]
+
+                loading_event = self._loading.get(key)
+                if loading_event is None:
+                    self._loading[key] = threading.Event()
+                    self.misses += 1
+                    break
+
+            # another worker is loading this entry
+            loading_event.wait()
+
+        try:
+            value, num_bytes = load()
+            self._put(key, value, num_bytes)
+        finally:
+            with self._lock:
+                self._loading.pop(key).set()
+
+        return value
+
+    def _put(self, key, value, num_bytes):
+
+        with self._lock:
+            if num_bytes > self.max_cache_bytes:
+                return
+
+            self._entries[key] = (value, num_bytes)
+            self.num_bytes += num_bytes
+
+            while self.num_bytes > self.max_cache_bytes:
+                _, (_, evicted_num_bytes) = self._entries.popitem(last = False)
+                self.num_bytes -= evicted_num_bytes
+                self.evictions += 1
+
+    def clear(self):
+
+        with self._lock:
+            self._entries.clear()
+            self.num_bytes = 0
+
+    def get_stats(self):
+
+        with self._lock:
+            return {'num_entries': len(self._entries), 'num_bytes': self.num_bytes, 'max_cache_bytes': self.max_cache_bytes,
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+def get_file_key(file_path):
+
+    """
+    Gets the part of the cache keys identifying the current content of a file
+
+    Returns tuple of absolute path, modification time and size
+    """
+
+    file_stat = os.stat(file_path)
+
+    return (os.path.abspath(file_path), file_stat.st_mtime_ns, file_stat.st_size)
+
+def get_exodus_mesh(cache, file_path):
+
+    """
+    Gets the mesh of an Exodus file from the cache, reading it if needed
+
+    Note: as in util.exoToComsol() only the first element block is used
+
+    Returns dictionary with dimension, (num_nodes, 3) coordinates, (num_elems, nodes per element) connectivity, nodal variable names and time values
+    """
+
+    def load():
+        exo = exodus_backend.open_exodus_file(file_path)
+        mesh = {'dimension': exo.num_dimensions(),
+                'coords': exo.get_coords(),
+                'elem_conn': exo.get_elem_connectivity(exo.get_elem_blk_ids()[0]),
+                'node_variable_names': list(exo.get_node_variable_names()),
+                'times': list(exo.get_times())}
+        exo.close()
+
+        # cached arrays are shared by all requests
+        mesh['coords'].setflags(write = False)
+        mesh['elem_conn'].setflags(write = False)
+
+        return mesh, mesh['coords'].nbytes + mesh['elem_conn'].nbytes
+
+    return cache.get_or_load(('mesh',) + get_file_key(file_path), load)
+
+def get_exodus_nodal_field(cache, file_path, variable_name, step):
+
+    """
+    Gets the values of a nodal variable at a 1-based time step of an Exodus file from the cache, reading them if needed
+
+    Returns numpy array of nodal values
+    """
+
+    def load():
+        exo = exodus_backend.open_exodus_file(file_path)
+        values = np.array(exo.get_node_variable_values(variable_name, step))
+        exo.close()
+
+        values.setflags(write = False)
+
+        return values, values.nbytes
+
+    return cache.get_or_load(('field',) + get_file_key(file_path) + (variable_name, step), load)
+
+def resolve_request_path(root_dir, file_path):
+
+    """
+    Resolves a file path of a request under the root directory of the server
+
+    Note: relative paths are relative to root_dir, symbolic links are followed before checking that the path stays under root_dir
+
+    Returns absolute path, raises ValueError if it is outside root_dir
+    """
+
+    root_path = os.path.realpath(root_dir)
+    resolved_path = os.path.realpath(os.path.join(root_path, file_path))
+
+    if os.path.commonpath([root_path, resolved_path]) != root_path:
+        raise ValueError(f"path '{file_path}' is outside the server root directory")
+
+    return resolved_path
+
+def get_request_step(request, times):
+
+    """
+    Gets the 1-based time step of a request, the last step if it has none
+
+    Returns time step, raises ValueError if it is not a step of the file
+    """
+
+    step = request.get('step')
+
+    if step is None:
+        return len(times)
+
+    if not isinstance(step, int) or isinstance(step, bool) or not 1 <= step <= len(times):
+        raise ValueError(f"step {step!r} is not a time step of the file, which has steps 1 to {len(times)}")
+
+    return step
+
+def get_request_region(request):
+
+    """
+    Gets the ROI of a request from its "region" or "bounds"
+
+    Returns Region, or None if the request has no ROI
+    """
+
+    if request.get('region') is not None:
+        return roi.get_region_from_dict(request['region'])
+
+    if request.get('bounds') is not None:
+        return roi.Box(request['bounds'])
+
+    return None
+
+def convert_exo_to_comsol_cached(cache, request, root_dir = '.'):
+
+    """
+    Converts an Exodus file, or its region-of-interest (ROI), to section-wise text using the cached mesh and field
+
+    Note: the ROI is cropped as in util.exoToComsol_with_ROI(), see util.crop_mesh_to_roi(). The text is written to request['output_file'] if given.
+
+    Returns response dictionary and an iterator of the text chunks, or None if it was written to a file
+    """
+
+    file_path = resolve_request_path(root_dir, request['input_file'])
+    mesh = get_exodus_mesh(cache, file_path)
+
+    variable_name = request.get('variable') or mesh['node_variable_names'][0]
+    if variable_name not in mesh['node_variable_names']:
+        raise ValueError(f"nodal variable '{variable_name}' not in {request['input_file']}, which has {mesh['node_variable_names']}")
+
+    step = get_request_step(request, mesh['times'])
+    nodal_sim_data = get_exodus_nodal_field(cache, file_path, variable_name, step)
+
+    nodal_coords_array = mesh['coords']
+    elem_conn_array = mesh['elem_conn']
+
+    region = get_request_region(request)
+
+    if region is not None:
+        nodal_coords_array, elem_conn_array, nodal_sim_data = util.crop_mesh_to_roi(nodal_coords_array, elem_conn_array, nodal_sim_data, region, 
+                                                                                     request.get('elem_inclusion', 'all'))
+
+    elem_type = request.get('elem_type', 'tetrahedra')
+    data_header = request['variable'] if request.get('variable') else "T (K)"
+
+    response = {'status': 'ok', 'num_nodes': len(nodal_coords_array), 'num_elems': len(elem_conn_array)}
+
+    if request.get('output_file'):
+        util.write_sectionwise_file_for_COMSOL_input_from_arrays('', resolve_request_path(root_dir, request['output_file']), nodal_coords_array, elem_conn_array, 
+                                                                 nodal_sim_data, elem_type, mesh['dimension'], data_header)
+        return response, None
+
+    return response, util.iter_sectionwise_text_for_COMSOL_input(nodal_coords_array, elem_conn_array, nodal_sim_data, elem_type, mesh['dimension'], 
+                                                                 data_header, chunk_size = DEFAULT_STREAM_CHUNK_SIZE)
+
+def convert_comsol_to_exo(request, root_dir = '.'):
+
+    """
+    Converts a COMSOL file in section-wise format, or its region-of-interest (ROI), to an Exodus file with util.comsolToExo() or util.comsolToExo_with_ROI()
+
+    Note: nothing is cached, the COMSOL file is read for each request
+
+    Returns response dictionary and None
+    """
+
+    if not request.get('output_file'):
+        raise ValueError("comsol_to_exo requests need an output_file")
+
+    input_file = resolve_request_path(root_dir, request['input_file'])
+    output_file = resolve_request_path(root_dir, request['output_file'])
+
+    region = get_request_region(request)
+
+    if region is not None:
+        util.comsolToExo_with_ROI('', input_file, '', output_file, region, chunk_size = request.get('chunk_size'), 
+                                  elem_inclusion = request.get('elem_inclusion', 'all'))
+    else:
+        util.comsolToExo('', input_file, '', output_file, chunk_size = request.get('chunk_size'))
+
+    return {'status': 'ok'}, None
+
+def handle_request(cache, request, root_dir = '.'):
+
+    """
+    Runs the work of one request, called in a worker thread
+
+    Returns response dictionary and optional iterator of payload text chunks
+    """
+
+    op = request.get('op')
+
+    if op == 'exo_to_comsol':
+        return convert_exo_to_comsol_cached(cache, request, root_dir)
+
+    elif op == 'comsol_to_exo':
+        return convert_comsol_to_exo(request, root_dir)
+
+    elif op == 'stats':
+        return {'status': 'ok', 'cache': cache.get_stats()}, None
+
+    elif op == 'clear_cache':
+        cache.clear()
+        return {'status': 'ok'}, None
+
+    raise ValueError(f"unknown request op '{op}'")
+
+async def _handle_connection(reader, writer, cache, executor, shutdown_event, root_dir, open_writers):
+
+    """
+    Answers the requests of one client connection, one JSON line per request
+
+    Note: the payload text is formatted chunk by chunk in the worker pool and each chunk is sent before the next is formatted,
+    so the full text is never held in memory. If formatting fails while streaming the connection is closed without the final empty chunk.
+    The writer is in open_writers while the connection is open, so that serve() can close it at shutdown.
+
+    Returns none
+    """
+
+    loop = asyncio.get_running_loop()
+    open_writers.add(writer)
+
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+
+            start_time = time.perf_counter()
+            payload = None
+
+            try:
+                request = json.loads(line)
+
+                if request.get('op') == 'shutdown':
+                    response = {'status': 'ok'}
+                    shutdown_event.set()
+                else:
+                    # the conversion runs in the worker pool so that the event loop keeps serving other clients
+                    response, payload = await loop.run_in_executor(executor, handle_request, cache, request, root_dir)
+
+            except Exception as error:
+                response = {'status': 'error', 'message': f"{type(error).__name__}: {error}"}
+
+            if payload is not None:
+                response['chunked'] = True
+            response['elapsed_s'] = time.perf_counter() - start_time
+
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+
+            if payload is not None:
+                while True:
+                    text_chunk = await loop.run_in_executor(executor, next, payload, None)
+                    if text_chunk is None:
+                        break
+
+                    chunk_bytes = text_chunk.encode()
+                    if chunk_bytes:
+                        writer.write(b"%d\n" % len(chunk_bytes) + chunk_bytes)
+                        await writer.drain()
+
+                writer.write(b"0\n")
+                await writer.drain()
+
+            if shutdown_event.is_set():
+                break
+
+    except (ConnectionError, asyncio.CancelledError):
+        # connections still open at shutdown are cancelled
+        pass
+
+    except Exception as error:
+        print(f"Warning: closing connection after error while streaming: {type(error).__name__}: {error}")
+
+    finally:
+        open_writers.discard(writer)
+        writer.close()
+
+async def serve(host = '127.0.0.1', port = DEFAULT_PORT, unix_socket_path = None,
+                max_cache_bytes = DEFAULT_MAX_CACHE_BYTES, num_workers = DEFAULT_NUM_WORKERS, root_dir = '.'):
+
+    """
+    Serves conversion requests until a shutdown request is received
+
+    Note: listens on unix_socket_path if given, else on host and port, by default only on localhost as the server reads and 
+    writes files under root_dir for any client. The worker pool is a thread pool sharing the cache. It keeps the event loop 
+    serving other clients and overlaps file reads, but text parsing and formatting hold the global interpreter lock, 
+    so conversions do not run in parallel. At shutdown the connections of other clients are closed, 
+    as Server.wait_closed() waits for them from Python 3.12.1 on.
+
+    Returns none
+    """
+
+    cache = Mesh_Cache(max_cache_bytes)
+    shutdown_event = asyncio.Event()
+    open_writers = set()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers = num_workers) as executor:
+
+        def client_connected(reader, writer):
+            return _handle_connection(reader, writer, cache, executor, shutdown_event, root_dir, open_writers)
+
+        if unix_socket_path is not None:
+            server = await asyncio.start_unix_server(client_connected, path = unix_socket_path)
+        else:
+            if host not in ('127.0.0.1', '::1', 'localhost'):
+                print(f"Warning: listening on {host}, clients on the network can read and write files under {os.path.realpath(root_dir)}")
+            server = await asyncio.start_server(client_connected, host = host, port = port)
+
+        print(f"ExoToComsol server listening on {unix_socket_path if unix_socket_path is not None else f'{host}:{port}'}")
+
+        async with server:
+            await shutdown_event.wait()
+
+            server.close()
+
+            # idle clients would otherwise keep the server open
+            for writer in list(open_writers):
+                writer.close()
+            for writer in list(open_writers):
+                try:
+                    await writer.wait_closed()
+                except ConnectionError:
+                    pass
+
+    if unix_socket_path is not None and os.path.exists(unix_socket_path):
+        os.remove(unix_socket_path)
+
+    print("ExoToComsol server stopped")
+
+def run_server(host = '127.0.0.1', port = DEFAULT_PORT, unix_socket_path = None,
+               max_cache_bytes = DEFAULT_MAX_CACHE_BYTES, num_workers = DEFAULT_NUM_WORKERS, root_dir = '.'):
+
+    """
+    Runs the conversion server, see serve()
+
+    Returns none
+    """
+
+    asyncio.run(serve(host, port, unix_socket_path, max_cache_bytes, num_workers, root_dir))
+
+def send_request(request, host = '127.0.0.1', port = DEFAULT_PORT, unix_socket_path = None):
+
+    """
+    Sends one request to a running conversion server and waits for the response
+
+    Returns response dictionary and the payload bytes, or None if the response has no payload
+    """
+
+    payload = None
+
+    if unix_socket_path is not None:
+        client_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client_socket.connect(unix_socket_path)
+    else:
+        client_socket = socket.create_connection((host, port))
+
+    with client_socket, client_socket.makefile('rb') as response_file:
+        client_socket.sendall(json.dumps(request).encode() + b"\n")
+
+        response = json.loads(response_file.readline())
+
+        if response.get('chunked'):
+            payload_chunks = []
+            while True:
+                chunk_num_bytes = int(response_file.readline())
+                if chunk_num_bytes == 0:
+                    break
+                payload_chunks.append(response_file.read(chunk_num_bytes))
+            payload = b"".join(payload_chunks)
+
+    return response, payload
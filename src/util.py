@@ -6,359 +6,1380 @@ Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
 
 BSD 3-Clause License
 '''
+import itertools
+import os
 import re
-from exodus3 import *
 import numpy as np
 
 from src import Node
 from src import Element_Tetrahedra
+from src import renumber
+from src import exodus_backend
+from src import pipeline
+from src import roi
 
-def exoToComsol(inputFolderPath, inputExodusFilename, outputFolderPath, output_comsol_file_name, elem_type):     
+# number of rows of a section-wise file parsed and written to Exodus at a time by the chunked conversions
+DEFAULT_CHUNK_SIZE = 1000000
+
+# number of rows of a section-wise file parsed at a time by the in-memory conversions, which bounds the memory of the text being parsed
+READ_CHUNK_SIZE = 65536
+
+# approximate bytes taken by one value of a chunk of text as python strings and lists while the chunk is parsed or formatted
+TEXT_BYTES_PER_VALUE = 128
+
+# dtypes of the floating point (coordinates, nodal data) and integer (connectivity) arrays of each precision mode, 
+# 'compact' halves the memory of the mesh arrays and writes Exodus files with 4 byte floating point values
+PRECISION_MODES = {'double': (np.float64, np.int64), 
+                   'compact': (np.float32, np.int32)}
+
+# outputs of Exodus element variables: 'nodal' projects them to the nodes, 'centroid' writes them at the element centroids to a second file
+ELEM_DATA_OUTPUTS = ('nodal', 'centroid')
+
+def exoToComsol(inputFolderPath, inputExodusFilename, outputFolderPath, output_comsol_file_name, elem_type, node_renumbering = None, precision = 'double', 
+                queue_depth = pipeline.DEFAULT_QUEUE_DEPTH, elem_variable_names = None, elem_data_output = 'nodal', chunk_size = None):     
 
     """
     Outputs COMSOL file in section-wise format from Exodus file
 
+    Note: node_renumbering is None to keep the node ids of the Exodus file, or one of renumber.RENUMBERING_METHODS. 
+    precision is one of PRECISION_MODES, 'compact' holds coordinates and nodal data as float32 and connectivity as int32. 
+    queue_depth is the depth of the queue between formatting and writing the text, see write_sectionwise_file_for_COMSOL_input_from_arrays(). 
+    elem_variable_names are Exodus element variables read at the last time step on the element block of the mesh. With elem_data_output 'nodal' 
+    they are projected to the nodes (see project_elem_data_to_nodes()) and written as further data sections, with 'centroid' they are written 
+    at the element centroids to a second file named with '_elem_data' (see write_elem_data_file_for_COMSOL_input()). 
+    if chunk_size is given the file is converted with exoToComsol_chunked(), which reads the Exodus file in ranges of chunk_size rows 
+    in a pipeline, node_renumbering and elem_variable_names need the whole mesh and cannot be combined with chunk_size
+
     Returns/writes a text file in section-wise format directly importable in COMSOL for mesh and simulation data
     """
 
-    exo = exodus(inputFolderPath + inputExodusFilename,mode='r',array_type='numpy')
-    elem_blk_ids = exo.get_elem_blk_ids()
-    time_step_values = exo.get_times()
-    num_time_steps = len(time_step_values)
-
-    coord_names = exo.get_coord_names()
-    dimension = len(coord_names)
+    if elem_data_output not in ELEM_DATA_OUTPUTS: 
+        raise ValueError(f"unknown element data output '{elem_data_output}', expected one of {ELEM_DATA_OUTPUTS}")
 
-    nodal_coords_tuple = exo.get_coords()
-    nodal_variable_names_list = exo.get_node_variable_names()
+    if chunk_size is not None and node_renumbering is not None:
+        raise ValueError("node renumbering needs the whole mesh in memory and cannot be combined with chunk_size")
 
+    if chunk_size is not None and elem_variable_names:
+        raise ValueError("element variables are projected or averaged over the whole mesh and cannot be combined with chunk_size")
 
-    nodal_temps_list_at_last_time_step = exo.get_node_variable_values(nodal_variable_names_list[0], num_time_steps)
+    if chunk_size is not None:
+        return exoToComsol_chunked(inputFolderPath, inputExodusFilename, outputFolderPath, output_comsol_file_name, elem_type, chunk_size, precision, queue_depth)
 
-    nodal_temps_list_at_first_time_step = exo.get_node_variable_values(nodal_variable_names_list[0], 1)
+    exo = exodus_backend.open_exodus_file(inputFolderPath + inputExodusFilename)
+    elem_blk_ids = exo.get_elem_blk_ids()
+    time_step_values = exo.get_times()
+    num_time_steps = len(time_step_values)
 
+    dimension = exo.num_dimensions()
 
-    num_nodes = exo.num_nodes()
+    nodal_variable_names_list = exo.get_node_variable_names()
 
     # get the nodal connectivity, number of elements, and number of nodes per element for a single block
-    elem_conn, num_blk_elems, num_elem_nodes = exo.get_elem_connectivity(elem_blk_ids[0])
+    elem_conn_array = exo.get_elem_connectivity(elem_blk_ids[0])
+    num_blk_elems, num_elem_nodes = elem_conn_array.shape
 
+    num_projected_columns = len(elem_variable_names) if elem_variable_names and elem_data_output == 'nodal' else 0
 
+    print_memory_estimate(exo.num_nodes(), num_blk_elems, num_elem_nodes, dimension, 1 + num_projected_columns, precision, 
+                          node_renumbering = node_renumbering, num_mesh_copies = node_renumbering is not None, text_rows = min(max(exo.num_nodes(), num_blk_elems), DEFAULT_CHUNK_SIZE))
 
-    #import to close exo file otherwise data corruption can occur and difficult to debug
-    exo.close()
+    nodal_coords_array = exo.get_coords()
 
-    # Create node objects with obtained nodal_coords
     # By default we get the nodal value at the last time step
-    nodes_list = Node.create_nodes_list_from_coords(nodal_coords_tuple, nodal_temps_list_at_last_time_step)
-
-    #Testing
-    #comment out below after testing
-    #nodes_list = Node.create_nodes_list_from_coords(nodal_coords_tuple, nodal_temps_list_at_first_time_step)
-
+    nodal_temps_at_last_time_step = exo.get_node_variable_values(nodal_variable_names_list[0], num_time_steps)
 
-    elems_list = Element_Tetrahedra.create_elems_list_from_elem_conn_list(elem_conn, num_blk_elems, nodes_list)
+    elem_data = get_elem_variables_values(exo, elem_blk_ids[:1], elem_variable_names, num_time_steps) if elem_variable_names else None
 
+    #import to close exo file otherwise data corruption can occur and difficult to debug
+    exo.close()
 
-    write_sectionwise_file_for_COMSOL_input_full_mesh(outputFolderPath, 
-                                                output_comsol_file_name,
-                                                dimension, 
-                                                num_nodes, 
-                                                num_blk_elems, 
-                                                nodes_list, 
-                                                elem_type,
-                                                elems_list)
+    data_header = "T (K)"
+
+    if elem_data is not None and elem_data_output == 'nodal': 
+        # projected before renumbering and casting, the element order and the float64 coordinates of the Exodus file are used
+        nodal_temps_at_last_time_step = np.column_stack((nodal_temps_at_last_time_step, project_elem_data_to_nodes(nodal_coords_array, elem_conn_array, elem_data)))
+        data_header = [data_header] + list(elem_variable_names)
+
+    nodal_coords_array, elem_conn_array, nodal_temps_at_last_time_step = renumber_nodes_of_mesh(nodal_coords_array, elem_conn_array, 
+                                                                                                nodal_temps_at_last_time_step, node_renumbering)
+
+    nodal_coords_array, elem_conn_array, nodal_temps_at_last_time_step = cast_mesh_to_precision(nodal_coords_array, elem_conn_array, 
+                                                                                                nodal_temps_at_last_time_step, precision)
+
+    write_sectionwise_file_for_COMSOL_input_from_arrays(outputFolderPath, 
+                                                        output_comsol_file_name, 
+                                                        nodal_coords_array, 
+                                                        elem_conn_array, 
+                                                        nodal_temps_at_last_time_step, 
+                                                        elem_type, 
+                                                        dimension, 
+                                                        data_header = data_header, 
+                                                        queue_depth = queue_depth)
+
+    if elem_data is not None and elem_data_output == 'centroid': 
+        output_file_root, output_file_extension = os.path.splitext(output_comsol_file_name)
+
+        write_elem_data_file_for_COMSOL_input(outputFolderPath, 
+                                              output_file_root + '_elem_data' + output_file_extension, 
+                                              nodal_coords_array, 
+                                              elem_conn_array, 
+                                              cast_float_array_to_precision(elem_data, precision, 'element data'), 
+                                              elem_variable_names, 
+                                              queue_depth = queue_depth)
                                                 
-def exoToComsol_with_ROI(inputFolderPath, inputExodusFilename, outputFolderPath, output_comsol_file_name, ouptut_file_extension, elem_type, bounds):     
+def exoToComsol_with_ROI(inputFolderPath, inputExodusFilename, outputFolderPath, output_comsol_file_name, ouptut_file_extension, elem_type, bounds, node_renumbering = None, precision = 'double', 
+                         queue_depth = pipeline.DEFAULT_QUEUE_DEPTH, elem_inclusion = 'all'):     
     """
     Outputs COMSOL file of user-defined region-of-interest (ROI) in section-wise format from Exodus file
 
+    Note: bounds is [[xmin, xmax], [ymin, ymax], [zmin, zmax]] or a region of src/roi.py, elem_inclusion is one of roi.ELEM_INCLUSION_POLICIES (see crop_mesh_to_roi()). 
+    node_renumbering is None to keep the node ids of the Exodus file, or one of renumber.RENUMBERING_METHODS. 
+    The nodes are renumbered before cropping, the ROI keeps their relative order. 
+    precision is one of PRECISION_MODES, 'compact' holds coordinates and nodal data as float32 and connectivity as int32. 
+    queue_depth is the depth of the queue between formatting and writing the text, see write_sectionwise_file_for_COMSOL_input_from_arrays(). 
+    The Exodus file is read whole and serially, unlike exoToComsol() with chunk_size: renumbering and the element inclusion policies 
+    work on the whole mesh, which is also written in full besides the ROI
+
     Returns/writes a text file in section-wise format directly importable in COMSOL for mesh and simulation data of user-defined region-of-interest (ROI) 
     """    
-    exo = exodus(inputFolderPath + inputExodusFilename,mode='r',array_type='numpy')
+    exo = exodus_backend.open_exodus_file(inputFolderPath + inputExodusFilename)
     elem_blk_ids = exo.get_elem_blk_ids()
     time_step_values = exo.get_times()
     num_time_steps = len(time_step_values)
 
-    coord_names = exo.get_coord_names()
-    dimension = len(coord_names)
+    dimension = exo.num_dimensions()
 
-    nodal_coords_tuple = exo.get_coords()
     nodal_variable_names_list = exo.get_node_variable_names()
 
-    nodal_temps_list_last_time_step = exo.get_node_variable_values(nodal_variable_names_list[0], num_time_steps)
+    # get the nodal connectivity, number of elements, and number of nodes per element for a single block
+    elem_conn_array = exo.get_elem_connectivity(elem_blk_ids[0])
+    num_blk_elems, num_elem_nodes = elem_conn_array.shape
 
-    nodal_temps_list_at_first_time_step = exo.get_node_variable_values(nodal_variable_names_list[0], 1)
+    print_memory_estimate(exo.num_nodes(), num_blk_elems, num_elem_nodes, dimension, 1, precision, 
+                          node_renumbering = node_renumbering, num_mesh_copies = (node_renumbering is not None) + 1, text_rows = min(max(exo.num_nodes(), num_blk_elems), DEFAULT_CHUNK_SIZE))
 
-    num_nodes = exo.num_nodes()
+    nodal_coords_array = exo.get_coords()
 
-    # get the nodal connectivity, number of elements, and number of nodes per element for a single block
-    elem_conn, num_blk_elems, num_elem_nodes = exo.get_elem_connectivity(elem_blk_ids[0])
+    # By default we get the nodal value at the last time step
+    nodal_temps_last_time_step = exo.get_node_variable_values(nodal_variable_names_list[0], num_time_steps)
 
     #import to close exo file otherwise data corruption can occur and difficult to debug
     exo.close()
 
-    # Create node objects with obtained nodal_coords
-    # By default we get the nodal value at the last time step
-    nodes_list = Node.create_nodes_list_from_coords(nodal_coords_tuple, nodal_temps_list_last_time_step)
+    nodal_coords_array, elem_conn_array, nodal_temps_last_time_step = renumber_nodes_of_mesh(nodal_coords_array, elem_conn_array, 
+                                                                                             nodal_temps_last_time_step, node_renumbering)
 
-    #Testing
-    #comment out below after testing
-    #nodes_list = Node.create_nodes_list_from_coords(nodal_coords_tuple, nodal_temps_list_at_first_time_step)
+    # cropping runs in float64 as in comsolToExo_with_ROI(), both meshes are cast afterwards
+    nodal_coords_roi_cropped, elem_conn_roi_cropped, nodal_temps_roi_cropped = crop_mesh_to_roi(nodal_coords_array, elem_conn_array, 
+                                                                                                nodal_temps_last_time_step, bounds, elem_inclusion)
 
-    nodes_list_roi_cropped, node_ids_roi_cropped = Node.get_nodes_list_roi_cropped(bounds[0][0], bounds[0][1], bounds[1][0], bounds[1][1], bounds[2][0], bounds[2][1], nodes_list)
+    nodal_coords_array, elem_conn_array, nodal_temps_last_time_step = cast_mesh_to_precision(nodal_coords_array, elem_conn_array, 
+                                                                                             nodal_temps_last_time_step, precision)
 
-    Node.get_new_node_id_after_roi_cropped(nodes_list_roi_cropped)
+    nodal_coords_roi_cropped, elem_conn_roi_cropped, nodal_temps_roi_cropped = cast_mesh_to_precision(nodal_coords_roi_cropped, elem_conn_roi_cropped, 
+                                                                                                      nodal_temps_roi_cropped, precision)
 
-    elems_list = Element_Tetrahedra.create_elems_list_from_elem_conn_list(elem_conn, num_blk_elems, nodes_list)
-                                                                
+    write_sectionwise_file_for_COMSOL_input_from_arrays(outputFolderPath, 
+                                                        output_comsol_file_name + ouptut_file_extension,
+                                                        nodal_coords_array, 
+                                                        elem_conn_array, 
+                                                        nodal_temps_last_time_step, 
+                                                        elem_type, 
+                                                        dimension, 
+                                                        queue_depth = queue_depth)
 
-    elems_list_roi_cropped = Element_Tetrahedra.get_elems_list_roi_cropped(elems_list, node_ids_roi_cropped) 
+    write_sectionwise_file_for_COMSOL_input_from_arrays(outputFolderPath, 
+                                                        output_comsol_file_name+ '_roi_cropped'  + ouptut_file_extension ,
+                                                        nodal_coords_roi_cropped, 
+                                                        elem_conn_roi_cropped, 
+                                                        nodal_temps_roi_cropped, 
+                                                        elem_type, 
+                                                        dimension, 
+                                                        queue_depth = queue_depth)
 
-    write_sectionwise_file_for_COMSOL_input_full_mesh(outputFolderPath, 
-                                                output_comsol_file_name + ouptut_file_extension,
-                                                dimension, 
-                                                num_nodes, 
-                                                num_blk_elems, 
-                                                nodes_list, 
-                                                elem_type,
-                                                elems_list)
-
-    write_sectionwise_file_for_COMSOL_input_roi_cropped_mesh(outputFolderPath, 
-                                                output_comsol_file_name+ '_roi_cropped'  + ouptut_file_extension ,
-                                                dimension, 
-                                                len(nodes_list_roi_cropped), #num_nodes 
-                                                len(elems_list_roi_cropped), #num_elems
-                                                nodes_list_roi_cropped, 
-                                                elem_type,
-                                                elems_list_roi_cropped)
-
-def comsolToExo(inputFolderPath, input_comsol_file_name, outputFolderPath, outputExodusFilename): 
+def comsolToExo(inputFolderPath, input_comsol_file_name, outputFolderPath, outputExodusFilename, chunk_size = None, node_renumbering = None, precision = 'double', 
+                queue_depth = pipeline.DEFAULT_QUEUE_DEPTH): 
 
     """
     Outputs Exodus file from COMSOL file 
 
+    Note: if chunk_size is given the file is converted with comsolToExo_chunked() so that memory use stays bounded. 
+    node_renumbering is None to keep the node ids of the COMSOL file, or one of renumber.RENUMBERING_METHODS, it needs the whole mesh and cannot be combined with chunk_size. 
+    precision is one of PRECISION_MODES, 'compact' holds coordinates and nodal data as float32 and connectivity as int32 and writes an Exodus file of word size 4. 
+    queue_depth is the depth of the queues between the pipeline stages of the chunked conversion, without chunk_size the file is read and parsed serially 
+    into arrays of the whole mesh, which renumbering and the ROI element inclusion policies need
+
     Returns/writes an Exodus file for SIERRA code
     """
 
-    numDims, numNodes, numElems, x_coords, y_coords, z_coords, num_nodes_per_elem, nodal_sim_data, elem_conn,  numElemBlocks, numAssembly  = read_COMSOL_section_wise_data(inputFolderPath, input_comsol_file_name)
+    if chunk_size is not None and node_renumbering is not None:
+        raise ValueError("node renumbering needs the whole mesh in memory and cannot be combined with chunk_size")
 
-    ex_pars = ex_init_params(num_dim=numDims, num_nodes=numNodes, num_elem=numElems, num_elem_blk=numElemBlocks, num_assembly=numAssembly)
+    if chunk_size is not None:
+        return comsolToExo_chunked(inputFolderPath, input_comsol_file_name, outputFolderPath, outputExodusFilename, chunk_size, precision, queue_depth)
 
-    exo_output = exodus(file= outputFolderPath + outputExodusFilename, mode='w', array_type = 'numpy', init_params = ex_pars)
+    header = read_COMSOL_section_wise_header(inputFolderPath, input_comsol_file_name)
+    numDims, numNodes, numElems, num_nodes_per_elem, data_headers = header
 
-    exo_output.put_elem_blk_info(elem_blk_id=1, elem_type = 'Tet', num_blk_elems = numElems, num_elem_nodes = num_nodes_per_elem, num_elem_attrs = 0)
+    print_memory_estimate(numNodes, numElems, num_nodes_per_elem, numDims, len(data_headers), precision, 
+                          node_renumbering = node_renumbering, num_mesh_copies = node_renumbering is not None, text_rows = min(max(numNodes, numElems), READ_CHUNK_SIZE))
 
-    exo_output.put_elem_connectivity(1, elem_conn)
+    numDims, numNodes, numElems, x_coords, y_coords, z_coords, num_nodes_per_elem, nodal_sim_data, elem_conn, numElemBlocks, numAssembly, data_headers = read_COMSOL_section_wise_data(inputFolderPath, input_comsol_file_name, header = header)
 
-    exo_output.put_node_id_map(Node.get_node_id_array(numNodes))
+    nodal_coords_array = np.column_stack((x_coords, y_coords, z_coords))[:, :numDims]
+    elem_conn_array = elem_conn.reshape(numElems, num_nodes_per_elem)
 
-    exo_output.put_coords(x_coords, y_coords, z_coords)
+    # only the arrays of the mesh keep the parsed float64 and int64 values, so that they are released when cast below
+    del x_coords, y_coords, z_coords, elem_conn
 
-    exo_output.put_elem_id_map(Element_Tetrahedra.get_element_id_array(numElems))
+    nodal_coords_array, elem_conn_array, nodal_sim_data = renumber_nodes_of_mesh(nodal_coords_array, elem_conn_array, nodal_sim_data, node_renumbering)
+
+    nodal_coords_array, elem_conn_array, nodal_sim_data = cast_mesh_to_precision(nodal_coords_array, elem_conn_array, nodal_sim_data, precision)
+
+    exo_output = exodus_backend.create_exodus_file(outputFolderPath + outputExodusFilename, num_dim=numDims, num_nodes=numNodes, num_elem=numElems, num_elem_blk=numElemBlocks, num_assembly=numAssembly, 
+                                                   float_word_size = get_float_word_size(precision))
+
+    exo_output.put_elem_blk_info(elem_blk_id=1, elem_type = 'Tet', num_blk_elems = numElems, num_elem_nodes = num_nodes_per_elem)
+
+    # variables are defined before the bulk data is written
+    variable_names, columns_var_steps = put_nodal_variables_and_times(exo_output, data_headers, numNodes)
+
+    exo_output.put_elem_connectivity(1, elem_conn_array)
+
+    exo_output.put_node_id_map(np.arange(1, numNodes + 1))
+
+    exo_output.put_coords(nodal_coords_array)
+
+    exo_output.put_elem_id_map(np.arange(1, numElems + 1))
 
     #putting simulation data
-    exo_output.put_time(step = 1, value = 0)
-    exo_output.put_time(step = 2, value = 1)
-    exo_output.set_node_variable_number(number = 1)
-    exo_output.put_node_variable_name(name = 'temp', index = 1)
-    exo_output.put_node_variable_values(name ='temp', step = 2, values = nodal_sim_data)
+    put_nodal_sim_data(exo_output, columns_var_steps, nodal_sim_data)
 
     exo_output.close()
 
     print("Exodus file generated from COMSOL data")
 
-def comsolToExo_with_ROI(inputFolderPath, input_comsol_file_name, outputFolderPath, outputExodusFilename, bounds): 
+def comsolToExo_with_ROI(inputFolderPath, input_comsol_file_name, outputFolderPath, outputExodusFilename, bounds, chunk_size = None, node_renumbering = None, precision = 'double', 
+                         queue_depth = pipeline.DEFAULT_QUEUE_DEPTH, elem_inclusion = 'all'): 
 
     """
     Outputs Exodus file from COMSOL file for user-defined region-of-interest (ROI) of the FE model
 
+    Note: bounds is [[xmin, xmax], [ymin, ymax], [zmin, zmax]] or a region of src/roi.py, elem_inclusion is one of roi.ELEM_INCLUSION_POLICIES (see crop_mesh_to_roi()). 
+    if chunk_size is given the file is converted with comsolToExo_with_ROI_chunked() so that memory use stays bounded. 
+    node_renumbering is None to keep the node ids of the COMSOL file, or one of renumber.RENUMBERING_METHODS, it needs the whole mesh and cannot be combined with chunk_size. 
+    The nodes are renumbered before cropping, the ROI keeps their relative order. 
+    precision is one of PRECISION_MODES, 'compact' holds coordinates and nodal data as float32 and connectivity as int32 and writes an Exodus file of word size 4. 
+    queue_depth is the depth of the queues between the pipeline stages of the chunked conversion, without chunk_size the file is read and parsed serially 
+    into arrays of the whole mesh, which renumbering and the ROI element inclusion policies need
+
     Returns/writes an Exodus file for SIERRA code
     """
-        
-    numDims, numNodes, numElems,x_coords, y_coords, z_coords, num_nodes_per_elem, nodal_sim_data, elem_conn, numElemBlocks, numAssembly  = read_COMSOL_section_wise_data(inputFolderPath, input_comsol_file_name)
 
-    nodal_coords_list = []
+    if chunk_size is not None and node_renumbering is not None:
+        raise ValueError("node renumbering needs the whole mesh in memory and cannot be combined with chunk_size")
 
-    nodal_coords_list.append(np.array(x_coords))
-    nodal_coords_list.append(np.array(y_coords))
-    nodal_coords_list.append(np.array(z_coords))
-
-    nodal_coords_tuple = tuple(nodal_coords_list)
+    if chunk_size is not None:
+        return comsolToExo_with_ROI_chunked(inputFolderPath, input_comsol_file_name, outputFolderPath, outputExodusFilename, bounds, chunk_size, precision, queue_depth, elem_inclusion)
+        
+    header = read_COMSOL_section_wise_header(inputFolderPath, input_comsol_file_name)
+    numDims, numNodes, numElems, num_nodes_per_elem, data_headers = header
 
-    nodes_list = Node.create_nodes_list_from_coords(nodal_coords_tuple, nodal_sim_data)
+    print_memory_estimate(numNodes, numElems, num_nodes_per_elem, numDims, len(data_headers), precision, 
+                          node_renumbering = node_renumbering, num_mesh_copies = (node_renumbering is not None) + 1, text_rows = min(max(numNodes, numElems), READ_CHUNK_SIZE))
 
-    nodes_list_roi_cropped, node_ids_roi_cropped = Node.get_nodes_list_roi_cropped(bounds[0][0], bounds[0][1], bounds[1][0], bounds[1][1], bounds[2][0], bounds[2][1], nodes_list)
+    numDims, numNodes, numElems, x_coords, y_coords, z_coords, num_nodes_per_elem, nodal_sim_data, elem_conn, numElemBlocks, numAssembly, data_headers = read_COMSOL_section_wise_data(inputFolderPath, input_comsol_file_name, header = header)
 
-    Node.get_new_node_id_after_roi_cropped(nodes_list_roi_cropped)
+    nodal_coords_array = np.column_stack((x_coords, y_coords, z_coords))[:, :numDims]
+    elem_conn_array = elem_conn.reshape(numElems, num_nodes_per_elem)
 
-    x_coords_roi_cropped, y_coords_roi_cropped, z_coords_roi_cropped = Node.get_coords_aft_roi_cropping(nodes_list_roi_cropped)
+    # only the arrays of the mesh keep the parsed float64 and int64 values, so that they are released when cast below
+    del x_coords, y_coords, z_coords, elem_conn
 
-    nodal_sim_data_roi_cropped = Node.get_nodal_sim_data_roi_cropped(nodes_list_roi_cropped)
+    nodal_coords_array, elem_conn_array, nodal_sim_data = renumber_nodes_of_mesh(nodal_coords_array, elem_conn_array, nodal_sim_data, node_renumbering)
 
-    elems_list = Element_Tetrahedra.create_elems_list_from_elem_conn_list(elem_conn, numElems, nodes_list)
+    nodal_coords_roi_cropped, elem_conn_aft_roi_cropping, nodal_sim_data_roi_cropped = crop_mesh_to_roi(nodal_coords_array, elem_conn_array, nodal_sim_data, bounds, elem_inclusion)
 
-    elems_list_roi_cropped = Element_Tetrahedra.get_elems_list_roi_cropped(elems_list, node_ids_roi_cropped) 
+    # the whole mesh is released before the ROI is cast and written
+    del nodal_coords_array, elem_conn_array, nodal_sim_data
 
-    elem_conn_aft_roi_cropping = Element_Tetrahedra.get_elem_conn_list_aft_roi_cropping(elems_list_roi_cropped)
+    nodal_coords_roi_cropped, elem_conn_aft_roi_cropping, nodal_sim_data_roi_cropped = cast_mesh_to_precision(nodal_coords_roi_cropped, elem_conn_aft_roi_cropping, 
+                                                                                                             nodal_sim_data_roi_cropped, precision)
 
     # In the section below we create the exodus file with info obtained from COMSOL file
-    num_nodes_aft_roi_cropping = len(nodes_list_roi_cropped)
+    num_nodes_aft_roi_cropping = len(nodal_coords_roi_cropped)
 
-    num_elems_aft_roi_cropping = len(elems_list_roi_cropped)
+    num_elems_aft_roi_cropping = len(elem_conn_aft_roi_cropping)
 
-    ex_pars = ex_init_params(num_dim=numDims, num_nodes = num_nodes_aft_roi_cropping, num_elem = num_elems_aft_roi_cropping, num_elem_blk = numElemBlocks, num_assembly=numAssembly)
+    exo_output = exodus_backend.create_exodus_file(outputFolderPath + outputExodusFilename, num_dim=numDims, num_nodes = num_nodes_aft_roi_cropping, num_elem = num_elems_aft_roi_cropping, num_elem_blk = numElemBlocks, num_assembly=numAssembly, 
+                                                   float_word_size = get_float_word_size(precision))
 
-    exo_output = exodus(file= outputFolderPath + outputExodusFilename, mode='w', array_type = 'numpy', init_params = ex_pars)
+    exo_output.put_elem_blk_info(elem_blk_id=1, elem_type = 'Tet', num_blk_elems = num_elems_aft_roi_cropping, num_elem_nodes = num_nodes_per_elem)
 
-    exo_output.put_elem_blk_info(elem_blk_id=1, elem_type = 'Tet', num_blk_elems = num_elems_aft_roi_cropping, num_elem_nodes = num_nodes_per_elem, num_elem_attrs = 0)
+    # variables are defined before the bulk data is written
+    variable_names, columns_var_steps = put_nodal_variables_and_times(exo_output, data_headers, num_nodes_aft_roi_cropping)
 
     exo_output.put_elem_connectivity(1, elem_conn_aft_roi_cropping)
 
-    exo_output.put_node_id_map(Node.get_node_id_array(num_nodes_aft_roi_cropping))
+    exo_output.put_node_id_map(np.arange(1, num_nodes_aft_roi_cropping + 1))
 
-    exo_output.put_coords(x_coords_roi_cropped, y_coords_roi_cropped, z_coords_roi_cropped)
+    exo_output.put_coords(nodal_coords_roi_cropped)
 
-    exo_output.put_elem_id_map(Element_Tetrahedra.get_element_id_array(num_elems_aft_roi_cropping))
+    exo_output.put_elem_id_map(np.arange(1, num_elems_aft_roi_cropping + 1))
 
     #putting simulation data
-    exo_output.put_time(step = 1, value = 0)
-    exo_output.put_time(step = 2, value = 1)
-    exo_output.set_node_variable_number(number = 1)
-    exo_output.put_node_variable_name(name = 'temp', index = 1)
-    exo_output.put_node_variable_values(name ='temp', step = 2, values = nodal_sim_data_roi_cropped)
+    put_nodal_sim_data(exo_output, columns_var_steps, nodal_sim_data_roi_cropped)
 
     exo_output.close()
                     
     print("Exodus file generated from COMSOL data")
 
-def write_sectionwise_file_for_COMSOL_input_full_mesh(path, filename, dimension, 
-                                            num_nodes, num_blk_elems, 
-                                            nodes_list, elem_type,
-                                            elems_list): 
+def iter_sectionwise_text_for_COMSOL_input(nodal_coords_array, elem_conn_array, nodal_sim_data, elem_type, dimension = None, data_header = "T (K)", chunk_size = DEFAULT_CHUNK_SIZE): 
+
+    """
+    Gets the text of a COMSOL file in section-wise format from arrays
+
+    Note: sections '% Coordinates', '% Elements (elem_type)' and '% Data (data_header)' follow the header lines, elem_conn_array holds 1-based node ids 
+    and nodal_sim_data is one column of nodal values, or several columns with a list of one data_header per column written as one data section each. float32 values are written with the shortest text giving back the float32 value. 
+
+    Yields strings of the file content, at most chunk_size rows at a time
     """
-    writes COMSOL file in section-wise format for the full FE model
+
+    if dimension is None: 
+        dimension = nodal_coords_array.shape[1]
+
+    nodal_sim_data = np.asarray(nodal_sim_data)
+    if nodal_sim_data.ndim == 1: 
+        nodal_sim_data = nodal_sim_data[:, np.newaxis]
+
+    data_headers = [data_header] if isinstance(data_header, str) else list(data_header)
+
+    yield get_sectionwise_header_text(dimension, len(nodal_coords_array), len(elem_conn_array))
+
+    yield "% Coordinates \n"
+    for first_row in range(0, len(nodal_coords_array), chunk_size): 
+        yield get_sectionwise_chunk_text('coordinates', nodal_coords_array[first_row:first_row + chunk_size])
+
+    yield f"% Elements ({elem_type}) \n"
+    for first_row in range(0, len(elem_conn_array), chunk_size): 
+        yield get_sectionwise_chunk_text('elements', elem_conn_array[first_row:first_row + chunk_size])
+
+    for column, header in enumerate(data_headers): 
+        yield f"% Data ({header}) \n"
+        for first_row in range(0, len(nodal_sim_data), chunk_size): 
+            yield get_sectionwise_chunk_text('data', nodal_sim_data[first_row:first_row + chunk_size, column:column + 1])
+
+def get_sectionwise_header_text(dimension, num_nodes, num_elems): 
+
+    """
+    Gets the header lines of a COMSOL file in section-wise format
+
+    Returns string
+    """
+
+    return f"% Dimension: {dimension}\n% Nodes: {num_nodes}\n% Elements: {num_elems}\n"
+
+def get_sectionwise_chunk_text(section, chunk): 
+
+    """
+    Gets the rows of a chunk of a section of a COMSOL file in section-wise format as text
+
+    Note: section is 'coordinates', 'elements' (1-based node ids) or 'data' (one column of nodal values)
+
+    Returns string
+    """
+
+    if section == 'coordinates': 
+        line_format = "   ".join(["{}"] * chunk.shape[1]) + "\n"
+
+    elif section == 'elements': 
+        line_format = "{}\t" * chunk.shape[1] + "\n"
+
+    else: 
+        line_format = "{} \n"
+
+    return "".join(map(line_format.format, *_get_text_columns(chunk)))
+
+def _get_text_columns(rows): 
+
+    """
+    Gets the columns of a 2D array as lists of values to be formatted as text
+
+    Note: python floats print the float64 value, so float32 values are converted to their shortest text by numpy
+
+    Returns list of one list per column
+    """
+
+    if rows.dtype == np.float32: 
+        rows = rows.astype(str)
+
+    return rows.T.tolist()
+
+def write_sectionwise_file_for_COMSOL_input_from_arrays(path, filename, nodal_coords_array, elem_conn_array, nodal_sim_data, elem_type, dimension = None, data_header = "T (K)", 
+                                                        queue_depth = pipeline.DEFAULT_QUEUE_DEPTH): 
+
+    """
+    writes COMSOL file in section-wise format from arrays, see iter_sectionwise_text_for_COMSOL_input()
+
+    Note: formatting the text and writing it run as a pipeline of two stages connected by a queue of queue_depth chunks of text (see pipeline.run_pipeline())
 
     outputs text file 
-    """        
+    """
 
-    # Writing to text file
-    output_text_file = open(path + filename, "w")
-    output_text_file.write(f"% Dimension: {dimension}\n")
-    output_text_file.write(f"% Nodes: {num_nodes}\n")
-    output_text_file.write(f"% Elements: {num_blk_elems}\n")
-    
-    # Write nodal coordinates: 
-    output_text_file.write("% Coordinates \n")
-    for node in nodes_list:
-        output_text_file.write(f"{node.x_coord}   {node.y_coord}   {node.z_coord}\n")
-    
-    # Write element connectivity:
-    output_text_file.write(f"% Elements ({elem_type}) \n")
-    for elem in elems_list:
-        for i in range(0, len(elem.node_ids_list_in_elem )):
-            output_text_file.write(f"{elem.node_ids_list_in_elem[i]}\t") 
-        output_text_file.write("\n")    
-        
-    # Write nodal data:    
-    output_text_file.write("% Data (T (K)) \n")
-    for node in nodes_list:
-        output_text_file.write(f"{node.temp} \n")
-    
-    
-    output_text_file.close()
-        
-def write_sectionwise_file_for_COMSOL_input_roi_cropped_mesh(path, filename, dimension, 
-                                            num_nodes, num_blk_elems, 
-                                            nodes_list, elem_type,
-                                            elems_list): 
+    with open(path + filename, "w") as output_text_file: 
+        pipeline.run_pipeline(('formatter', iter_sectionwise_text_for_COMSOL_input(nodal_coords_array, elem_conn_array, nodal_sim_data, elem_type, dimension, data_header)), 
+                              [], 
+                              ('writer', output_text_file.write), 
+                              queue_depth)
+
+def get_elem_variables_values(exo, elem_blk_ids, elem_variable_names, step): 
+
+    """
+    Gets the values of Exodus element variables at a 1-based time step on element blocks
+
+    Note: the values of the blocks are concatenated in the order of elem_blk_ids, as their connectivity
+
+    Returns numpy array of shape (num_elems, number of element variables)
+    """
+
+    available_names = exo.get_elem_variable_names()
+
+    for name in elem_variable_names: 
+        if name not in available_names: 
+            raise ValueError(f"element variable '{name}' not in the Exodus file, which has {available_names}")
+
+    return np.column_stack([np.concatenate([exo.get_elem_variable_values(elem_blk_id, name, step) for elem_blk_id in elem_blk_ids]) 
+                            for name in elem_variable_names])
+
+def project_elem_data_to_nodes(nodal_coords_array, elem_conn_array, elem_data): 
+
+    """
+    Projects element data to the nodes by averaging the values of the elements around each node weighted by their volume
+
+    Note: the weighted sums are accumulated with np.bincount over each corner of the elements, so the cost is linear in the number of elements. 
+    Nodes whose elements all have zero volume get the plain average of their elements and nodes in no element get 0, as COMSOL does not read NaN
+
+    Returns numpy array of nodal values, one column per column of elem_data
+    """
+
+    elem_data = np.asarray(elem_data, dtype=np.float64).reshape(len(elem_conn_array), -1)
+    num_nodes = len(nodal_coords_array)
+
+    elem_volumes = Element_Tetrahedra.get_elem_volumes_from_arrays(nodal_coords_array, elem_conn_array)
+    node_indices = elem_conn_array - 1
+
+    node_volumes = np.zeros(num_nodes)
+    for corner in range(0, elem_conn_array.shape[1]): 
+        node_volumes += np.bincount(node_indices[:, corner], weights = elem_volumes, minlength = num_nodes)
+
+    nodal_data = np.zeros((num_nodes, elem_data.shape[1]))
+    for column in range(0, elem_data.shape[1]): 
+        weighted_values = elem_volumes * elem_data[:, column]
+        for corner in range(0, elem_conn_array.shape[1]): 
+            nodal_data[:, column] += np.bincount(node_indices[:, corner], weights = weighted_values, minlength = num_nodes)
+
+    unweighted_nodes = node_volumes == 0.0
+    nodal_data[~unweighted_nodes] /= node_volumes[~unweighted_nodes, np.newaxis]
+
+    if unweighted_nodes.any(): 
+        unweighted_node_indices = np.flatnonzero(unweighted_nodes)
+        unweighted_elems = np.isin(node_indices, unweighted_node_indices).any(axis=1)
+
+        # plain average over the elements of the nodes without volume weights, only their elements are gathered
+        node_counts = np.zeros(num_nodes)
+        for corner in range(0, elem_conn_array.shape[1]): 
+            node_counts += np.bincount(node_indices[unweighted_elems, corner], minlength = num_nodes)
+
+        for column in range(0, elem_data.shape[1]): 
+            summed_values = np.zeros(num_nodes)
+            for corner in range(0, elem_conn_array.shape[1]): 
+                summed_values += np.bincount(node_indices[unweighted_elems, corner], weights = elem_data[unweighted_elems, column], minlength = num_nodes)
+            nodal_data[unweighted_nodes, column] = np.divide(summed_values[unweighted_nodes], node_counts[unweighted_nodes], 
+                                                             out = np.zeros(len(unweighted_node_indices)), where = node_counts[unweighted_nodes] > 0)
+
+        num_nodes_without_elems = int(np.count_nonzero(node_counts[unweighted_nodes] == 0))
+        print(f"Warning: {len(unweighted_node_indices)} nodes are not in an element of nonzero volume, their projected element data is the plain average "
+              f"of their elements, or 0 for the {num_nodes_without_elems} nodes in no element")
+
+    return nodal_data
+
+def iter_elem_data_text_for_COMSOL_input(nodal_coords_array, elem_conn_array, elem_data, elem_variable_names, chunk_size = DEFAULT_CHUNK_SIZE): 
+
+    """
+    Gets the text of a COMSOL file in spreadsheet format with the element data at the element centroids
+
+    Note: each row holds the centroid coordinates and the values of one element, after a header line naming the columns
+
+    Yields strings of the file content, at most chunk_size rows at a time
+    """
+
+    elem_data = np.asarray(elem_data).reshape(len(elem_conn_array), -1)
+
+    dimension = nodal_coords_array.shape[1]
+    line_format = "   ".join(["{}"] * (dimension + elem_data.shape[1])) + "\n"
+
+    yield "% " + "   ".join(list('xyz'[:dimension]) + list(elem_variable_names)) + "\n"
+
+    for first_row in range(0, len(elem_conn_array), chunk_size): 
+        centroids = nodal_coords_array[elem_conn_array[first_row:first_row + chunk_size] - 1].mean(axis=1, dtype=np.float64).astype(nodal_coords_array.dtype)
+        yield "".join(map(line_format.format, *(_get_text_columns(centroids) + _get_text_columns(elem_data[first_row:first_row + chunk_size]))))
+
+def write_elem_data_file_for_COMSOL_input(path, filename, nodal_coords_array, elem_conn_array, elem_data, elem_variable_names, 
+                                          queue_depth = pipeline.DEFAULT_QUEUE_DEPTH): 
 
     """
-    writes COMSOL file in section-wise format for the user-defined region-of-interest (ROI) of the FE model
+    writes COMSOL file in spreadsheet format with the element data at the element centroids, see iter_elem_data_text_for_COMSOL_input()
+
+    Note: formatting the text and writing it run as a pipeline as in write_sectionwise_file_for_COMSOL_input_from_arrays()
 
     outputs text file 
-    """                                                
+    """
 
-    # Writing to text file
-    output_text_file = open(path + filename, "w")
-    output_text_file.write(f"% Dimension: {dimension}\n")
-    output_text_file.write(f"% Nodes: {num_nodes}\n")
-    output_text_file.write(f"% Elements: {num_blk_elems}\n")
-    
-    # Write nodal coordinates: 
-    output_text_file.write("% Coordinates \n")
-    for node in nodes_list:
-        output_text_file.write(f"{node.x_coord}   {node.y_coord}   {node.z_coord}\n")
-    
-    # Write element connectivity:
-    output_text_file.write(f"% Elements ({elem_type}) \n")
-    for elem in elems_list:
-        for i in range(0, len(elem.node_ids_list_aft_roi_cropping)):
-            output_text_file.write(f"{elem.node_ids_list_aft_roi_cropping[i]}\t") 
-        output_text_file.write("\n")    
-        
-    # Write nodal data:    
-    output_text_file.write("% Data (T (K)) \n")
-    for node in nodes_list:
-        output_text_file.write(f"{node.temp} \n")
-    
-    
-    output_text_file.close()
-    
-def read_COMSOL_section_wise_data(inputFolderPath, input_comsol_file_name): 
+    with open(path + filename, "w") as output_text_file: 
+        pipeline.run_pipeline(('formatter', iter_elem_data_text_for_COMSOL_input(nodal_coords_array, elem_conn_array, elem_data, elem_variable_names)), 
+                              [], 
+                              ('writer', output_text_file.write), 
+                              queue_depth)
+
+def read_COMSOL_section_wise_data(inputFolderPath, input_comsol_file_name, chunk_size = READ_CHUNK_SIZE, header = None): 
     
     """
     Reads COMSOL file in section-wise format to retrieve FE model information
 
+    Note: all data columns of all data sections are read into one (num_nodes, num_data_columns) array, with the header of each column in data_headers. 
+    Coordinates are float64 arrays and the flat element connectivity is an int64 array. 
+    The arrays are allocated from the header (see read_COMSOL_section_wise_header()) and filled chunk_size rows at a time, 
+    so that only the text of one chunk is held in memory besides them. header is the result of read_COMSOL_section_wise_header() if the caller has read it
+
     Returns FE mesh and simulation data 
     """
 
-    x_coords = []
-    y_coords = []
-    z_coords = []
-    
-    elem_conn = []    
-    nodal_sim_data = []
-            
-    # reading from text file
-    input_file = open(inputFolderPath + input_comsol_file_name, 'r')
-    lines = input_file.readlines()
-    
+    if header is None: 
+        header = read_COMSOL_section_wise_header(inputFolderPath, input_comsol_file_name)
+
+    numDims, numNodes, numElems, num_nodes_per_elem, data_headers = header
+
     # hardcoding these values for now: 
     numElemBlocks = 1
     numAssembly = 1
-    
-    for line_num, line in enumerate(lines): 
-        if re.search("Dimension", line):
-            numDims_list = re.findall('\d', line)
-            
-            numDims = int(numDims_list[0])
-            
-        elif re.search("Nodes", line):
-             numNodes_list = re.findall('\d+', line)
-             
-             numNodes = int(numNodes_list[0])
-             
-        elif re.search("Elements:", line):
-             numElems_list= re.findall('\d+', line)
-             
-             numElems = int(numElems_list[0])
-             
-        elif re.search("Coordinates", line): 
-             nodal_coords_str = lines[line_num+1:line_num + numNodes + 1]
-                     
-        elif re.search("Element", line): 
-             elem_conn_str = lines[line_num+1:line_num+ numElems + 1]
-            
-        elif re.search("Data", line): 
-             nodal_sim_data_str = lines[line_num+1:line_num+ numNodes + 1]
-            
-    x_coords, y_coords, z_coords = Node.get_nodal_coords(nodal_coords_str)
-    
-    num_nodes_per_elem = Element_Tetrahedra.get_num_nodes_per_elem(elem_conn_str)
-    
-    nodal_sim_data = Node.get_nodal_sim_data(nodal_sim_data_str)
-    
-    elem_conn = Element_Tetrahedra.get_elem_connectivity(elem_conn_str)
-        
-    return numDims, numNodes, numElems, x_coords, y_coords, z_coords, num_nodes_per_elem, nodal_sim_data, elem_conn, numElemBlocks, numAssembly  
\ No newline at end of file
+
+    nodal_coords_array = None
+    elem_conn_array = np.empty((numElems, num_nodes_per_elem), dtype=np.int64)
+    nodal_sim_data = np.empty((numNodes, len(data_headers)), dtype=np.float64)
+
+    for section, first_row, first_column, chunk in iter_COMSOL_section_wise_chunks(inputFolderPath, input_comsol_file_name, chunk_size): 
+        if section == 'coordinates': 
+            if nodal_coords_array is None: 
+                nodal_coords_array = np.empty((numNodes, chunk.shape[1]), dtype=np.float64)
+            nodal_coords_array[first_row:first_row + len(chunk)] = chunk
+
+        elif section == 'elements': 
+            elem_conn_array[first_row:first_row + len(chunk)] = chunk
+
+        else: 
+            nodal_sim_data[first_row:first_row + len(chunk), first_column:first_column + chunk.shape[1]] = chunk
+
+    x_coords, y_coords, z_coords = nodal_coords_array.T
+
+    return numDims, numNodes, numElems, x_coords, y_coords, z_coords, num_nodes_per_elem, nodal_sim_data, elem_conn_array.ravel(), numElemBlocks, numAssembly, data_headers
+
+def renumber_nodes_of_mesh(nodal_coords_array, elem_conn_array, nodal_sim_data, node_renumbering): 
+
+    """
+    Applies the optional node renumbering stage consistently to nodal coordinates, element connectivity and nodal simulation data
+
+    Note: nothing is changed if node_renumbering is None
+
+    Returns (num_nodes, dimension) coordinates, (num_elems, nodes per element) connectivity and nodal simulation data arrays
+    """
+
+    if node_renumbering is None: 
+        return nodal_coords_array, elem_conn_array, nodal_sim_data
+
+    nodal_coords_array, elem_conn_array, nodal_sim_data, _ = renumber.renumber_nodes(nodal_coords_array, elem_conn_array, np.asarray(nodal_sim_data), node_renumbering)
+
+    return nodal_coords_array, elem_conn_array, nodal_sim_data
+
+def crop_mesh_to_roi(nodal_coords_array, elem_conn_array, nodal_sim_data, bounds, elem_inclusion = 'all'): 
+
+    """
+    Crops the arrays of a mesh to the user-defined region-of-interest (ROI)
+
+    Note: bounds is [[xmin, xmax], [ymin, ymax], [zmin, zmax]], a region of src/roi.py or its dictionary form. 
+    With elem_inclusion 'all' nodes inside the ROI keep their relative order and are renumbered from 1 and elements are kept if all their nodes are inside. 
+    With 'any' or 'centroid' (see roi.get_elem_roi_mask()) the nodes of the kept elements are kept too. 
+    With 'clip' the tetrahedra crossing the boundary of a region bounded by planes are cut at it, see roi.clip_mesh_to_region()
+
+    Returns cropped coordinates, connectivity (new node ids, same dtype) and nodal simulation data arrays
+    """
+
+    region = roi.get_region(bounds)
+
+    if elem_inclusion == 'clip': 
+        return roi.clip_mesh_to_region(nodal_coords_array, elem_conn_array, nodal_sim_data, region)
+
+    roi_mask = region.get_mask(nodal_coords_array)
+    elem_roi_mask = roi.get_elem_roi_mask(elem_conn_array, roi_mask, region, nodal_coords_array, elem_inclusion)
+
+    if elem_inclusion != 'all': 
+        roi.add_nodes_of_kept_elems(roi_mask, elem_conn_array, elem_roi_mask)
+
+    new_node_id_map = Node.get_new_node_id_map_from_roi_mask(roi_mask).astype(elem_conn_array.dtype)
+
+    elem_conn_roi_cropped = new_node_id_map[elem_conn_array[elem_roi_mask] - 1]
+
+    return nodal_coords_array[roi_mask], elem_conn_roi_cropped, np.asarray(nodal_sim_data)[roi_mask]
+
+def get_precision_dtypes(precision): 
+
+    """
+    Gets the dtypes of a precision mode
+
+    Returns floating point dtype of coordinates and nodal data, and integer dtype of connectivity
+    """
+
+    if precision not in PRECISION_MODES: 
+        raise ValueError(f"unknown precision '{precision}', expected one of {tuple(PRECISION_MODES)}")
+
+    return PRECISION_MODES[precision]
+
+def get_float_word_size(precision): 
+
+    """
+    Gets the word size of the floating point values of Exodus files written in a precision mode
+
+    Returns number of bytes
+    """
+
+    return np.dtype(get_precision_dtypes(precision)[0]).itemsize
+
+def get_memory_estimate(num_nodes, num_elems, num_nodes_per_elem, dimension, num_data_columns, precision): 
+
+    """
+    Estimates the memory of the coordinates, connectivity and nodal data arrays of a mesh in a precision mode
+
+    Returns number of bytes
+    """
+
+    float_dtype, int_dtype = get_precision_dtypes(precision)
+
+    return num_nodes * (dimension + num_data_columns) * np.dtype(float_dtype).itemsize + num_elems * num_nodes_per_elem * np.dtype(int_dtype).itemsize
+
+def get_peak_memory_estimate(num_nodes, num_elems, num_nodes_per_elem, dimension, num_data_columns, precision, node_renumbering = None, num_mesh_copies = 0, text_rows = 0): 
+
+    """
+    Estimates the peak memory of an in-memory conversion, which holds the mesh arrays in double precision as read
+
+    Note: on top of the double precision arrays the peak holds either the text of text_rows rows being parsed or formatted, 
+    about TEXT_BYTES_PER_VALUE bytes per value, or the temporary arrays of node_renumbering (see renumber.get_memory_estimate()), 
+    or the num_mesh_copies copies of the mesh made by renumbering and cropping together with the cast of the mesh to a smaller precision
+
+    Returns number of bytes
+    """
+
+    arrays_double = get_memory_estimate(num_nodes, num_elems, num_nodes_per_elem, dimension, num_data_columns, 'double')
+    arrays_cast = get_memory_estimate(num_nodes, num_elems, num_nodes_per_elem, dimension, num_data_columns, precision) if precision != 'double' else 0
+    text = text_rows * max(dimension, num_nodes_per_elem, num_data_columns) * TEXT_BYTES_PER_VALUE
+    renumbering = renumber.get_memory_estimate(num_nodes, num_elems, num_nodes_per_elem, dimension, node_renumbering) if node_renumbering is not None else 0
+
+    return arrays_double + max(text, renumbering, num_mesh_copies * arrays_double + arrays_cast)
+
+def print_memory_estimate(num_nodes, num_elems, num_nodes_per_elem, dimension, num_data_columns, precision, chunk_size = None, node_renumbering = None, num_mesh_copies = 0, text_rows = 0): 
+
+    """
+    Prints the memory estimate of a conversion before it runs: the peak memory of an in-memory conversion (see get_peak_memory_estimate()) 
+    or, if chunk_size is given, the memory of the arrays of one chunk
+
+    Returns none
+    """
+
+    if chunk_size is not None: 
+        num_nodes, num_elems = min(num_nodes, chunk_size), min(num_elems, chunk_size)
+
+        estimate = get_memory_estimate(num_nodes, num_elems, num_nodes_per_elem, dimension, num_data_columns, precision)
+        estimate_double = get_memory_estimate(num_nodes, num_elems, num_nodes_per_elem, dimension, num_data_columns, 'double')
+
+        print(f"Estimated memory of the arrays of one chunk: {estimate / 1024**2:.1f} MB in {precision} precision"
+              + (f" ({estimate_double / 1024**2:.1f} MB in double precision)" if precision != 'double' else ""))
+        return
+
+    estimate = get_peak_memory_estimate(num_nodes, num_elems, num_nodes_per_elem, dimension, num_data_columns, precision, node_renumbering, num_mesh_copies, text_rows)
+    estimate_arrays = get_memory_estimate(num_nodes, num_elems, num_nodes_per_elem, dimension, num_data_columns, precision)
+
+    print(f"Estimated peak memory of the conversion: {estimate / 1024**2:.1f} MB, "
+          f"of which {estimate_arrays / 1024**2:.1f} MB are the mesh and data arrays in {precision} precision")
+
+def cast_float_array_to_precision(values, precision, name): 
+
+    """
+    Casts floating point values to the floating point dtype of a precision mode
+
+    Note: raises OverflowError if finite values are out of the range of the dtype, and prints the number of nonzero values rounded to zero
+
+    Returns numpy array
+    """
+
+    float_dtype, _ = get_precision_dtypes(precision)
+
+    values = np.asarray(values)
+    with np.errstate(over='ignore'): 
+        values_cast = values.astype(float_dtype, copy=False)
+
+    if values_cast.dtype.itemsize >= values.dtype.itemsize: 
+        return values_cast
+
+    num_overflows = int(np.count_nonzero(np.isinf(values_cast) & np.isfinite(values)))
+    if num_overflows: 
+        raise OverflowError(f"{num_overflows} {name} values are out of the range of {values_cast.dtype.name}, use precision 'double'")
+
+    num_underflows = int(np.count_nonzero((values_cast == 0) & (values != 0)))
+    if num_underflows: 
+        print(f"Warning: {num_underflows} nonzero {name} values are rounded to zero in {values_cast.dtype.name}")
+
+    return values_cast
+
+def cast_int_array_to_precision(values, precision, name): 
+
+    """
+    Casts integer values to the integer dtype of a precision mode
+
+    Note: raises OverflowError if values are out of the range of the dtype
+
+    Returns numpy array
+    """
+
+    _, int_dtype = get_precision_dtypes(precision)
+
+    values = np.asarray(values)
+    int_info = np.iinfo(int_dtype)
+
+    if values.size and (values.max() > int_info.max or values.min() < int_info.min): 
+        raise OverflowError(f"{name} values up to {values.max()} are out of the range of {np.dtype(int_dtype).name}, use precision 'double'")
+
+    return values.astype(int_dtype, copy=False)
+
+def cast_mesh_to_precision(nodal_coords_array, elem_conn_array, nodal_sim_data, precision): 
+
+    """
+    Casts the coordinates, connectivity and nodal simulation data arrays of a mesh to the dtypes of a precision mode
+
+    Note: besides the checks of cast_float_array_to_precision() and cast_int_array_to_precision() raises ValueError 
+    if distinct nodes of an element get the same coordinates when cast, i.e. the element collapses
+
+    Returns coordinates, connectivity and nodal simulation data arrays
+    """
+
+    nodal_coords_cast = cast_float_array_to_precision(nodal_coords_array, precision, 'coordinate')
+    elem_conn_cast = cast_int_array_to_precision(elem_conn_array, precision, 'connectivity')
+    nodal_sim_data_cast = cast_float_array_to_precision(nodal_sim_data, precision, 'nodal data')
+
+    if nodal_coords_cast.dtype.itemsize < np.asarray(nodal_coords_array).dtype.itemsize: 
+        num_collapsed_elems = get_num_collapsed_elems(nodal_coords_array, nodal_coords_cast, elem_conn_cast)
+        if num_collapsed_elems: 
+            raise ValueError(f"{num_collapsed_elems} elements collapse with {nodal_coords_cast.dtype.name} coordinates, use precision 'double'")
+
+    return nodal_coords_cast, elem_conn_cast, nodal_sim_data_cast
+
+def get_num_collapsed_elems(nodal_coords_array, nodal_coords_cast, elem_conn_array, chunk_size = DEFAULT_CHUNK_SIZE): 
+
+    """
+    Counts the elements with two distinct nodes which have the same coordinates after casting the coordinates to a smaller dtype
+
+    Note: elements are checked chunk_size at a time to bound the memory of the gathered coordinates
+
+    Returns number of collapsed elements
+    """
+
+    num_nodes_per_elem = elem_conn_array.shape[1]
+    num_collapsed_elems = 0
+
+    for first_row in range(0, len(elem_conn_array), chunk_size): 
+        node_indices = elem_conn_array[first_row:first_row + chunk_size] - 1
+        collapsed = np.zeros(len(node_indices), dtype=bool)
+
+        for i in range(0, num_nodes_per_elem): 
+            for j in range(i + 1, num_nodes_per_elem): 
+                same_cast = (nodal_coords_cast[node_indices[:, i]] == nodal_coords_cast[node_indices[:, j]]).all(axis=1)
+                same = (nodal_coords_array[node_indices[:, i]] == nodal_coords_array[node_indices[:, j]]).all(axis=1)
+                collapsed |= same_cast & ~same
+
+        num_collapsed_elems += int(np.count_nonzero(collapsed))
+
+    return num_collapsed_elems
+
+class Collapsed_Elems_Check:
+
+    """
+    Checks chunk by chunk that no element collapses when the coordinates are cast to a smaller dtype, see get_num_collapsed_elems()
+
+    Note: for the chunked conversions, which see the coordinates before the elements. Only the cast coordinates of all nodes and 
+    a flag of the nodes rounded by the cast are kept, not the original coordinates. Two distinct nodes with the same cast coordinates 
+    collapse an element if one of them was rounded, if both were rounded their original coordinates are taken as different
+    """
+
+    def __init__(self, num_nodes, dimension, precision):
+
+        self.nodal_coords_cast = np.empty((num_nodes, dimension), dtype=get_precision_dtypes(precision)[0])
+        self.rounded = np.zeros(num_nodes, dtype=bool)
+
+    def add_coords_chunk(self, first_row, coords_chunk, coords_chunk_cast):
+
+        self.nodal_coords_cast[first_row:first_row + len(coords_chunk)] = coords_chunk_cast
+        self.rounded[first_row:first_row + len(coords_chunk)] = (coords_chunk_cast != coords_chunk).any(axis=1)
+
+    def check_elems_chunk(self, first_row, elem_conn_chunk):
+
+        """
+        Checks the elements of a chunk of 1-based connectivity
+
+        Returns none, raises ValueError if elements collapse
+        """
+
+        node_indices = elem_conn_chunk - 1
+        collapsed = np.zeros(len(node_indices), dtype=bool)
+
+        for i in range(0, node_indices.shape[1]):
+            for j in range(i + 1, node_indices.shape[1]):
+                same_cast = (self.nodal_coords_cast[node_indices[:, i]] == self.nodal_coords_cast[node_indices[:, j]]).all(axis=1)
+                collapsed |= same_cast & (node_indices[:, i] != node_indices[:, j]) & (self.rounded[node_indices[:, i]] | self.rounded[node_indices[:, j]])
+
+        num_collapsed_elems = int(np.count_nonzero(collapsed))
+        if num_collapsed_elems:
+            raise ValueError(f"{num_collapsed_elems} elements of the chunk starting at element {first_row + 1} collapse with {self.nodal_coords_cast.dtype.name} coordinates, use precision 'double'")
+
+def get_collapsed_elems_check(num_nodes, dimension, precision):
+
+    """
+    Gets the collapsed element check of the chunked conversions for a precision mode
+
+    Returns Collapsed_Elems_Check, or None if the coordinates are not cast to a smaller dtype
+    """
+
+    if get_float_word_size(precision) >= np.dtype(np.float64).itemsize:
+        return None
+
+    return Collapsed_Elems_Check(num_nodes, dimension, precision)
+
+def parse_and_check_COMSOL_section_wise_chunk_lines(chunk_lines_of_section, precision, collapsed_elems_check):
+
+    """
+    Parses a chunk of iter_COMSOL_section_wise_chunk_lines() as parse_COMSOL_section_wise_chunk_lines() and passes it to the 
+    collapsed element check if there is one
+
+    Returns tuple as iter_COMSOL_section_wise_chunks()
+    """
+
+    if collapsed_elems_check is None:
+        return parse_COMSOL_section_wise_chunk_lines(chunk_lines_of_section, precision)
+
+    section, first_row, first_column, chunk_lines = chunk_lines_of_section
+
+    chunk = _parse_COMSOL_section_wise_chunk(section, chunk_lines)
+
+    return cast_and_check_section_wise_chunk((section, first_row, first_column, chunk), precision, collapsed_elems_check)
+
+def cast_and_check_section_wise_chunk(section_chunk, precision, collapsed_elems_check):
+
+    """
+    Casts a chunk of iter_COMSOL_section_wise_chunks() or iter_Exodus_section_wise_chunks() to the dtypes of a precision mode 
+    and passes it to the collapsed element check if there is one
+
+    Returns tuple as iter_COMSOL_section_wise_chunks()
+    """
+
+    section, first_row, first_column, chunk = section_chunk
+
+    chunk_cast = cast_COMSOL_section_wise_chunk_to_precision(section, chunk, precision)
+
+    if collapsed_elems_check is not None:
+        if section == 'coordinates':
+            collapsed_elems_check.add_coords_chunk(first_row, chunk, chunk_cast)
+
+        elif section == 'elements':
+            collapsed_elems_check.check_elems_chunk(first_row, chunk_cast)
+
+    return section, first_row, first_column, chunk_cast
+
+def put_nodal_variables_and_times(exo_output, data_headers, num_nodes, chunk_size = DEFAULT_CHUNK_SIZE): 
+
+    """
+    Writes the time values and nodal variable names of an Exodus file from the headers of the COMSOL data columns
+
+    Note: data without time values is put at time 1 (see Node.get_nodal_variables_and_times()), the values at time 0 are written as zeros 
+    here, chunk_size nodes at a time, so that no time step of the file keeps the netCDF fill value
+
+    Returns list of variable names and list of (1-based variable index, 1-based time step) for each data column
+    """
+
+    variable_names, time_values, columns_var_steps = Node.get_nodal_variables_and_times(data_headers)
+
+    exo_output.put_times(time_values)
+
+    exo_output.put_node_variable_names(variable_names)
+
+    for var_index in range(1, len(variable_names) + 1): 
+        for step in range(1, len(time_values) + 1): 
+            if (var_index, step) not in columns_var_steps: 
+                for first_node_index in range(0, num_nodes, chunk_size): 
+                    exo_output.put_node_variable_values(var_index, step, np.zeros(min(chunk_size, num_nodes - first_node_index)), first_node_index)
+
+    return variable_names, columns_var_steps
+
+def put_nodal_sim_data(exo_output, columns_var_steps, nodal_sim_data, first_node_index = 0): 
+
+    """
+    Writes all columns of the nodal simulation data to an Exodus file, one variable at one time step per write
+
+    Note: columns_var_steps comes from put_nodal_variables_and_times(), first_node_index is the 0-based index of the first row of nodal_sim_data
+
+    Returns none
+    """
+
+    for column, (var_index, step) in enumerate(columns_var_steps): 
+        exo_output.put_node_variable_values(var_index, step, nodal_sim_data[:, column], first_node_index)  
+
+def exoToComsol_chunked(inputFolderPath, inputExodusFilename, outputFolderPath, output_comsol_file_name, elem_type, chunk_size = DEFAULT_CHUNK_SIZE, precision = 'double', 
+                        queue_depth = pipeline.DEFAULT_QUEUE_DEPTH): 
+
+    """
+    Outputs COMSOL file in section-wise format from Exodus file reading and writing at most chunk_size rows at a time
+
+    Note: the coordinates, the connectivity of the first element block and the first nodal variable at the last time step are read 
+    as ranges of the Exodus arrays (see iter_Exodus_section_wise_chunks()), so memory use is set by chunk_size and not by the size of the mesh. 
+    Each chunk is cast to the dtypes of precision with the collapsed element check of the chunked COMSOL conversions, see Collapsed_Elems_Check. 
+    Reading, casting, formatting and writing run as a pipeline of stages connected by queues of queue_depth chunks (see pipeline.run_pipeline()), 
+    so that reading the next chunks and writing the previous ones overlap with formatting, which holds the global interpreter lock
+
+    Returns/writes a text file in section-wise format directly importable in COMSOL for mesh and simulation data
+    """
+
+    exo = exodus_backend.open_exodus_file(inputFolderPath + inputExodusFilename)
+
+    try: 
+        elem_blk_id = exo.get_elem_blk_ids()[0]
+        num_time_steps = len(exo.get_times())
+        dimension = exo.num_dimensions()
+        num_nodes = exo.num_nodes()
+        nodal_variable_name = exo.get_node_variable_names()[0]
+        num_blk_elems, num_elem_nodes = exo.get_elem_blk_info(elem_blk_id)
+
+        print_memory_estimate(num_nodes, num_blk_elems, num_elem_nodes, dimension, 1, precision, chunk_size)
+
+        collapsed_elems_check = get_collapsed_elems_check(num_nodes, dimension, precision)
+
+        section_headers = {'coordinates': "% Coordinates \n", 'elements': f"% Elements ({elem_type}) \n", 'data': "% Data (T (K)) \n"}
+
+        def format_chunk(section_chunk): 
+
+            section, first_row, _, chunk = section_chunk
+
+            return (section_headers[section] if first_row == 0 else "") + get_sectionwise_chunk_text(section, chunk)
+
+        with open(outputFolderPath + output_comsol_file_name, "w") as output_text_file: 
+            output_text_file.write(get_sectionwise_header_text(dimension, num_nodes, num_blk_elems))
+
+            pipeline.run_pipeline(('reader', iter_Exodus_section_wise_chunks(exo, elem_blk_id, nodal_variable_name, num_time_steps, chunk_size)), 
+                                  [('caster', lambda section_chunk: cast_and_check_section_wise_chunk(section_chunk, precision, collapsed_elems_check)), 
+                                   ('formatter', format_chunk)], 
+                                  ('writer', output_text_file.write), 
+                                  queue_depth)
+    finally: 
+        #import to close exo file otherwise data corruption can occur and difficult to debug
+        exo.close()
+
+def iter_Exodus_section_wise_chunks(exo, elem_blk_id, nodal_variable_name, step, chunk_size = DEFAULT_CHUNK_SIZE): 
+
+    """
+    Reads the mesh and one nodal variable of an Exodus file one range of at most chunk_size rows at a time, in the order of the sections of a COMSOL file
+
+    Yields tuples as iter_COMSOL_section_wise_chunks(): coordinates chunks, connectivity chunks of the element block and 
+    chunks of the values of the nodal variable at a 1-based time step, in float64 and int64 as read
+    """
+
+    num_nodes = exo.num_nodes()
+    num_blk_elems, _ = exo.get_elem_blk_info(elem_blk_id)
+
+    for first_row in range(0, num_nodes, chunk_size): 
+        yield 'coordinates', first_row, 0, exo.get_coords(first_row, chunk_size)
+
+    for first_row in range(0, num_blk_elems, chunk_size): 
+        yield 'elements', first_row, 0, exo.get_elem_connectivity(elem_blk_id, first_row, chunk_size)
+
+    for first_row in range(0, num_nodes, chunk_size): 
+        yield 'data', first_row, 0, exo.get_node_variable_values(nodal_variable_name, step, first_row, chunk_size)[:, np.newaxis]
+
+def comsolToExo_chunked(inputFolderPath, input_comsol_file_name, outputFolderPath, outputExodusFilename, chunk_size = DEFAULT_CHUNK_SIZE, precision = 'double', 
+                        queue_depth = pipeline.DEFAULT_QUEUE_DEPTH): 
+
+    """
+    Outputs Exodus file from COMSOL file reading and writing at most chunk_size rows at a time
+
+    Note: coordinates, connectivity, id maps and nodal data are written with partial Exodus writes as each chunk is parsed, 
+    so memory use is set by chunk_size and not by the size of the input file. 
+    Each chunk is cast to the dtypes of precision, with a float32 precision the cast coordinates of all nodes are kept 
+    for the collapsed element check of each element chunk, see Collapsed_Elems_Check. 
+    Reading, parsing and writing run as a pipeline of stages connected by queues of queue_depth chunks (see pipeline.run_pipeline()), 
+    so that reading the next chunks and writing the previous ones overlap with parsing, which holds the global interpreter lock
+
+    Returns/writes an Exodus file for SIERRA code
+    """
+
+    numDims, numNodes, numElems, num_nodes_per_elem, data_headers = read_COMSOL_section_wise_header(inputFolderPath, input_comsol_file_name)
+
+    print_memory_estimate(numNodes, numElems, num_nodes_per_elem, numDims, len(data_headers), precision, chunk_size)
+
+    # hardcoding these values for now, same as read_COMSOL_section_wise_data(): 
+    numElemBlocks = 1
+    numAssembly = 1
+
+    exo_output = exodus_backend.create_exodus_file(outputFolderPath + outputExodusFilename, num_dim=numDims, num_nodes=numNodes, num_elem=numElems, num_elem_blk=numElemBlocks, num_assembly=numAssembly, 
+                                                   float_word_size = get_float_word_size(precision))
+
+    exo_output.put_elem_blk_info(elem_blk_id=1, elem_type = 'Tet', num_blk_elems = numElems, num_elem_nodes = num_nodes_per_elem)
+
+    #putting simulation data
+    _, columns_var_steps = put_nodal_variables_and_times(exo_output, data_headers, numNodes, chunk_size)
+
+    collapsed_elems_check = get_collapsed_elems_check(numNodes, numDims, precision)
+
+    def write_chunk(parsed_chunk): 
+
+        section, first_row, first_column, chunk = parsed_chunk
+
+        if section == 'coordinates': 
+            exo_output.put_coords(chunk, first_row)
+            exo_output.put_node_id_map(np.arange(first_row + 1, first_row + len(chunk) + 1), first_row)
+
+        elif section == 'elements': 
+            exo_output.put_elem_connectivity(1, chunk, first_row)
+            exo_output.put_elem_id_map(np.arange(first_row + 1, first_row + len(chunk) + 1), first_row)
+
+        elif section == 'data': 
+            put_nodal_sim_data(exo_output, columns_var_steps[first_column:first_column + chunk.shape[1]], chunk, first_row)
+
+    try: 
+        pipeline.run_pipeline(('reader', iter_COMSOL_section_wise_chunk_lines(inputFolderPath, input_comsol_file_name, chunk_size)), 
+                              [('parser', lambda chunk_lines: parse_and_check_COMSOL_section_wise_chunk_lines(chunk_lines, precision, collapsed_elems_check))], 
+                              ('writer', write_chunk), 
+                              queue_depth)
+    finally: 
+        exo_output.close()
+
+    print("Exodus file generated from COMSOL data")
+
+def comsolToExo_with_ROI_chunked(inputFolderPath, input_comsol_file_name, outputFolderPath, outputExodusFilename, bounds, chunk_size = DEFAULT_CHUNK_SIZE, precision = 'double', 
+                                 queue_depth = pipeline.DEFAULT_QUEUE_DEPTH, elem_inclusion = 'all'): 
+
+    """
+    Outputs Exodus file from COMSOL file for user-defined region-of-interest (ROI) of the FE model reading and writing at most chunk_size rows at a time
+
+    Note: the input file is read twice. The first pass builds the ROI masks of nodes and elements and counts the cropped nodes and elements 
+    needed to initialize the Exodus file, the second pass writes the cropped chunks. Apart from the chunk buffers only the 
+    boolean masks (one entry per input node and element) and the new node id map (one entry per input node) are held in memory, 
+    and with elem_inclusion 'centroid' the coordinates of all nodes. bounds and elem_inclusion are as in crop_mesh_to_roi(). 
+    Each chunk is cast to the dtypes of precision, with a float32 precision the second pass keeps the cast coordinates of all nodes 
+    for the collapsed element check of the cropped elements, see Collapsed_Elems_Check. 
+    Both passes run as pipelines of stages connected by queues of queue_depth chunks (see pipeline.run_pipeline()), 
+    the second pass crops the chunks in the parser stage
+
+    Returns/writes an Exodus file for SIERRA code
+    """
+
+    numDims, numNodes, numElems, num_nodes_per_elem, data_headers = read_COMSOL_section_wise_header(inputFolderPath, input_comsol_file_name)
+
+    print_memory_estimate(numNodes, numElems, num_nodes_per_elem, numDims, len(data_headers), precision, chunk_size)
+
+    # hardcoding these values for now, same as read_COMSOL_section_wise_data(): 
+    numElemBlocks = 1
+    numAssembly = 1
+
+    region = roi.get_region(bounds)
+
+    if elem_inclusion not in roi.ELEM_INCLUSION_POLICIES: 
+        raise ValueError(f"unknown element inclusion '{elem_inclusion}', expected one of {roi.ELEM_INCLUSION_POLICIES}")
+
+    if elem_inclusion == 'clip': 
+        raise ValueError("clipping needs the whole mesh in memory and cannot be combined with chunk_size")
+
+    # first pass: nodes and elements inside the ROI
+    roi_mask = np.zeros(numNodes, dtype=bool)
+    elem_roi_mask = np.zeros(numElems, dtype=bool)
+
+    # nodes of the kept elements, kept besides the nodes inside the ROI with elem_inclusion 'any' or 'centroid'
+    nodes_of_kept_elems_mask = np.zeros(numNodes, dtype=bool) if elem_inclusion != 'all' else None
+
+    # element centroids need the coordinates of all nodes
+    nodal_coords_array = np.empty((numNodes, numDims)) if elem_inclusion == 'centroid' else None
+
+    def mask_roi_chunk(parsed_chunk): 
+
+        section, first_row, _, chunk = parsed_chunk
+
+        # the coordinates section comes first, so the node mask is complete when the elements are masked
+        if section == 'coordinates': 
+            roi_mask[first_row:first_row + len(chunk)] = region.get_mask(chunk)
+            if nodal_coords_array is not None: 
+                nodal_coords_array[first_row:first_row + len(chunk)] = chunk
+
+        elif section == 'elements': 
+            chunk_elem_roi_mask = roi.get_elem_roi_mask(chunk, roi_mask, region, nodal_coords_array, elem_inclusion)
+            elem_roi_mask[first_row:first_row + len(chunk)] = chunk_elem_roi_mask
+
+            if nodes_of_kept_elems_mask is not None: 
+                roi.add_nodes_of_kept_elems(nodes_of_kept_elems_mask, chunk, chunk_elem_roi_mask)
+
+    pipeline.run_pipeline(('reader', iter_COMSOL_section_wise_chunk_lines(inputFolderPath, input_comsol_file_name, chunk_size, sections = ('coordinates', 'elements'))), 
+                          [('parser', lambda chunk_lines: parse_COMSOL_section_wise_chunk_lines(chunk_lines, 'double'))], 
+                          ('roi mask', mask_roi_chunk), 
+                          queue_depth)
+
+    # the coordinates are read again in the second pass
+    nodal_coords_array = None
+
+    # the nodes of kept elements are added after all elements are masked, the masks of the elements use the nodes inside the ROI only
+    if nodes_of_kept_elems_mask is not None: 
+        roi_mask |= nodes_of_kept_elems_mask
+
+    num_elems_aft_roi_cropping = int(np.count_nonzero(elem_roi_mask))
+
+    new_node_id_map = cast_int_array_to_precision(Node.get_new_node_id_map_from_roi_mask(roi_mask), precision, 'node id')
+
+    num_nodes_aft_roi_cropping = int(np.count_nonzero(roi_mask))
+
+    # second pass: write the cropped chunks
+    exo_output = exodus_backend.create_exodus_file(outputFolderPath + outputExodusFilename, num_dim=numDims, num_nodes = num_nodes_aft_roi_cropping, num_elem = num_elems_aft_roi_cropping, num_elem_blk = numElemBlocks, num_assembly=numAssembly, 
+                                                   float_word_size = get_float_word_size(precision))
+
+    exo_output.put_elem_blk_info(elem_blk_id=1, elem_type = 'Tet', num_blk_elems = num_elems_aft_roi_cropping, num_elem_nodes = num_nodes_per_elem)
+
+    #putting simulation data
+    _, columns_var_steps = put_nodal_variables_and_times(exo_output, data_headers, num_nodes_aft_roi_cropping, chunk_size)
+
+    collapsed_elems_check = get_collapsed_elems_check(numNodes, numDims, precision)
+
+    def crop_chunk(chunk_lines_of_section): 
+
+        section, first_row, first_column, chunk_lines = chunk_lines_of_section
+
+        chunk_double = _parse_COMSOL_section_wise_chunk(section, chunk_lines)
+        chunk = cast_COMSOL_section_wise_chunk_to_precision(section, chunk_double, precision)
+
+        if collapsed_elems_check is not None and section == 'coordinates': 
+            collapsed_elems_check.add_coords_chunk(first_row, chunk_double, chunk)
+
+        if section == 'elements': 
+            # only the kept elements are checked, as cast_mesh_to_precision() checks the cropped mesh
+            elem_conn_roi_cropped = chunk[elem_roi_mask[first_row:first_row + len(chunk)]]
+            if collapsed_elems_check is not None: 
+                collapsed_elems_check.check_elems_chunk(first_row, elem_conn_roi_cropped)
+            return section, first_row, first_column, new_node_id_map[elem_conn_roi_cropped - 1]
+
+        # coordinates and data rows of the nodes inside the ROI
+        return section, first_row, first_column, chunk[roi_mask[first_row:first_row + len(chunk)]]
+
+    num_nodes_written = 0
+    num_elems_written = 0
+    num_data_written = 0
+
+    def write_cropped_chunk(cropped_chunk): 
+
+        nonlocal num_nodes_written, num_elems_written, num_data_written
+
+        section, first_row, first_column, chunk = cropped_chunk
+
+        if section == 'coordinates': 
+            exo_output.put_coords(chunk, num_nodes_written)
+            exo_output.put_node_id_map(np.arange(num_nodes_written + 1, num_nodes_written + len(chunk) + 1), num_nodes_written)
+            num_nodes_written += len(chunk)
+
+        elif section == 'elements': 
+            exo_output.put_elem_connectivity(1, chunk, num_elems_written)
+            exo_output.put_elem_id_map(np.arange(num_elems_written + 1, num_elems_written + len(chunk) + 1), num_elems_written)
+            num_elems_written += len(chunk)
+
+        elif section == 'data': 
+            if first_row == 0: 
+                num_data_written = 0
+
+            put_nodal_sim_data(exo_output, columns_var_steps[first_column:first_column + chunk.shape[1]], chunk, num_data_written)
+            num_data_written += len(chunk)
+
+    try: 
+        pipeline.run_pipeline(('reader', iter_COMSOL_section_wise_chunk_lines(inputFolderPath, input_comsol_file_name, chunk_size)), 
+                              [('parser and ROI mapper', crop_chunk)], 
+                              ('writer', write_cropped_chunk), 
+                              queue_depth)
+    finally: 
+        exo_output.close()
+
+    print("Exodus file generated from COMSOL data")
+
+def parse_COMSOL_section_wise_chunk_lines(chunk_lines_of_section, precision = 'double'): 
+
+    """
+    Parses a chunk of iter_COMSOL_section_wise_chunk_lines() and casts it to the dtypes of a precision mode
+
+    Returns tuple as iter_COMSOL_section_wise_chunks()
+    """
+
+    section, first_row, first_column, chunk_lines = chunk_lines_of_section
+
+    chunk = cast_COMSOL_section_wise_chunk_to_precision(section, _parse_COMSOL_section_wise_chunk(section, chunk_lines), precision)
+
+    return section, first_row, first_column, chunk
+
+def cast_COMSOL_section_wise_chunk_to_precision(section, chunk, precision): 
+
+    """
+    Casts a chunk of iter_COMSOL_section_wise_chunks() to the dtypes of a precision mode
+
+    Returns numpy array of the chunk
+    """
+
+    if section == 'elements': 
+        return cast_int_array_to_precision(chunk, precision, 'connectivity')
+
+    return cast_float_array_to_precision(chunk, precision, 'coordinate' if section == 'coordinates' else 'nodal data')
+
+def read_COMSOL_section_wise_header(inputFolderPath, input_comsol_file_name): 
+
+    """
+    Reads the header of a COMSOL file in section-wise format without parsing the mesh and simulation data
+
+    Note: the rows of each section are skipped without being parsed, apart from the first row of the element and data sections 
+    which gives the number of nodes per element and the number of data columns
+
+    Returns number of dimensions, nodes, elements, nodes per element and list of the headers of all data columns
+    """
+
+    numDims = numNodes = numElems = num_nodes_per_elem = None
+    data_headers = []
+
+    with open(inputFolderPath + input_comsol_file_name, 'r') as input_file: 
+        for line in input_file: 
+            if re.search("Dimension", line):
+                numDims = int(re.findall(r'\d', line)[0])
+
+            elif re.search("Nodes", line):
+                numNodes = int(re.findall(r'\d+', line)[0])
+
+            elif re.search("Elements:", line):
+                numElems = int(re.findall(r'\d+', line)[0])
+
+            elif re.search("Coordinates", line): 
+                _skip_lines(input_file, numNodes)
+
+            elif re.search("Element", line): 
+                num_nodes_per_elem = Element_Tetrahedra.get_num_nodes_per_elem([next(input_file)])
+                _skip_lines(input_file, numElems - 1)
+
+            elif re.search("Data", line): 
+                num_data_columns = len(next(input_file).split())
+                data_headers += Node.get_nodal_sim_data_headers(line, num_data_columns)
+                _skip_lines(input_file, numNodes - 1)
+
+    return numDims, numNodes, numElems, num_nodes_per_elem, data_headers
+
+def _skip_lines(input_file, num_lines): 
+
+    """
+    Skips a number of lines of an open text file
+
+    Returns none
+    """
+
+    for _ in range(0, num_lines): 
+        next(input_file)
+
+def iter_COMSOL_section_wise_chunks(inputFolderPath, input_comsol_file_name, chunk_size = DEFAULT_CHUNK_SIZE, sections = ('coordinates', 'elements', 'data')): 
+
+    """
+    Reads COMSOL file in section-wise format one chunk of at most chunk_size rows at a time
+
+    Note: reading stops once the last of the requested sections has been read
+
+    Yields tuples of (section name, 0-based index of the first row of the chunk, 0-based index of the first data column of the section, numpy array of the chunk). 
+    Coordinates chunks are (rows, dimension) float arrays, elements chunks are (rows, nodes per element) arrays of 1-based node ids
+    and data chunks are (rows, data columns of the section) float arrays. The data column index counts the columns of all previous data sections, 
+    it is 0 for the coordinates and elements sections. 
+    """
+
+    for section, first_row, first_column, chunk_lines in iter_COMSOL_section_wise_chunk_lines(inputFolderPath, input_comsol_file_name, chunk_size, sections): 
+        yield section, first_row, first_column, _parse_COMSOL_section_wise_chunk(section, chunk_lines)
+
+def iter_COMSOL_section_wise_chunk_lines(inputFolderPath, input_comsol_file_name, chunk_size = DEFAULT_CHUNK_SIZE, sections = ('coordinates', 'elements', 'data')): 
+
+    """
+    Reads COMSOL file in section-wise format one chunk of at most chunk_size rows at a time without parsing the rows, 
+    so that parsing can run in another pipeline stage than reading
+
+    Yields tuples as iter_COMSOL_section_wise_chunks() with the list of text lines of the chunk instead of the numpy array
+    """
+
+    numNodes = numElems = None
+    first_column = 0
+    num_section_columns = 0
+
+    with open(inputFolderPath + input_comsol_file_name, 'r') as input_file: 
+
+        sections_left = set(sections)
+        section = None
+
+        for line in input_file: 
+
+            if re.search("Nodes", line):
+                numNodes = int(re.findall(r'\d+', line)[0])
+                continue
+
+            elif re.search("Elements:", line):
+                numElems = int(re.findall(r'\d+', line)[0])
+                continue
+
+            elif re.search("Coordinates", line): 
+                section, num_rows = 'coordinates', numNodes
+
+            elif re.search("Element", line): 
+                section, num_rows = 'elements', numElems
+
+            elif re.search("Data", line): 
+                if section == 'data': 
+                    first_column += num_section_columns
+                section, num_rows = 'data', numNodes
+
+            else: 
+                continue
+
+            if section not in sections_left: 
+                # skip the rows of a section that was not requested
+                _skip_lines(input_file, num_rows)
+                continue
+
+            for first_row in range(0, num_rows, chunk_size): 
+                # the lines of a chunk are read in one call instead of one loop iteration per line
+                chunk_lines = list(itertools.islice(input_file, min(chunk_size, num_rows - first_row)))
+
+                if section == 'data' and first_row == 0: 
+                    num_section_columns = len(chunk_lines[0].split())
+
+                yield section, first_row, first_column, chunk_lines
+
+            if section != 'data': 
+                sections_left.discard(section)
+                if not sections_left: 
+                    return
+
+def _parse_COMSOL_section_wise_chunk(section, chunk_lines): 
+
+    """
+    Parses the lines of one chunk of a section of a COMSOL file in section-wise format
+
+    Returns numpy array of the chunk
+    """
+
+    if section == 'coordinates': 
+        return np.array(''.join(chunk_lines).split(), dtype=np.float64).reshape(len(chunk_lines), -1)
+
+    elif section == 'elements': 
+        return np.array(''.join(chunk_lines).split(), dtype=np.int64).reshape(len(chunk_lines), -1)
+
+    return Node.get_nodal_sim_data_columns(chunk_lines)
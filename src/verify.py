@@ -0,0 +1,388 @@
+'''
+ExoToComsol
+
+Copyright 2024 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains certain rights in this software.
+
+BSD 3-Clause License
+'''
+import itertools
+import numpy as np
+
+from src import util
+from src import exodus_backend
+from src import Node
+from src import Element_Tetrahedra
+
+EXODUS_FILE_EXTENSIONS = ('.e', '.exo', '.g')
+
+# number of offending ids listed in the report of each check
+NUM_OFFENDING_IDS_REPORTED = 10
+
+def verify(referenceFolderPath, reference_file_name, candidateFolderPath, candidate_file_name,
+           coord_tol = 1e-9, data_rtol = 1e-9, data_atol = 1e-12, roi_cropped = False, exodus_step = None):
+
+    """
+    Verifies a conversion by comparing a converted (candidate) file against the file it was converted from or round-tripped through (reference)
+
+    Note: each file is either an Exodus file (extensions in EXODUS_FILE_EXTENSIONS) or a COMSOL file in section-wise format.
+    Nodes are matched by coordinates within coord_tol, so renumbered meshes compare equal. With roi_cropped the candidate
+    only has to be a subset of the reference, as for the output of the ROI conversions. Elements are compared as sets of matched nodes,
+    and tetrahedra must also have the same orientation. Nodal data columns are matched by variable name and time, see match_data_columns(), 
+    a value is wrong if |candidate - reference| > data_atol + data_rtol * |reference|.
+    For Exodus files the nodal variables at all time steps are used, or only at exodus_step, a 1-based step or 'last'.
+
+    Returns dictionary with the report, which is also printed
+    """
+
+    reference = read_mesh_arrays(referenceFolderPath, reference_file_name, exodus_step)
+    candidate = read_mesh_arrays(candidateFolderPath, candidate_file_name, exodus_step)
+
+    report = compare_mesh_arrays(reference, candidate, coord_tol, data_rtol, data_atol, roi_cropped)
+
+    print_verification_report(report, reference_file_name, candidate_file_name)
+
+    return report
+
+def read_mesh_arrays(folderPath, file_name, exodus_step = None):
+
+    """
+    Reads the mesh and nodal data of an Exodus file or COMSOL file in section-wise format as arrays
+
+    Returns dictionary with (num_nodes, dimension) coordinates, (num_elems, nodes per element) 1-based connectivity, (num_nodes, num_data_columns) nodal data 
+    and list of (variable name, time) of each data column, the time is None if the column has none
+    """
+
+    if file_name.lower().endswith(EXODUS_FILE_EXTENSIONS):
+        return read_exodus_arrays(folderPath, file_name, exodus_step)
+
+    return read_COMSOL_section_wise_arrays(folderPath, file_name)
+
+def read_exodus_arrays(folderPath, file_name, exodus_step = None):
+
+    """
+    Reads the mesh and nodal data of an Exodus file as arrays
+
+    Note: connectivity of all element blocks is stacked, the blocks must have the same number of nodes per element. 
+    The data columns are the nodal variables at each time step, or only at exodus_step (1-based step or 'last')
+
+    Returns dictionary with coordinates, connectivity and nodal data arrays
+    """
+
+    exo = exodus_backend.open_exodus_file(folderPath + file_name)
+
+    nodal_coords_array = exo.get_coords()
+
+    elem_conn_of_blocks = [exo.get_elem_connectivity(elem_blk_id) for elem_blk_id in exo.get_elem_blk_ids()]
+
+    nodal_variable_names_list = exo.get_node_variable_names()
+    time_values = exo.get_times()
+
+    if exodus_step is None:
+        steps = range(1, len(time_values) + 1)
+    else:
+        steps = [len(time_values) if exodus_step == 'last' else exodus_step]
+
+    data_columns = [(name, float(time_values[step - 1])) for step in steps for name in nodal_variable_names_list]
+
+    nodal_sim_data = np.column_stack([exo.get_node_variable_values(name, step) for step in steps for name in nodal_variable_names_list]) \
+                     if data_columns else np.zeros((len(nodal_coords_array), 0))
+
+    exo.close()
+
+    return {'coords': nodal_coords_array,
+            'elem_conn': np.vstack(elem_conn_of_blocks),
+            'nodal_sim_data': nodal_sim_data,
+            'data_columns': data_columns}
+
+def read_COMSOL_section_wise_arrays(folderPath, file_name):
+
+    """
+    Reads the mesh and nodal data of a COMSOL file in section-wise format as arrays
+
+    Returns dictionary with coordinates, connectivity and nodal data arrays
+    """
+
+    sections = {'coordinates': [], 'elements': [], 'data': []}
+    data_columns_of_sections = {}
+
+    for section, first_row, first_column, chunk in util.iter_COMSOL_section_wise_chunks(folderPath, file_name):
+        if section == 'data':
+            data_columns_of_sections.setdefault(first_column, []).append(chunk)
+        else:
+            sections[section].append(chunk)
+
+    nodal_sim_data_of_sections = [np.vstack(data_columns_of_sections[first_column]) for first_column in sorted(data_columns_of_sections)]
+
+    data_headers = util.read_COMSOL_section_wise_header(folderPath, file_name)[4]
+
+    return {'coords': np.vstack(sections['coordinates']),
+            'elem_conn': np.vstack(sections['elements']),
+            'nodal_sim_data': np.hstack(nodal_sim_data_of_sections),
+            'data_columns': [Node.get_nodal_variable_name_and_time(header, i) for i, header in enumerate(data_headers)]}
+
+def hash_rows(rows):
+
+    """
+    Hashes each row of a 2D integer array into one 64-bit key (splitmix64 finalizer applied after mixing in each column)
+
+    Returns uint64 array of keys
+    """
+
+    keys = np.zeros(len(rows), dtype=np.uint64)
+
+    for column in np.asarray(rows).T:
+        keys = keys * np.uint64(0x9E3779B97F4A7C15) + column.astype(np.uint64)
+        keys ^= keys >> np.uint64(30)
+        keys *= np.uint64(0xBF58476D1CE4E5B9)
+        keys ^= keys >> np.uint64(27)
+        keys *= np.uint64(0x94D049BB133111EB)
+        keys ^= keys >> np.uint64(31)
+
+    return keys
+
+def match_rows(reference_rows, candidate_rows):
+
+    """
+    Matches equal rows of two 2D integer arrays through one sort of the 64-bit hashes of the reference rows
+
+    Note: a hash match is only accepted if the rows are equal
+
+    Returns for each candidate row the index of an equal reference row, or -1 if there is none
+    """
+
+    return match_rows_with_index(get_row_key_index(reference_rows), reference_rows, candidate_rows)
+
+def get_row_key_index(reference_rows):
+
+    """
+    Gets the sorted 64-bit hashes of the rows of a 2D integer array, to match many sets of candidate rows against it with match_rows_with_index()
+
+    Returns order of the rows sorting their keys and the sorted keys
+    """
+
+    reference_keys = hash_rows(reference_rows)
+    order = np.argsort(reference_keys)
+
+    return order, reference_keys[order]
+
+def match_rows_with_index(reference_key_index, reference_rows, candidate_rows):
+
+    """
+    Matches candidate rows against the rows of a 2D integer array using its index from get_row_key_index()
+
+    Note: a hash match is only accepted if the rows are equal
+
+    Returns for each candidate row the index of an equal reference row, or -1 if there is none
+    """
+
+    if len(reference_rows) == 0:
+        return np.full(len(candidate_rows), -1, dtype=np.int64)
+
+    order, sorted_reference_keys = reference_key_index
+    candidate_keys = hash_rows(candidate_rows)
+
+    # searching with sorted keys keeps the binary searches cache friendly
+    candidate_order = np.argsort(candidate_keys)
+    positions = np.empty(len(candidate_keys), dtype=np.int64)
+    positions[candidate_order] = np.searchsorted(sorted_reference_keys, candidate_keys[candidate_order])
+    positions = np.minimum(positions, len(order) - 1)
+    reference_row_of_candidate = order[positions]
+
+    matched = (sorted_reference_keys[positions] == candidate_keys) & (reference_rows[reference_row_of_candidate] == candidate_rows).all(axis=1)
+
+    return np.where(matched, reference_row_of_candidate, -1)
+
+def match_quantized_coords(reference_coords, candidate_coords, coord_tol):
+
+    """
+    Matches nodes of two meshes on their coordinates quantized to coord_tol
+
+    Note: coordinates closer than coord_tol can be quantized to neighbouring cells, so candidate nodes without a match
+    are matched again with the neighbouring cells, only needed for nodes close to a cell boundary. The reference keys are sorted once for all cells
+
+    Returns for each candidate node the index of a reference node, or -1 if there is none
+    """
+
+    reference_cells = np.round(reference_coords / coord_tol).astype(np.int64)
+    candidate_cells = np.round(candidate_coords / coord_tol).astype(np.int64)
+
+    reference_key_index = get_row_key_index(reference_cells)
+
+    reference_node_of_candidate = match_rows_with_index(reference_key_index, reference_cells, candidate_cells)
+
+    for offset in itertools.product((-1, 0, 1), repeat = reference_coords.shape[1]):
+        not_matched = np.flatnonzero(reference_node_of_candidate < 0)
+        if len(not_matched) == 0:
+            break
+
+        if any(offset):
+            reference_node_of_candidate[not_matched] = match_rows_with_index(reference_key_index, reference_cells, candidate_cells[not_matched] + np.array(offset))
+
+    return reference_node_of_candidate
+
+def compare_mesh_arrays(reference, candidate, coord_tol = 1e-9, data_rtol = 1e-9, data_atol = 1e-12, roi_cropped = False):
+
+    """
+    Compares the arrays of two meshes read with read_mesh_arrays()
+
+    Note: node and element ids in the report are 1-based ids of the candidate mesh
+
+    Returns dictionary with the report
+    """
+
+    report = {'num_nodes_reference': len(reference['coords']),
+              'num_nodes_candidate': len(candidate['coords']),
+              'num_elems_reference': len(reference['elem_conn']),
+              'num_elems_candidate': len(candidate['elem_conn'])}
+
+    # nodes: match on coordinates quantized to the tolerance, then check the actual distance
+    reference_node_of_candidate = match_quantized_coords(reference['coords'], candidate['coords'], coord_tol)
+    matched_nodes = reference_node_of_candidate >= 0
+
+    coord_errors = np.full(len(candidate['coords']), np.inf)
+    coord_errors[matched_nodes] = np.abs(candidate['coords'][matched_nodes] - reference['coords'][reference_node_of_candidate[matched_nodes]]).max(axis=1)
+    nodes_not_matched = coord_errors > coord_tol
+
+    report['max_coord_error'] = float(coord_errors[~nodes_not_matched].max()) if (~nodes_not_matched).any() else 0.0
+    report['num_nodes_not_matched'] = int(nodes_not_matched.sum())
+    report['first_node_ids_not_matched'] = (np.flatnonzero(nodes_not_matched)[:NUM_OFFENDING_IDS_REPORTED] + 1).tolist()
+
+    # elements: compare the sorted node ids of each element in reference numbering
+    reference_node_of_candidate[nodes_not_matched] = -1
+    candidate_elem_conn = reference_node_of_candidate[candidate['elem_conn'] - 1]
+    elems_with_unmatched_nodes = (candidate_elem_conn < 0).any(axis=1)
+
+    reference_elem_of_candidate = match_rows(np.sort(reference['elem_conn'] - 1, axis=1), np.sort(candidate_elem_conn, axis=1))
+    elems_not_matched = (reference_elem_of_candidate < 0) | elems_with_unmatched_nodes
+
+    report['num_elems_not_matched'] = int(elems_not_matched.sum())
+    report['first_elem_ids_not_matched'] = (np.flatnonzero(elems_not_matched)[:NUM_OFFENDING_IDS_REPORTED] + 1).tolist()
+
+    # orientation: the sorted node ids hide the node order, so matched tetrahedra must also have the sign of the volume of the reference element
+    elems_inverted = np.zeros(len(candidate['elem_conn']), dtype=bool)
+
+    if has_tetrahedra(reference) and has_tetrahedra(candidate):
+        matched_elems = np.flatnonzero(~elems_not_matched)
+        reference_signs = np.sign(Element_Tetrahedra.get_elem_volumes_from_arrays(reference['coords'], reference['elem_conn'][reference_elem_of_candidate[matched_elems]], signed=True))
+        candidate_signs = np.sign(Element_Tetrahedra.get_elem_volumes_from_arrays(candidate['coords'], candidate['elem_conn'][matched_elems], signed=True))
+        elems_inverted[matched_elems] = reference_signs != candidate_signs
+        report['num_elems_inverted'] = int(elems_inverted.sum())
+        report['first_elem_ids_inverted'] = (np.flatnonzero(elems_inverted)[:NUM_OFFENDING_IDS_REPORTED] + 1).tolist()
+
+    if not roi_cropped:
+        reference_elems_found = np.zeros(len(reference['elem_conn']), dtype=bool)
+        reference_elems_found[reference_elem_of_candidate[~elems_not_matched]] = True
+        report['num_reference_elems_missing'] = int((~reference_elems_found).sum())
+
+    # nodal data: compare the matched columns at the matched nodes
+    reference_columns, candidate_columns, report['data_columns_matched_by'] = match_data_columns(reference['data_columns'], candidate['data_columns'])
+    report['num_data_columns_reference'] = len(reference['data_columns'])
+    report['num_data_columns_candidate'] = len(candidate['data_columns'])
+    report['num_data_columns_compared'] = len(candidate_columns)
+
+    candidate_data = candidate['nodal_sim_data'][~nodes_not_matched][:, candidate_columns]
+    reference_data = reference['nodal_sim_data'][reference_node_of_candidate[~nodes_not_matched]][:, reference_columns]
+
+    data_errors = np.abs(candidate_data - reference_data)
+    data_wrong = data_errors > data_atol + data_rtol * np.abs(reference_data)
+    nodes_with_wrong_data = np.flatnonzero(~nodes_not_matched)[data_wrong.any(axis=1)]
+
+    report['max_data_error'] = float(data_errors.max()) if data_errors.size else 0.0
+    report['max_relative_data_error'] = float((data_errors / np.maximum(np.abs(reference_data), np.finfo(float).tiny)).max()) if data_errors.size else 0.0
+    report['num_data_values_wrong'] = int(data_wrong.sum())
+    report['first_node_ids_with_wrong_data'] = (nodes_with_wrong_data[:NUM_OFFENDING_IDS_REPORTED] + 1).tolist()
+
+    counts_match = roi_cropped or (report['num_nodes_reference'] == report['num_nodes_candidate'] and report['num_elems_reference'] == report['num_elems_candidate'])
+
+    report['passed'] = bool(counts_match
+                            and report['num_nodes_not_matched'] == 0
+                            and report['num_elems_not_matched'] == 0
+                            and report.get('num_reference_elems_missing', 0) == 0
+                            and report.get('num_elems_inverted', 0) == 0
+                            and report['data_columns_matched_by'] is not None
+                            and report['num_data_values_wrong'] == 0)
+
+    return report
+
+def has_tetrahedra(mesh):
+
+    """
+    Checks if a mesh read with read_mesh_arrays() is made of 4-node tetrahedra in 3D
+
+    Returns true or false
+    """
+
+    return mesh['coords'].shape[1] == 3 and mesh['elem_conn'].shape[1] == 4
+
+def match_data_columns(reference_columns, candidate_columns):
+
+    """
+    Matches the nodal data columns of two meshes from their (variable name, time) descriptors
+
+    Note: if both meshes have columns at more than one time the columns are matched on name and time. Otherwise only the columns at 
+    the last time are used, e.g. the reference Exodus file of a COMSOL file converted with exoToComsol(), and matched on name if both 
+    have the same unique names, else in order. The matched columns must cover all used columns of both meshes
+
+    Returns list of reference column indices, list of candidate column indices and how the columns were matched ('name and time', 
+    'name' or 'order'), or None if the columns do not match and two empty lists
+    """
+
+    reference_times = sorted({time for _, time in reference_columns if time is not None})
+    candidate_times = sorted({time for _, time in candidate_columns if time is not None})
+
+    if len(reference_times) > 1 and len(candidate_times) > 1:
+
+        reference_index_of_key = {(name, time): i for i, (name, time) in enumerate(reference_columns)}
+        candidate_index_of_key = {(name, time): i for i, (name, time) in enumerate(candidate_columns)}
+
+        if len(reference_index_of_key) != len(reference_columns) or reference_index_of_key.keys() != candidate_index_of_key.keys():
+            return [], [], None
+
+        keys = list(reference_index_of_key)
+        return [reference_index_of_key[key] for key in keys], [candidate_index_of_key[key] for key in keys], 'name and time'
+
+    reference_indices = [i for i, (_, time) in enumerate(reference_columns) if time is None or time == reference_times[-1]]
+    candidate_indices = [i for i, (_, time) in enumerate(candidate_columns) if time is None or time == candidate_times[-1]]
+
+    if len(reference_indices) != len(candidate_indices):
+        return [], [], None
+
+    reference_names = [reference_columns[i][0] for i in reference_indices]
+    candidate_names = [candidate_columns[i][0] for i in candidate_indices]
+
+    if len(set(reference_names)) == len(reference_names) and set(reference_names) == set(candidate_names):
+        return reference_indices, [candidate_indices[candidate_names.index(name)] for name in reference_names], 'name'
+
+    return reference_indices, candidate_indices, 'order'
+
+def print_verification_report(report, reference_file_name, candidate_file_name):
+
+    """
+    Prints the report of a verification
+
+    Returns none
+    """
+
+    print(f"Verification of {candidate_file_name} against {reference_file_name}: {'PASSED' if report['passed'] else 'FAILED'}")
+    print(f"  nodes: {report['num_nodes_candidate']} candidate, {report['num_nodes_reference']} reference, "
+          f"{report['num_nodes_not_matched']} not matched, max coordinate error {report['max_coord_error']:.3e}")
+    if report['num_nodes_not_matched']:
+        print(f"    first node ids not matched: {report['first_node_ids_not_matched']}")
+
+    print(f"  elements: {report['num_elems_candidate']} candidate, {report['num_elems_reference']} reference, {report['num_elems_not_matched']} not matched"
+          + (f", {report['num_reference_elems_missing']} reference elements missing" if 'num_reference_elems_missing' in report else ""))
+    if report['num_elems_not_matched']:
+        print(f"    first element ids not matched: {report['first_elem_ids_not_matched']}")
+    if 'num_elems_inverted' in report:
+        print(f"    {report['num_elems_inverted']} tetrahedra inverted" + (f", first element ids: {report['first_elem_ids_inverted']}" if report['num_elems_inverted'] else ""))
+    else:
+        print("    orientation not checked, only done for tetrahedra")
+
+    if report['data_columns_matched_by'] is None:
+        print(f"  nodal data: columns do not match, {report['num_data_columns_candidate']} candidate, {report['num_data_columns_reference']} reference")
+    else:
+        print(f"  nodal data: {report['num_data_columns_compared']} columns compared by {report['data_columns_matched_by']}, {report['num_data_values_wrong']} values out of tolerance, "
+              f"max error {report['max_data_error']:.3e}, max relative error {report['max_relative_data_error']:.3e}")
+    if report['num_data_values_wrong']:
+        print(f"    first node ids with wrong data: {report['first_node_ids_with_wrong_data']}")
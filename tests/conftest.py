@@ -0,0 +1,61 @@
+'''
+ExoToComsol
+
+Copyright 2024 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains certain rights in this software.
+
+BSD 3-Clause License
+'''
+import itertools
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# the modules are imported as src.<module> from the repository root, as in the drivers
+REPO_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_PATH)
+
+INPUT_FOLDER_PATH = os.path.join(REPO_PATH, 'input_folder') + os.sep
+EXODUS_FILE_NAME = 'result_heat_conduction_Aria.e'
+COMSOL_FILE_NAME = 'forComsolToExoInput.txt'
+
+def get_cube_mesh(num_cells):
+
+    """
+    Gets a structured tetrahedral mesh of the unit cube, each of the num_cells^3 cells split into the 6 tetrahedra around its diagonal
+
+    Note: all tetrahedra have positive volume
+
+    Returns (num_nodes, 3) coordinates and (num_elems, 4) 1-based connectivity
+    """
+
+    grid = np.linspace(0.0, 1.0, num_cells + 1)
+    nodal_coords_array = np.array(list(itertools.product(grid, grid, grid)))
+
+    elem_conn = []
+    for cell in itertools.product(range(num_cells), repeat = 3):
+        for axes in itertools.permutations(range(3)):
+            corner = np.array(cell)
+            corners = [corner]
+            for axis in axes:
+                corner = corner.copy()
+                corner[axis] += 1
+                corners.append(corner)
+            elem_conn.append([(i * (num_cells + 1) + j) * (num_cells + 1) + k + 1 for i, j, k in corners])
+
+    elem_conn_array = np.array(elem_conn)
+
+    # the permutations alternate the orientation
+    corners = nodal_coords_array[elem_conn_array - 1]
+    edges = corners[:, 1:] - corners[:, :1]
+    inverted = np.einsum('ij,ij->i', edges[:, 0], np.cross(edges[:, 1], edges[:, 2])) < 0
+    elem_conn_array[inverted] = elem_conn_array[inverted][:, [0, 1, 3, 2]]
+
+    return nodal_coords_array, elem_conn_array
+
+@pytest.fixture
+def cube_mesh():
+
+    return get_cube_mesh(4)
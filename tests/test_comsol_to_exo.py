@@ -0,0 +1,77 @@
+'''
+ExoToComsol
+
+Copyright 2024 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains certain rights in this software.
+
+BSD 3-Clause License
+'''
+import numpy as np
+import pytest
+
+from conftest import INPUT_FOLDER_PATH, COMSOL_FILE_NAME
+from src import exodus_backend
+from src import util
+
+ROI_BOUNDS = [[-0.5, 0.5], [-0.5, 0.5], [-0.5, 0.0]]
+
+def read_exodus_file(file_path):
+
+    """
+    Reads the arrays of an Exodus file written by the conversions, with the nodal values of each variable at each time step
+
+    Returns dictionary of arrays
+    """
+
+    exo = exodus_backend.open_exodus_file(file_path)
+    arrays = {'coords': exo.get_coords(), 
+              'elem_conn': exo.get_elem_connectivity(exo.get_elem_blk_ids()[0]), 
+              'times': exo.get_times(), 
+              'node_variable_names': exo.get_node_variable_names()}
+    arrays['nodal_sim_data'] = np.column_stack([exo.get_node_variable_values(name, step) 
+                                                for step in range(1, len(arrays['times']) + 1) for name in arrays['node_variable_names']])
+    exo.close()
+
+    return arrays
+
+def assert_same_exodus_arrays(arrays, expected_arrays):
+
+    assert arrays['node_variable_names'] == expected_arrays['node_variable_names']
+    for name in ('coords', 'elem_conn', 'times', 'nodal_sim_data'):
+        assert np.array_equal(arrays[name], expected_arrays[name]), name
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 4, 1000])
+def test_chunked_conversion_matches_in_memory(tmp_path, chunk_size):
+
+    output_folder_path = str(tmp_path) + '/'
+    util.comsolToExo(INPUT_FOLDER_PATH, COMSOL_FILE_NAME, output_folder_path, 'in_memory.e')
+    util.comsolToExo(INPUT_FOLDER_PATH, COMSOL_FILE_NAME, output_folder_path, 'chunked.e', chunk_size = chunk_size)
+
+    arrays = read_exodus_file(output_folder_path + 'chunked.e')
+
+    assert arrays['coords'].dtype == np.float64
+    assert_same_exodus_arrays(arrays, read_exodus_file(output_folder_path + 'in_memory.e'))
+
+@pytest.mark.parametrize('elem_inclusion', ['all', 'any', 'centroid'])
+@pytest.mark.parametrize('chunk_size', [2, 5])
+def test_chunked_roi_conversion_matches_in_memory(tmp_path, elem_inclusion, chunk_size):
+
+    output_folder_path = str(tmp_path) + '/'
+    util.comsolToExo_with_ROI(INPUT_FOLDER_PATH, COMSOL_FILE_NAME, output_folder_path, 'in_memory.e', ROI_BOUNDS, elem_inclusion = elem_inclusion)
+    util.comsolToExo_with_ROI(INPUT_FOLDER_PATH, COMSOL_FILE_NAME, output_folder_path, 'chunked.e', ROI_BOUNDS, chunk_size = chunk_size, 
+                              elem_inclusion = elem_inclusion)
+
+    arrays = read_exodus_file(output_folder_path + 'chunked.e')
+
+    assert 0 < len(arrays['elem_conn'])
+    assert_same_exodus_arrays(arrays, read_exodus_file(output_folder_path + 'in_memory.e'))
+
+def test_chunked_conversion_needs_no_renumbering(tmp_path):
+
+    with pytest.raises(ValueError):
+        util.comsolToExo(INPUT_FOLDER_PATH, COMSOL_FILE_NAME, str(tmp_path) + '/', 'out.e', chunk_size = 4, node_renumbering = 'rcm')
+
+def test_chunked_roi_conversion_cannot_clip(tmp_path):
+
+    with pytest.raises(ValueError):
+        util.comsolToExo_with_ROI(INPUT_FOLDER_PATH, COMSOL_FILE_NAME, str(tmp_path) + '/', 'out.e', ROI_BOUNDS, chunk_size = 4, elem_inclusion = 'clip')
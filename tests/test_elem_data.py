@@ -0,0 +1,138 @@
+'''
+ExoToComsol
+
+Copyright 2024 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains certain rights in this software.
+
+BSD 3-Clause License
+'''
+import netCDF4
+import numpy as np
+import pytest
+
+from conftest import get_cube_mesh
+from src import exodus_backend
+from src import util
+
+def write_exodus_file_with_elem_variables(file_path, nodal_coords_array, elem_conn_array, elem_data_of_variables):
+
+    """
+    Writes an Exodus file with one nodal variable and element variables at two time steps with the netcdf backend, 
+    adding the element variables to the netCDF dataset as the Exodus library lays them out
+
+    Returns none
+    """
+
+    num_nodes, num_elems = len(nodal_coords_array), len(elem_conn_array)
+
+    exo = exodus_backend.create_exodus_file(file_path, num_dim = 3, num_nodes = num_nodes, num_elem = num_elems, num_elem_blk = 1, backend = 'netcdf')
+    exo.put_elem_blk_info(1, 'TETRA', num_elems, 4)
+    exo.put_times([0.0, 1.0])
+    exo.put_node_variable_names(['Temp'])
+    exo.put_node_variable_values(1, 1, np.zeros(num_nodes))
+    exo.put_node_variable_values(1, 2, nodal_coords_array[:, 0])
+    exo.put_coords(nodal_coords_array)
+    exo.put_elem_connectivity(1, elem_conn_array)
+    exo.put_node_id_map(np.arange(1, num_nodes + 1))
+    exo.put_elem_id_map(np.arange(1, num_elems + 1))
+    exo.close()
+
+    with netCDF4.Dataset(file_path, 'a') as dataset:
+        dataset.createDimension('num_elem_var', len(elem_data_of_variables))
+        name_elem_var = dataset.createVariable('name_elem_var', 'S1', ('num_elem_var', 'len_name'))
+        name_elem_var[:] = netCDF4.stringtochar(np.array(list(elem_data_of_variables), dtype = 'S256'))
+
+        for var_index, elem_data in enumerate(elem_data_of_variables.values(), start = 1):
+            values = dataset.createVariable(f'vals_elem_var{var_index}eb1', 'f8', ('time_step', 'num_el_in_blk1'))
+            values[0] = np.zeros(num_elems)
+            values[1] = elem_data
+
+@pytest.fixture
+def exodus_file_with_elem_variables(tmp_path, monkeypatch):
+
+    monkeypatch.setattr(exodus_backend, '_default_exodus_backend', 'netcdf')
+
+    nodal_coords_array, elem_conn_array = get_cube_mesh(2)
+    elem_data_of_variables = {'stress': np.arange(len(elem_conn_array), dtype = np.float64), 'strain': np.full(len(elem_conn_array), 0.5)}
+
+    folder_path = str(tmp_path) + '/'
+    write_exodus_file_with_elem_variables(folder_path + 'in.e', nodal_coords_array, elem_conn_array, elem_data_of_variables)
+
+    return folder_path, nodal_coords_array, elem_conn_array, elem_data_of_variables
+
+def test_projection_is_volume_weighted():
+
+    # the second element has twice the volume of the first, they share the face of nodes 1, 2 and 3
+    nodal_coords_array = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0], [0.0, 0.0, -2.0]])
+    elem_conn_array = np.array([[1, 2, 3, 4], [1, 3, 2, 5]])
+
+    nodal_data = util.project_elem_data_to_nodes(nodal_coords_array, elem_conn_array, np.array([1.0, 4.0]))
+
+    assert np.allclose(nodal_data[:, 0], [3.0, 3.0, 3.0, 1.0, 4.0])
+
+def test_projection_keeps_constant_data(cube_mesh):
+
+    nodal_coords_array, elem_conn_array = cube_mesh
+
+    nodal_data = util.project_elem_data_to_nodes(nodal_coords_array, elem_conn_array, np.column_stack((np.full(len(elem_conn_array), 2.0), 
+                                                                                                     np.full(len(elem_conn_array), -1.0))))
+
+    assert np.allclose(nodal_data, [2.0, -1.0])
+
+def test_projection_without_volume_has_no_nan():
+
+    # the second element is flat and node 6 is in no element
+    nodal_coords_array = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0], [1.0, 1.0, 0.0], [5.0, 5.0, 5.0]])
+    elem_conn_array = np.array([[1, 2, 3, 4], [2, 3, 5, 1]])
+
+    nodal_data = util.project_elem_data_to_nodes(nodal_coords_array, elem_conn_array, np.array([1.0, 3.0]))
+
+    assert not np.isnan(nodal_data).any()
+    # node 5 is only in the flat element, it gets its plain average, and the nodes of the first element get its value
+    assert np.allclose(nodal_data[:, 0], [1.0, 1.0, 1.0, 1.0, 3.0, 0.0])
+
+def test_elem_data_projected_to_nodes(exodus_file_with_elem_variables):
+
+    folder_path, nodal_coords_array, elem_conn_array, elem_data_of_variables = exodus_file_with_elem_variables
+
+    util.exoToComsol(folder_path, 'in.e', folder_path, 'out.txt', 'tetrahedra', elem_variable_names = ['stress'])
+
+    comsol_data = util.read_COMSOL_section_wise_data(folder_path, 'out.txt')
+    nodal_sim_data, data_headers = comsol_data[7], comsol_data[11]
+
+    assert data_headers == ['T (K)', 'stress']
+    assert np.allclose(nodal_sim_data[:, 0], nodal_coords_array[:, 0])
+    assert np.allclose(nodal_sim_data[:, 1], util.project_elem_data_to_nodes(nodal_coords_array, elem_conn_array, elem_data_of_variables['stress'])[:, 0])
+
+def test_elem_data_at_centroids(exodus_file_with_elem_variables):
+
+    folder_path, nodal_coords_array, elem_conn_array, elem_data_of_variables = exodus_file_with_elem_variables
+
+    util.exoToComsol(folder_path, 'in.e', folder_path, 'without.txt', 'tetrahedra')
+    util.exoToComsol(folder_path, 'in.e', folder_path, 'out.txt', 'tetrahedra', elem_variable_names = ['stress', 'strain'], elem_data_output = 'centroid')
+
+    # the section-wise file only has the nodal data
+    with open(folder_path + 'out.txt') as output_file, open(folder_path + 'without.txt') as expected_file:
+        assert output_file.read() == expected_file.read()
+
+    with open(folder_path + 'out_elem_data.txt') as elem_data_file:
+        assert elem_data_file.readline().split() == ['%', 'x', 'y', 'z', 'stress', 'strain']
+        rows = np.loadtxt(elem_data_file)
+
+    assert np.allclose(rows[:, :3], nodal_coords_array[elem_conn_array - 1].mean(axis = 1))
+    assert np.array_equal(rows[:, 3], elem_data_of_variables['stress'])
+    assert np.array_equal(rows[:, 4], elem_data_of_variables['strain'])
+
+def test_missing_elem_variable_refused(exodus_file_with_elem_variables):
+
+    folder_path = exodus_file_with_elem_variables[0]
+
+    with pytest.raises(ValueError, match = 'not in the Exodus file'):
+        util.exoToComsol(folder_path, 'in.e', folder_path, 'out.txt', 'tetrahedra', elem_variable_names = ['pressure'])
+
+def test_unknown_elem_data_output_refused(exodus_file_with_elem_variables):
+
+    folder_path = exodus_file_with_elem_variables[0]
+
+    with pytest.raises(ValueError, match = 'element data output'):
+        util.exoToComsol(folder_path, 'in.e', folder_path, 'out.txt', 'tetrahedra', elem_variable_names = ['stress'], elem_data_output = 'faces')
@@ -0,0 +1,109 @@
+'''
+ExoToComsol
+
+Copyright 2024 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains certain rights in this software.
+
+BSD 3-Clause License
+'''
+import numpy as np
+import pytest
+
+from conftest import INPUT_FOLDER_PATH, COMSOL_FILE_NAME
+from src import exodus_backend
+from src import Node
+from src import util
+from src import verify
+
+@pytest.mark.parametrize('header_line, num_data_columns, expected_headers', [
+    ("% Data (T (K)) \n", 1, ['T (K)']),
+    ("% Data (T (K) @ t=0, T (K) @ t=1)\n", 2, ['T (K) @ t=0', 'T (K) @ t=1']),
+    ("% Data (T (K) @ t=0) (u (m) @ t=0)\n", 2, ['T (K) @ t=0', 'u (m) @ t=0']),
+    # a header line not naming every column
+    ("% Data (T (K))\n", 3, ['', '', '']),
+])
+def test_data_section_headers(header_line, num_data_columns, expected_headers):
+
+    assert Node.get_nodal_sim_data_headers(header_line, num_data_columns) == expected_headers
+
+@pytest.mark.parametrize('data_header, column_index, expected', [
+    ('T (K) @ t=0.5', 0, ('T', 0.5)),
+    ('u @ t = 1e-3', 0, ('u', 1e-3)),
+    ('T (K)', 0, ('T', None)),
+    ('', 0, ('temp', None)),
+    ('', 2, ('temp_3', None)),
+])
+def test_variable_name_and_time(data_header, column_index, expected):
+
+    assert Node.get_nodal_variable_name_and_time(data_header, column_index) == expected
+
+def test_variables_at_sorted_times():
+
+    data_headers = ['T (K) @ t=1', 'u @ t=1', 'T (K) @ t=0', 'u @ t=0']
+
+    variable_names, time_values, columns_var_steps = Node.get_nodal_variables_and_times(data_headers)
+
+    assert variable_names == ['T', 'u']
+    assert time_values == [0.0, 1.0]
+    assert columns_var_steps == [(1, 2), (2, 2), (1, 1), (2, 1)]
+
+def test_columns_without_times():
+
+    variable_names, time_values, columns_var_steps = Node.get_nodal_variables_and_times(['T (K)', 'T (K)', ''])
+
+    # same name twice gets its own variable, the data is at the second of the times 0 and 1
+    assert variable_names == ['T', 'T_2', 'temp_3']
+    assert time_values == [0.0, 1.0]
+    assert columns_var_steps == [(1, 2), (2, 2), (3, 2)]
+
+def test_different_time_sets_refused():
+
+    with pytest.raises(ValueError, match = "'T' has data at times"):
+        Node.get_nodal_variables_and_times(['T @ t=0', 'T @ t=1', 'u @ t=0.5'])
+
+def write_comsol_file(folder_path, data_headers):
+
+    nodal_coords_array = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]])
+    nodal_sim_data = np.arange(4.0 * len(data_headers)).reshape(4, -1)
+
+    util.write_sectionwise_file_for_COMSOL_input_from_arrays(folder_path, 'in.txt', nodal_coords_array, np.array([[1, 2, 3, 4]]), 
+                                                             nodal_sim_data, 'tetrahedra', data_header = data_headers)
+
+@pytest.mark.parametrize('chunk_size', [None, 2])
+def test_variables_and_times_round_trip(tmp_path, chunk_size):
+
+    folder_path = str(tmp_path) + '/'
+    write_comsol_file(folder_path, ['T (K) @ t=0', 'u @ t=0', 'T (K) @ t=2.5', 'u @ t=2.5'])
+
+    util.comsolToExo(folder_path, 'in.txt', folder_path, 'out.e', chunk_size = chunk_size)
+
+    exo = exodus_backend.open_exodus_file(folder_path + 'out.e')
+    assert exo.get_node_variable_names() == ['T', 'u']
+    assert exo.get_times().tolist() == [0.0, 2.5]
+    assert exo.get_node_variable_values('u', 2).tolist() == [3.0, 7.0, 11.0, 15.0]
+    exo.close()
+
+    report = verify.verify(folder_path, 'in.txt', folder_path, 'out.e')
+    assert report['passed'] and report['data_columns_matched_by'] == 'name and time'
+
+@pytest.mark.parametrize('chunk_size', [None, 4])
+def test_data_without_times_starts_at_zero(tmp_path, chunk_size):
+
+    folder_path = str(tmp_path) + '/'
+    util.comsolToExo(INPUT_FOLDER_PATH, COMSOL_FILE_NAME, folder_path, 'out.e', chunk_size = chunk_size)
+
+    exo = exodus_backend.open_exodus_file(folder_path + 'out.e')
+    name = exo.get_node_variable_names()[0]
+
+    # the first time step is written as zeros instead of keeping the fill value
+    assert exo.get_times().tolist() == [0.0, 1.0]
+    assert (exo.get_node_variable_values(name, 1) == 0.0).all()
+    exo.close()
+
+def test_different_time_sets_conversion_refused(tmp_path):
+
+    folder_path = str(tmp_path) + '/'
+    write_comsol_file(folder_path, ['T @ t=0', 'T @ t=1', 'u @ t=0.5'])
+
+    with pytest.raises(ValueError, match = 'every variable needs one column at each time'):
+        util.comsolToExo(folder_path, 'in.txt', folder_path, 'out.e')
@@ -0,0 +1,75 @@
+'''
+ExoToComsol
+
+Copyright 2024 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains certain rights in this software.
+
+BSD 3-Clause License
+'''
+import pytest
+
+from conftest import INPUT_FOLDER_PATH, EXODUS_FILE_NAME
+from src import pipeline
+from src import util
+
+def test_items_keep_their_order():
+
+    results = []
+    pipeline.run_pipeline(('source', range(0, 100)), [('double', lambda item: 2 * item), ('add', lambda item: item + 1)], ('sink', results.append), 
+                          queue_depth = 1, print_counters = False)
+
+    assert results == [2 * item + 1 for item in range(0, 100)]
+
+def test_counters():
+
+    counters = pipeline.run_pipeline(('source', range(0, 10)), [('stage', lambda item: item)], ('sink', lambda item: None), 
+                                     queue_depth = [3, 2], print_counters = False)
+
+    assert [stage_counters['name'] for stage_counters in counters] == ['source', 'stage', 'sink']
+    assert [stage_counters['num_items'] for stage_counters in counters] == [10, 10, 10]
+    assert counters[1]['max_input_queue_size'] <= 3
+    assert counters[2]['max_input_queue_size'] <= 2
+
+def fail_on_item(item):
+
+    if item == 5:
+        raise KeyError(item)
+
+    return item
+
+@pytest.mark.parametrize('stage', ['source', 'stage', 'sink'])
+def test_error_is_raised_again(stage):
+
+    def failing_source():
+        for item in range(0, 1000):
+            yield fail_on_item(item)
+
+    source = ('source', failing_source() if stage == 'source' else range(0, 1000))
+    stages = [('stage', fail_on_item if stage == 'stage' else (lambda item: item))]
+    sink = ('sink', fail_on_item if stage == 'sink' else (lambda item: None))
+
+    # the first error stops all stages instead of leaving the pipeline waiting on a queue
+    with pytest.raises(KeyError):
+        pipeline.run_pipeline(source, stages, sink, queue_depth = 1, print_counters = False)
+
+def test_queue_depth_validated():
+
+    with pytest.raises(ValueError, match = 'queue_depth'):
+        pipeline.run_pipeline(('source', range(0, 3)), [('stage', lambda item: item)], ('sink', lambda item: None), queue_depth = [1, 2, 3])
+
+@pytest.mark.parametrize('precision', ['double', 'compact'])
+@pytest.mark.parametrize('chunk_size', [1, 4, 1000])
+def test_chunked_exo_to_comsol_matches_in_memory(tmp_path, precision, chunk_size):
+
+    output_folder_path = str(tmp_path) + '/'
+    util.exoToComsol(INPUT_FOLDER_PATH, EXODUS_FILE_NAME, output_folder_path, 'in_memory.txt', 'tetrahedra', precision = precision)
+    util.exoToComsol(INPUT_FOLDER_PATH, EXODUS_FILE_NAME, output_folder_path, 'chunked.txt', 'tetrahedra', precision = precision, chunk_size = chunk_size)
+
+    with open(output_folder_path + 'in_memory.txt') as in_memory_file, open(output_folder_path + 'chunked.txt') as chunked_file:
+        assert chunked_file.read() == in_memory_file.read()
+
+@pytest.mark.parametrize('options', [{'node_renumbering': 'rcm'}, {'elem_variable_names': ['stress']}])
+def test_chunked_exo_to_comsol_needs_whole_mesh_options_refused(tmp_path, options):
+
+    with pytest.raises(ValueError, match = 'chunk_size'):
+        util.exoToComsol(INPUT_FOLDER_PATH, EXODUS_FILE_NAME, str(tmp_path) + '/', 'out.txt', 'tetrahedra', chunk_size = 4, **options)
@@ -0,0 +1,116 @@
+'''
+ExoToComsol
+
+Copyright 2024 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains certain rights in this software.
+
+BSD 3-Clause License
+'''
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from conftest import INPUT_FOLDER_PATH, COMSOL_FILE_NAME, get_cube_mesh
+from src import exodus_backend
+from src import util
+from src import verify
+
+def test_compact_dtypes(cube_mesh):
+
+    nodal_coords_array, elem_conn_array = cube_mesh
+
+    coords, elem_conn, data = util.cast_mesh_to_precision(nodal_coords_array, elem_conn_array, nodal_coords_array[:, 0], 'compact')
+
+    assert coords.dtype == np.float32
+    assert elem_conn.dtype == np.int32
+    assert data.dtype == np.float32
+
+def test_double_keeps_dtypes(cube_mesh):
+
+    nodal_coords_array, elem_conn_array = cube_mesh
+
+    coords, elem_conn, data = util.cast_mesh_to_precision(nodal_coords_array, elem_conn_array, nodal_coords_array[:, 0], 'double')
+
+    assert (coords.dtype, elem_conn.dtype, data.dtype) == (np.float64, np.int64, np.float64)
+
+def test_compact_overflow():
+
+    with pytest.raises(OverflowError):
+        util.cast_float_array_to_precision(np.array([1e300]), 'compact', 'nodal data')
+
+    with pytest.raises(OverflowError):
+        util.cast_int_array_to_precision(np.array([2**40]), 'compact', 'connectivity')
+
+@pytest.mark.parametrize('chunk_size', [None, 4])
+def test_compact_exodus_file(tmp_path, chunk_size):
+
+    output_folder_path = str(tmp_path) + '/'
+    util.comsolToExo(INPUT_FOLDER_PATH, COMSOL_FILE_NAME, output_folder_path, 'out.e', chunk_size = chunk_size, precision = 'compact')
+
+    exo = exodus_backend.open_exodus_file(output_folder_path + 'out.e')
+    coords = exo.get_coords()
+    data = exo.get_node_variable_values(exo.get_node_variable_names()[0], len(exo.get_times()))
+    exo.close()
+
+    # the Exodus file is written with 4 byte floating point values
+    assert coords.dtype == np.float32
+    assert data.dtype == np.float32
+
+    report = verify.verify(INPUT_FOLDER_PATH, COMSOL_FILE_NAME, output_folder_path, 'out.e', coord_tol = 1e-6, data_rtol = 1e-6)
+    assert report['passed']
+
+@pytest.mark.parametrize('chunk_size', [None, 2])
+def test_collapsed_elems_refused(tmp_path, chunk_size):
+
+    # nodes 2 and 5 are distinct in float64 and equal in float32
+    nodal_coords_array = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0], [1.0 + 1e-12, 0.0, 0.0]])
+    elem_conn_array = np.array([[1, 2, 3, 4], [2, 3, 4, 5]])
+
+    output_folder_path = str(tmp_path) + '/'
+    util.write_sectionwise_file_for_COMSOL_input_from_arrays(output_folder_path, 'in.txt', nodal_coords_array, elem_conn_array, 
+                                                             nodal_coords_array[:, 0], 'tetrahedra')
+
+    with pytest.raises(ValueError, match = 'collapse'):
+        util.comsolToExo(output_folder_path, 'in.txt', output_folder_path, 'out.e', chunk_size = chunk_size, precision = 'compact')
+
+def test_read_in_chunks(tmp_path):
+
+    nodal_coords_array, elem_conn_array = get_cube_mesh(3)
+
+    output_folder_path = str(tmp_path) + '/'
+    util.write_sectionwise_file_for_COMSOL_input_from_arrays(output_folder_path, 'in.txt', nodal_coords_array, elem_conn_array, 
+                                                             np.column_stack((nodal_coords_array[:, 0], nodal_coords_array[:, 2])), 'tetrahedra', 
+                                                             data_header = ['T (K) @ t=0', 'T (K) @ t=1'])
+
+    whole = util.read_COMSOL_section_wise_data(output_folder_path, 'in.txt', chunk_size = 1000000)
+    chunked = util.read_COMSOL_section_wise_data(output_folder_path, 'in.txt', chunk_size = 7)
+
+    for whole_value, chunked_value in zip(whole, chunked):
+        np.testing.assert_array_equal(whole_value, chunked_value)
+
+    np.testing.assert_array_equal(np.column_stack(chunked[3:6]), nodal_coords_array)
+    np.testing.assert_array_equal(chunked[8].reshape(-1, 4), elem_conn_array)
+
+@pytest.mark.parametrize('precision, node_renumbering', [('double', None), ('compact', None), ('compact', 'rcm')])
+def test_peak_memory_estimate(tmp_path, precision, node_renumbering):
+
+    nodal_coords_array, elem_conn_array = get_cube_mesh(12)
+
+    output_folder_path = str(tmp_path) + '/'
+    util.write_sectionwise_file_for_COMSOL_input_from_arrays(output_folder_path, 'in.txt', nodal_coords_array, elem_conn_array, 
+                                                             nodal_coords_array[:, 0], 'tetrahedra')
+
+    tracemalloc.start()
+    try:
+        util.comsolToExo(output_folder_path, 'in.txt', output_folder_path, 'out.e', node_renumbering = node_renumbering, precision = precision)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    estimate = util.get_peak_memory_estimate(len(nodal_coords_array), len(elem_conn_array), 4, 3, 1, precision, node_renumbering, 
+                                             num_mesh_copies = node_renumbering is not None, 
+                                             text_rows = min(len(elem_conn_array), util.READ_CHUNK_SIZE))
+
+    # the estimate bounds the peak without overstating it by much
+    assert peak <= estimate <= 3 * peak
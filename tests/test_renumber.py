@@ -0,0 +1,53 @@
+'''
+ExoToComsol
+
+Copyright 2024 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains certain rights in this software.
+
+BSD 3-Clause License
+'''
+import numpy as np
+import pytest
+
+from src import renumber
+
+@pytest.fixture
+def shuffled_cube_mesh(cube_mesh):
+
+    nodal_coords_array, elem_conn_array = cube_mesh
+
+    # random node ids give a bandwidth close to the number of nodes
+    permutation = np.random.default_rng(0).permutation(len(nodal_coords_array))
+    old_to_new_node_ids = renumber.get_old_to_new_node_ids(permutation)
+
+    return nodal_coords_array[permutation], old_to_new_node_ids[elem_conn_array - 1]
+
+def test_rcm_reduces_bandwidth(shuffled_cube_mesh):
+
+    nodal_coords_array, elem_conn_array = shuffled_cube_mesh
+
+    _, elem_conn_renumbered, _, permutation = renumber.renumber_nodes(nodal_coords_array, elem_conn_array, nodal_coords_array[:, 0], 'rcm')
+
+    bandwidth_before = renumber.get_bandwidth(elem_conn_array)
+    bandwidth_after = renumber.get_bandwidth(elem_conn_renumbered)
+
+    # a 5 x 5 x 5 grid of nodes has an ordering of bandwidth about one layer of nodes
+    assert bandwidth_after < bandwidth_before / 2
+    assert bandwidth_after <= 2 * 5 * 5
+    assert np.array_equal(np.sort(permutation), np.arange(len(nodal_coords_array)))
+
+@pytest.mark.parametrize('method', renumber.RENUMBERING_METHODS)
+def test_renumbering_keeps_the_mesh(shuffled_cube_mesh, method):
+
+    nodal_coords_array, elem_conn_array = shuffled_cube_mesh
+
+    coords, elem_conn, data, _ = renumber.renumber_nodes(nodal_coords_array, elem_conn_array, nodal_coords_array[:, 0], method)
+
+    # same elements by coordinates, and the data moves with the nodes
+    assert np.array_equal(coords[elem_conn - 1], nodal_coords_array[elem_conn_array - 1])
+    assert np.array_equal(data, coords[:, 0])
+
+def test_unknown_method():
+
+    with pytest.raises(ValueError):
+        renumber.renumber_nodes(np.zeros((4, 3)), np.array([[1, 2, 3, 4]]), np.zeros(4), 'metis')
@@ -0,0 +1,184 @@
+'''
+ExoToComsol
+
+Copyright 2024 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains certain rights in this software.
+
+BSD 3-Clause License
+'''
+import numpy as np
+import pytest
+
+from conftest import get_cube_mesh
+from src import Element_Tetrahedra
+from src import roi
+from src import util
+
+POINTS = np.array([[0.0, 0.0, 0.0], [0.5, 0.5, 0.5], [1.0, 0.0, 0.0], [0.9, 0.9, 0.9], [0.5, 0.5, 1.2], [-0.1, 0.5, 0.5]])
+
+@pytest.mark.parametrize('region, expected_mask', [
+    (roi.Box([[0.0, 1.0], [0.0, 1.0], [0.0, 1.0]]), [True, True, True, True, False, False]),
+    # points on the boundary are inside
+    (roi.Sphere([0.0, 0.0, 0.0], 1.0), [True, True, True, False, False, True]),
+    (roi.Cylinder([0.5, 0.5, 0.0], [0.5, 0.5, 1.0], 0.5), [False, True, False, False, False, False]),
+    (roi.Half_Space([1.0, 0.0, 0.0], [1.0, 1.0, 1.0]), [True, False, True, False, False, True]),
+    (roi.Oriented_Box([0.5, 0.5, 0.5], np.eye(3), [0.5, 0.5, 0.5]), [True, True, True, True, False, False]),
+])
+def test_region_masks(region, expected_mask):
+
+    assert region.get_mask(POINTS).tolist() == expected_mask
+
+def test_combined_region_masks():
+
+    box = roi.Box([[0.0, 1.0], [0.0, 1.0], [0.0, 1.0]])
+    sphere = roi.Sphere([0.0, 0.0, 0.0], 1.0)
+
+    box_mask, sphere_mask = box.get_mask(POINTS), sphere.get_mask(POINTS)
+
+    assert np.array_equal((box & sphere).get_mask(POINTS), box_mask & sphere_mask)
+    assert np.array_equal((box | sphere).get_mask(POINTS), box_mask | sphere_mask)
+    assert np.array_equal((box & ~sphere).get_mask(POINTS), box_mask & ~sphere_mask)
+
+    # nested intersections are flattened and their half-spaces merged
+    intersection = (roi.Half_Space([1.0, 0.0, 0.0], [1.0, 0.0, 0.0]) & sphere) & roi.Half_Space([0.0, 0.5, 0.0], [0.0, 1.0, 0.0])
+    assert len(intersection.regions) == 2
+    assert len(intersection.regions[0].normals) == 2
+
+def test_region_from_dict():
+
+    description = {'intersection': [{'box': [[0.0, 1.0], [0.0, 1.0], [0.0, 1.0]]}, 
+                                    {'complement': {'sphere': {'center': [0.0, 0.0, 0.0], 'radius': 0.5}}}]}
+
+    region = roi.get_region(description)
+
+    expected_region = roi.Box([[0.0, 1.0], [0.0, 1.0], [0.0, 1.0]]) & ~roi.Sphere([0.0, 0.0, 0.0], 0.5)
+    assert np.array_equal(region.get_mask(POINTS), expected_region.get_mask(POINTS))
+
+    with pytest.raises(ValueError):
+        roi.get_region({'torus': {}})
+
+def test_mask_in_chunks(monkeypatch):
+
+    points = np.random.default_rng(0).random((1000, 3))
+    region = roi.Sphere([0.5, 0.5, 0.5], 0.4)
+
+    expected_mask = region.get_mask(points)
+    monkeypatch.setattr(roi, 'ROI_CHUNK_SIZE', 7)
+
+    assert np.array_equal(region.get_mask(points), expected_mask)
+
+def get_linear_field(nodal_coords_array):
+
+    return 2.0 * nodal_coords_array[:, 0] - 3.0 * nodal_coords_array[:, 1] + nodal_coords_array[:, 2]
+
+@pytest.mark.parametrize('region, volume', [
+    ([[0.13, 0.71], [0.05, 0.9], [0.33, 1.0]], 0.58 * 0.85 * 0.67),
+    # the plane x + y + z = 1.3 cuts off the corner of the cube
+    (roi.Half_Space([1.3, 0.0, 0.0], [1.0, 1.0, 1.0]), 1.3**3 / 6 - 3 * 0.3**3 / 6),
+    # planes through grid nodes
+    ([[0.0, 1.0], [0.0, 1.0], [0.0, 0.75]], 0.75),
+])
+def test_clipped_volume(cube_mesh, region, volume):
+
+    nodal_coords_array, elem_conn_array = cube_mesh
+
+    coords, elem_conn, data = roi.clip_mesh_to_region(nodal_coords_array, elem_conn_array, get_linear_field(nodal_coords_array), region)
+
+    elem_volumes = Element_Tetrahedra.get_elem_volumes_from_arrays(coords, elem_conn, signed = True)
+
+    assert elem_volumes.sum() == pytest.approx(volume, abs = 1e-12)
+    assert (elem_volumes > 0).all()
+    # linear data is interpolated exactly on the cut edges
+    assert np.allclose(data, get_linear_field(coords))
+
+def test_clipped_mesh_is_conforming(cube_mesh):
+
+    nodal_coords_array, elem_conn_array = cube_mesh
+    region = roi.Oriented_Box([0.5, 0.5, 0.5], [[np.cos(0.4), -np.sin(0.4), 0.0], [np.sin(0.4), np.cos(0.4), 0.0], [0.0, 0.0, 1.0]], [0.3, 0.2, 0.25])
+
+    coords, elem_conn, _ = roi.clip_mesh_to_region(nodal_coords_array, elem_conn_array, np.zeros(len(nodal_coords_array)), region)
+
+    # every face is shared by at most two elements and the boundary faces lie on the faces of the box
+    faces = np.sort(np.concatenate([elem_conn[:, [0, 1, 2]], elem_conn[:, [0, 1, 3]], elem_conn[:, [0, 2, 3]], elem_conn[:, [1, 2, 3]]]), axis=1)
+    unique_faces, face_counts = np.unique(faces, axis=0, return_counts=True)
+    assert face_counts.max() == 2
+
+    half_spaces = region.get_half_spaces()
+    boundary_face_coords = coords[unique_faces[face_counts == 1] - 1]
+    on_plane = [np.abs(boundary_face_coords @ normal - offset).max(axis=1) < 1e-9 for normal, offset in zip(half_spaces.normals, half_spaces.offsets)]
+    assert np.any(on_plane, axis=0).all()
+
+    assert Element_Tetrahedra.get_elem_volumes_from_arrays(coords, elem_conn).sum() == pytest.approx(0.6 * 0.4 * 0.5, abs = 1e-12)
+
+def test_clip_needs_planes(cube_mesh):
+
+    nodal_coords_array, elem_conn_array = cube_mesh
+
+    with pytest.raises(ValueError):
+        roi.clip_mesh_to_region(nodal_coords_array, elem_conn_array, np.zeros(len(nodal_coords_array)), roi.Sphere([0.0, 0.0, 0.0], 1.0))
+
+def get_perturbed_cube_mesh(seed):
+
+    """
+    Gets the tetrahedral mesh of the unit cube of get_cube_mesh(6) with its inner nodes moved randomly by up to a fifth of a cell
+
+    Returns (num_nodes, 3) coordinates, (num_elems, 4) 1-based connectivity and the boolean mask of the inner nodes
+    """
+
+    nodal_coords_array, elem_conn_array = get_cube_mesh(6)
+
+    inner_nodes = ((nodal_coords_array > 0.0) & (nodal_coords_array < 1.0)).all(axis=1)
+    nodal_coords_array[inner_nodes] += np.random.default_rng(seed).uniform(-0.03, 0.03, (np.count_nonzero(inner_nodes), 3))
+
+    return nodal_coords_array, elem_conn_array, inner_nodes
+
+@pytest.mark.parametrize('seed', range(0, 10))
+def test_clip_leaves_no_slivers(seed):
+
+    nodal_coords_array, elem_conn_array, inner_nodes = get_perturbed_cube_mesh(seed)
+
+    # oblique planes through inner nodes, up to a rounding error away from them
+    rng = np.random.default_rng(seed)
+    normals = np.array([[1.0, 0.3, 0.2], [-0.2, 1.0, 0.4], [0.1, -0.3, 1.0]])
+    points = nodal_coords_array[rng.choice(np.flatnonzero(inner_nodes), 3)] + rng.choice([0.0, 1e-16, -1e-16, 1e-13], (3, 1)) * normals
+    region = roi.Half_Spaces(points, normals)
+
+    coords, elem_conn, data = roi.clip_mesh_to_region(nodal_coords_array, elem_conn_array, get_linear_field(nodal_coords_array), region)
+
+    elem_volumes = Element_Tetrahedra.get_elem_volumes_from_arrays(coords, elem_conn, signed = True)
+    assert (elem_volumes > 0).all()
+    assert len(np.unique(coords, axis = 0)) == len(coords)
+
+    # the clipped volume does not depend on the mesh of the cube
+    cube_coords, cube_elem_conn = get_cube_mesh(1)
+    cube_coords, cube_elem_conn, _ = roi.clip_mesh_to_region(cube_coords, cube_elem_conn, np.zeros(len(cube_coords)), region)
+    assert elem_volumes.sum() == pytest.approx(Element_Tetrahedra.get_elem_volumes_from_arrays(cube_coords, cube_elem_conn).sum(), abs = 1e-12)
+
+    assert np.allclose(data, get_linear_field(coords))
+
+@pytest.mark.parametrize('elem_inclusion', ['all', 'any', 'centroid'])
+def test_crop_keeps_elems_of_policy(cube_mesh, elem_inclusion):
+
+    nodal_coords_array, elem_conn_array = cube_mesh
+    bounds = [[0.0, 0.6], [0.0, 1.0], [0.0, 1.0]]
+
+    coords, elem_conn, data = util.crop_mesh_to_roi(nodal_coords_array, elem_conn_array, nodal_coords_array[:, 0], bounds, elem_inclusion)
+
+    volume = Element_Tetrahedra.get_elem_volumes_from_arrays(coords, elem_conn).sum()
+    centroids_x = coords[elem_conn - 1][:, :, 0].mean(axis=1)
+
+    # the cells from x = 0.5 to 0.75 cross the boundary
+    if elem_inclusion == 'all':
+        assert volume == pytest.approx(0.5)
+    elif elem_inclusion == 'any':
+        assert volume == pytest.approx(0.75)
+    else:
+        assert 0.5 < volume < 0.75
+        assert (centroids_x <= 0.6).all()
+
+    assert np.array_equal(data, coords[:, 0])
+
+def test_region_is_abstract():
+
+    with pytest.raises(TypeError):
+        roi.Region()
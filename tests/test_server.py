@@ -0,0 +1,100 @@
+'''
+ExoToComsol
+
+Copyright 2024 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains certain rights in this software.
+
+BSD 3-Clause License
+'''
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+from conftest import INPUT_FOLDER_PATH, EXODUS_FILE_NAME
+from src import exodus_backend
+from src import server
+
+NUM_TIME_STEPS = 16
+
+def get_text(request, root_dir = INPUT_FOLDER_PATH):
+
+    response, text_chunks = server.handle_request(server.Mesh_Cache(), request, root_dir)
+
+    return response, "".join(text_chunks)
+
+def get_last_data_value(text):
+
+    return float(text.strip().splitlines()[-1])
+
+def get_exodus_value(step):
+
+    exo = exodus_backend.open_exodus_file(INPUT_FOLDER_PATH + EXODUS_FILE_NAME)
+    value = float(exo.get_node_variable_values(exo.get_node_variable_names()[0], step)[-1])
+    exo.close()
+
+    return value
+
+def test_step_defaults_to_last():
+
+    _, text = get_text({'op': 'exo_to_comsol', 'input_file': EXODUS_FILE_NAME})
+
+    assert get_last_data_value(text) == get_exodus_value(NUM_TIME_STEPS)
+
+def test_first_step():
+
+    _, text = get_text({'op': 'exo_to_comsol', 'input_file': EXODUS_FILE_NAME, 'step': 1})
+
+    assert get_last_data_value(text) == get_exodus_value(1)
+
+@pytest.mark.parametrize('step', [0, -1, NUM_TIME_STEPS + 1, 1.5, '1'])
+def test_step_out_of_range(step):
+
+    with pytest.raises(ValueError, match = 'not a time step'):
+        server.handle_request(server.Mesh_Cache(), {'op': 'exo_to_comsol', 'input_file': EXODUS_FILE_NAME, 'step': step}, INPUT_FOLDER_PATH)
+
+@pytest.mark.parametrize('file_path', ['../README.md', '/etc/hostname', 'missing/../../README.md'])
+def test_paths_outside_root_refused(file_path):
+
+    with pytest.raises(ValueError, match = 'outside the server root directory'):
+        server.resolve_request_path(INPUT_FOLDER_PATH, file_path)
+
+def test_served_requests(tmp_path):
+
+    unix_socket_path = str(tmp_path / 'server.sock')
+    server_thread = threading.Thread(target = server.run_server, kwargs = {'unix_socket_path': unix_socket_path, 'root_dir': INPUT_FOLDER_PATH}, daemon = True)
+    server_thread.start()
+
+    for _ in range(100):
+        if os.path.exists(unix_socket_path):
+            break
+        time.sleep(0.05)
+
+    # a client keeping an idle connection open must not block the shutdown
+    idle_client_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    idle_client_socket.connect(unix_socket_path)
+    idle_client_socket.settimeout(10)
+
+    try:
+        response, payload = server.send_request({'op': 'exo_to_comsol', 'input_file': EXODUS_FILE_NAME, 'step': 0}, unix_socket_path = unix_socket_path)
+        assert response['status'] == 'error' and payload is None
+
+        response, payload = server.send_request({'op': 'exo_to_comsol', 'input_file': EXODUS_FILE_NAME, 'step': 1}, unix_socket_path = unix_socket_path)
+        assert response['status'] == 'ok' and response['chunked']
+        assert get_last_data_value(payload.decode()) == get_exodus_value(1)
+
+        # the second request for the same file is served from the cache
+        response, _ = server.send_request({'op': 'stats'}, unix_socket_path = unix_socket_path)
+        assert response['cache']['hits'] >= 1
+
+    finally:
+        server.send_request({'op': 'shutdown'}, unix_socket_path = unix_socket_path)
+        server_thread.join(10)
+
+    assert not server_thread.is_alive()
+
+    # the server closed the idle connection
+    with idle_client_socket:
+        assert idle_client_socket.recv(1) == b""
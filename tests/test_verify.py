@@ -0,0 +1,93 @@
+'''
+ExoToComsol
+
+Copyright 2024 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains certain rights in this software.
+
+BSD 3-Clause License
+'''
+import numpy as np
+
+from conftest import INPUT_FOLDER_PATH, EXODUS_FILE_NAME, COMSOL_FILE_NAME
+from src import util
+from src import verify
+
+def test_exo_to_comsol_round_trip(tmp_path):
+
+    output_folder_path = str(tmp_path) + '/'
+    util.exoToComsol(INPUT_FOLDER_PATH, EXODUS_FILE_NAME, output_folder_path, 'out.txt', 'tetrahedra')
+
+    report = verify.verify(INPUT_FOLDER_PATH, EXODUS_FILE_NAME, output_folder_path, 'out.txt')
+
+    assert report['passed']
+    assert report['num_data_columns_compared'] == 1
+    assert report['num_elems_inverted'] == 0
+
+def test_comsol_to_exo_round_trip(tmp_path):
+
+    output_folder_path = str(tmp_path) + '/'
+    util.comsolToExo(INPUT_FOLDER_PATH, COMSOL_FILE_NAME, output_folder_path, 'out.e')
+    util.exoToComsol(output_folder_path, 'out.e', output_folder_path, 'out.txt', 'tetrahedra', node_renumbering = 'rcm')
+
+    assert verify.verify(INPUT_FOLDER_PATH, COMSOL_FILE_NAME, output_folder_path, 'out.e')['passed']
+    assert verify.verify(INPUT_FOLDER_PATH, COMSOL_FILE_NAME, output_folder_path, 'out.txt')['passed']
+
+def test_roi_cropped_round_trip(tmp_path):
+
+    output_folder_path = str(tmp_path) + '/'
+    util.comsolToExo_with_ROI(INPUT_FOLDER_PATH, COMSOL_FILE_NAME, output_folder_path, 'out.e', [[-0.5, 0.5], [-0.5, 0.5], [-0.5, 0.0]])
+
+    report = verify.verify(INPUT_FOLDER_PATH, COMSOL_FILE_NAME, output_folder_path, 'out.e', roi_cropped = True)
+
+    assert report['passed']
+    assert report['num_nodes_candidate'] < report['num_nodes_reference']
+
+def test_all_time_steps_matched_by_name_and_time():
+
+    reference = verify.read_mesh_arrays(INPUT_FOLDER_PATH, EXODUS_FILE_NAME)
+    report = verify.compare_mesh_arrays(reference, reference)
+
+    assert report['passed']
+    assert report['data_columns_matched_by'] == 'name and time'
+    assert report['num_data_columns_compared'] == len(reference['data_columns']) > 1
+
+def test_inverted_elem_fails():
+
+    reference = verify.read_mesh_arrays(INPUT_FOLDER_PATH, EXODUS_FILE_NAME)
+    candidate = dict(reference, elem_conn = reference['elem_conn'].copy())
+    candidate['elem_conn'][2] = candidate['elem_conn'][2][[0, 1, 3, 2]]
+
+    report = verify.compare_mesh_arrays(reference, candidate)
+
+    assert not report['passed']
+    assert report['num_elems_not_matched'] == 0
+    assert report['first_elem_ids_inverted'] == [3]
+
+def test_data_column_count_mismatch_fails():
+
+    reference = verify.read_mesh_arrays(INPUT_FOLDER_PATH, EXODUS_FILE_NAME)
+    candidate = dict(reference, nodal_sim_data = reference['nodal_sim_data'][:, :3], data_columns = reference['data_columns'][:3])
+
+    report = verify.compare_mesh_arrays(reference, candidate)
+
+    assert not report['passed']
+    assert report['data_columns_matched_by'] is None
+
+def test_wrong_data_fails():
+
+    reference = verify.read_mesh_arrays(INPUT_FOLDER_PATH, EXODUS_FILE_NAME)
+    candidate = dict(reference, nodal_sim_data = reference['nodal_sim_data'].copy())
+    candidate['nodal_sim_data'][4, -1] += 1.0
+
+    report = verify.compare_mesh_arrays(reference, candidate)
+
+    assert not report['passed']
+    assert report['first_node_ids_with_wrong_data'] == [5]
+
+def test_match_quantized_coords_across_cell_boundary():
+
+    reference_coords = np.array([[0.0, 0.0, 0.0], [1.0, 2.0, 3.0], [4.5e-9, 1.0, 1.0]])
+    # moved by less than the tolerance, partly into the neighbouring cells
+    candidate_coords = reference_coords[[2, 0, 1]] + np.array([[1e-9, -4e-10, 0.0], [-4e-10, 0.0, 3e-10], [0.0, 0.0, 0.0]])
+
+    assert verify.match_quantized_coords(reference_coords, candidate_coords, 1e-9).tolist() == [2, 0, 1]
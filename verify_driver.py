@@ -0,0 +1,31 @@
+'''
+ExoToComsol
+
+Copyright 2024 National Technology & Engineering Solutions of Sandia, LLC (NTESS). 
+Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains certain rights in this software.
+
+BSD 3-Clause License
+'''
+from src import verify
+
+#user inputs:
+
+referenceFolderPath = './output_folder/'
+candidateFolderPath = './output_folder/'
+
+reference_file_name = 'forComsolInput_exo_to_comsol_example.txt'
+candidate_file_name = 'forComsolInput_exo_to_comsol_example_roi_cropped.txt'
+
+# set to True when the candidate is the output of an ROI conversion of the reference
+roi_cropped = True
+
+coord_tol = 1e-9
+data_rtol = 1e-9
+data_atol = 1e-12
+
+# time step of Exodus files to compare, None for all time steps, 'last' or a 1-based step
+exodus_step = None
+
+#Run verify() to compare the converted file against its counterpart
+verify.verify(referenceFolderPath, reference_file_name, candidateFolderPath, candidate_file_name, 
+              coord_tol = coord_tol, data_rtol = data_rtol, data_atol = data_atol, roi_cropped = roi_cropped, exodus_step = exodus_step)